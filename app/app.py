@@ -1,47 +1,327 @@
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="ctranslate2")
-from flask import Flask, request, render_template, session, Response
+from flask import Flask, request, render_template, session, Response, jsonify
+from flask_sock import Sock
 import os
+import json
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
 from werkzeug.utils import secure_filename
-from pydub import AudioSegment
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, decode_audio
 import torch
 
+# Make the repo-level `code` / `models` packages importable when run as `python app/app.py`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from code.audio_probe import probe_audio, AudioProbeError
+from code.audio_cache import file_hash, SAMPLE_RATE
+from code.chunking import transcribe_chunked
+from code.replica_planner import read_topology, plan_replicas
+from code.preprocessing import load_preprocessed_pcm
+from code.language_id import identify_language
+from code import tracing
+from jobs import JobManager, QueueFullError
+from metrics import MetricsRegistry, register_process_metrics, CONTENT_TYPE, RTF_BUCKETS
+from transcript_cache import TranscriptCache
+from batching import MicroBatchScheduler, ScheduledPipeline
+from streaming import StreamingTranscriber
+from model_pool import ModelPool
+
 # ---------------------- CONFIG ----------------------
 
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"mp3", "wav", "m4a", "mp4"}
 
+# Micro-batching: VAD chunks from concurrent jobs are decoded together in batches of
+# up to BATCH_SIZE, waiting at most BATCH_MAX_WAIT_MS to fill one. BATCH_SIZE=1 disables it.
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", 8))
+BATCH_MAX_WAIT_MS = int(os.environ.get("BATCH_MAX_WAIT_MS", 50))
+
+# Inference concurrency: number of jobs in flight at once, and how many may wait
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 4 if BATCH_SIZE > 1 else 1))
+MAX_QUEUE_DEPTH = int(os.environ.get("MAX_QUEUE_DEPTH", 8))
+
+# Long-audio mode: files of at least LONG_AUDIO_MIN_SEC are split at silence into
+# ~LONG_AUDIO_CHUNK_SEC chunks (with LONG_AUDIO_OVERLAP_SEC overlap) that run on
+# LONG_AUDIO_WORKERS model replicas in parallel and are stitched back in order.
+LONG_AUDIO_MIN_SEC = float(os.environ.get("LONG_AUDIO_MIN_SEC", 150))
+LONG_AUDIO_CHUNK_SEC = float(os.environ.get("LONG_AUDIO_CHUNK_SEC", 60))
+LONG_AUDIO_OVERLAP_SEC = float(os.environ.get("LONG_AUDIO_OVERLAP_SEC", 2))
+LONG_AUDIO_WORKERS = int(os.environ.get("LONG_AUDIO_WORKERS", 4))
+
+# CPU replica layout: on CPU-only hosts the model runs CPU_REPLICAS workers (default: enough
+# for the job and long-audio threads), each with cpu_threads = its share of the physical cores.
+# CPU_PIN=1 also pins the whole process to those cores (one hardware thread per core; Linux only).
+CPU_REPLICAS = int(os.environ.get("CPU_REPLICAS", max(INFERENCE_WORKERS, LONG_AUDIO_WORKERS)))
+CPU_PIN = os.environ.get("CPU_PIN", "0") == "1"
+
+# Model pool: requests pick a model size (and optionally compute type); models load on
+# demand and stay resident within MODEL_POOL_BUDGET_MB, least recently used evicted first.
+DEFAULT_MODEL = os.environ.get("DEFAULT_MODEL", "large-v3")
+ALLOWED_MODELS = os.environ.get("ALLOWED_MODELS", "small,medium,large-v3").split(",")
+MODEL_POOL_BUDGET_MB = int(os.environ.get("MODEL_POOL_BUDGET_MB", 8192))
+
+# Audio enhancement before inference (16 kHz mono, high-pass, noise reduction, loudness;
+# code/preprocessing.py). Off by default; the enhanced PCM is cached per file.
+PREPROCESS_AUDIO = os.environ.get("PREPROCESS_AUDIO", "0") == "1"
+
+# One-shot language ID (code/language_id.py): a few VAD speech windows per upload are scored
+# with the served model and the language is fixed for the whole file, instead of being
+# re-detected per chunk. Mixed-language / uncertain files keep multilingual decoding.
+# Off by default; when on, each upload is decoded once in memory for both ID and inference.
+LANGUAGE_ID = os.environ.get("LANGUAGE_ID", "0") == "1"
+
+# Transcript cache for repeated uploads (content hash + model + decode options)
+TRANSCRIPT_CACHE_PATH = os.environ.get("TRANSCRIPT_CACHE_PATH", os.path.join("cache", "transcripts.sqlite3"))
+TRANSCRIPT_CACHE_MAX_MB = int(os.environ.get("TRANSCRIPT_CACHE_MAX_MB", 256))
+
+# Decode options used for every upload (part of the transcript cache key)
+DECODE_OPTIONS = {
+    "beam_size": 15,
+    "vad_filter": True,
+    "chunk_length": 30,
+    "without_timestamps": False,
+    "multilingual": True,
+}
+
+# Live microphone streaming (/ws/live): the trailing LIVE_WINDOW_SEC of audio is
+# re-decoded every LIVE_STEP_SEC; at most LIVE_MAX_SESSIONS sockets at once.
+LIVE_WINDOW_SEC = float(os.environ.get("LIVE_WINDOW_SEC", 15))
+LIVE_STEP_SEC = float(os.environ.get("LIVE_STEP_SEC", 1))
+LIVE_MAX_SESSIONS = int(os.environ.get("LIVE_MAX_SESSIONS", 2))
+
+# Live decodes run every step, so keep them cheap (greedy, no VAD, no context carry-over;
+# committed text is passed back in as the prompt instead)
+LIVE_DECODE_OPTIONS = {
+    "beam_size": 1,
+    "vad_filter": False,
+    "condition_on_previous_text": False,
+}
+
 app = Flask(__name__)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.secret_key = "supersecretkey"
+sock = Sock(app)
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# ---------------------- METRICS ----------------------
+
+# Prometheus-format /metrics: hot-path counters / histograms, everything else read at scrape time
+metrics = MetricsRegistry()
+register_process_metrics(metrics)
+http_requests = metrics.counter("asr_http_requests_total", "HTTP requests by endpoint and status code.",
+                                ["endpoint", "status"])
+jobs_total = metrics.counter("asr_jobs_total", "Transcription jobs by outcome (done, error, cached, rejected).",
+                             ["outcome"])
+metrics.gauge("asr_queue_depth", "Jobs waiting for an inference worker.", fn=lambda: jobs.stats()["queued"])
+metrics.gauge("asr_queue_capacity", "Maximum number of queued jobs.", fn=lambda: jobs.max_queue)
+metrics.gauge("asr_inference_running", "Jobs currently running inference.", fn=lambda: jobs.running)
+metrics.gauge("asr_inference_workers", "Inference worker threads.", fn=lambda: jobs.workers)
+first_segment_seconds = metrics.histogram("asr_time_to_first_segment_seconds",
+                                          "Job submit to first decoded segment.", ["model"])
+job_latency_seconds = metrics.histogram("asr_job_latency_seconds",
+                                        "Job submit to finish, including queue wait.", ["model", "outcome"])
+job_rtf = metrics.histogram("asr_job_rtf", "Inference time / audio duration per finished job.", ["model"],
+                            buckets=RTF_BUCKETS)
+audio_seconds = metrics.counter("asr_audio_seconds_total", "Seconds of audio transcribed by the model.", ["model"])
+model_load_seconds = metrics.histogram("asr_model_load_seconds", "Model load time.", ["model", "compute_type"])
+metrics.gauge("asr_models_resident", "Models loaded in the pool.", fn=lambda: len(model_pool.stats()["loaded"]))
+metrics.gauge("asr_model_pool_used_bytes", "Estimated memory of the resident models.",
+              fn=lambda: model_pool.stats()["used_mb"] * 2**20)
+metrics.counter("asr_model_pool_evictions_total", "Models evicted from the pool.", fn=lambda: model_pool.evictions)
+
 # ---------------------- GPU / CPU AUTO DETECTION ----------------------
 
 # Auto-detect device
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
-# Choose model size according to your GPU power
-# RTX 3060 (8GB) → "small" or "medium" are both great options
-model_size = "large-v3"
-
-# Pick compute type for optimal performance
+# Default compute type for optimal performance; requests may ask for another one
 compute_type = "float16" if device == "cuda" else "int8"
+ALLOWED_COMPUTE_TYPES = {"float16", "int8_float16", "int8"} if device == "cuda" else {"int8", "float32"}
+
+# Replicas x threads: on CPU, split the physical cores between the model workers
+model_workers, cpu_threads = max(INFERENCE_WORKERS, LONG_AUDIO_WORKERS), 0
+if device == "cpu":
+    topology = read_topology()
+    replicas = plan_replicas(topology, min(CPU_REPLICAS, topology.physical_cores))
+    model_workers, cpu_threads = len(replicas), replicas[0].threads
+    pinned = CPU_PIN and hasattr(os, "sched_setaffinity")
+    if pinned:
+        os.sched_setaffinity(0, [cpu for r in replicas for cpu in r.cpus])
+    print(f"🖥️ CPU layout: {model_workers} replicas x {cpu_threads} threads on "
+          f"{topology.physical_cores} physical cores{' (pinned)' if pinned else ''}")
+
+
+def load_model(size, ctype):
+    """Pool loader: the model plus its micro-batcher (num_workers = replicas for job and chunk threads)."""
+    start = time.perf_counter()
+    model = WhisperModel(size, device=device, compute_type=ctype,
+                         num_workers=model_workers, cpu_threads=cpu_threads)
+    model_load_seconds.observe(time.perf_counter() - start, model=size, compute_type=ctype)
+    batcher = MicroBatchScheduler(model, batch_size=BATCH_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS) if BATCH_SIZE > 1 else None
+    return types.SimpleNamespace(model=model, batcher=batcher)
+
+
+def unload_model(served):
+    if served.batcher is not None:
+        served.batcher.close()
+
+
+model_pool = ModelPool(load_model, MODEL_POOL_BUDGET_MB * 1024 * 1024, unloader=unload_model)
+print(f"🔥 Loading default Faster-Whisper model '{DEFAULT_MODEL}' on {device.upper()} with {compute_type} precision...")
+model_pool.preload(DEFAULT_MODEL, compute_type)
+
+
+def resolve_model(size=None, ctype=None):
+    """Validated (size, compute_type) for a request; raises ValueError on unknown values."""
+    size = size or DEFAULT_MODEL
+    ctype = ctype or compute_type
+    if size not in ALLOWED_MODELS and size != DEFAULT_MODEL:
+        raise ValueError(f"Unknown model '{size}'. Allowed: {ALLOWED_MODELS}")
+    if ctype not in ALLOWED_COMPUTE_TYPES:
+        raise ValueError(f"Unsupported compute type '{ctype}' on {device}. Allowed: {sorted(ALLOWED_COMPUTE_TYPES)}")
+    return size, ctype
+
+# ---------------------- JOBS ----------------------
+
+transcript_cache = TranscriptCache(TRANSCRIPT_CACHE_PATH, max_bytes=TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024)
+
+chunk_pool = ThreadPoolExecutor(max_workers=LONG_AUDIO_WORKERS, thread_name_prefix="long-audio")
+
+
+def cache_key(filepath, size, ctype, long_audio=False):
+    # batched, sequential and chunked decoding can differ, so the mode is part of the key
+    options = {**DECODE_OPTIONS, "batched": BATCH_SIZE > 1, "preprocess": PREPROCESS_AUDIO,
+               "language_id": LANGUAGE_ID}
+    if long_audio:
+        options["long_audio"] = {"chunk_sec": LONG_AUDIO_CHUNK_SEC, "overlap_sec": LONG_AUDIO_OVERLAP_SEC}
+    return TranscriptCache.make_key(file_hash(filepath), size, ctype, options)
+
+
+def run_model(served, audio, **options):
+    """Lazy Faster-Whisper segments for a file path or 16 kHz samples, with the app's settings."""
+    options = {**DECODE_OPTIONS, **options}
+    if served.batcher is not None:
+        pipeline = ScheduledPipeline(served.model, served.batcher)
+        segments, info = pipeline.transcribe(audio, batch_size=BATCH_SIZE, **options)
+    else:
+        segments, info = served.model.transcribe(audio, **options)
+    return ({"start": s.start, "end": s.end, "text": s.text} for s in segments)
+
+
+def transcribe_chunk(served, samples, **options):
+    with tracing.span("inference", chunk_sec=round(len(samples) / SAMPLE_RATE, 1)):
+        return list(run_model(served, samples, **options))
+
 
-print(f"🔥 Loading Faster-Whisper model '{model_size}' on {device.upper()} with {compute_type} precision...")
+def language_options(served, filepath, pcm):
+    """Fixed-language decode options for an upload's samples, or none for mixed / uncertain files."""
+    with tracing.span("language_id") as sp:
+        # uploads are one-off: no PCM / VAD / result caches that would grow with every request
+        lid = identify_language(filepath, pcm, detector=served.model, use_cache=False)
+        sp.set(language=lid.language, confidence=round(lid.confidence, 3), mixed=lid.mixed)
+    return {"language": lid.language, "multilingual": False} if lid.fixed else {}
 
-# Initialize model
-fw_model = WhisperModel(model_size, device=device, compute_type=compute_type)
+
+def transcribe_job(job):
+    """Run Faster-Whisper for one job, yielding segments as they are decoded."""
+    with tracing.span("job", job=job.id, model=job.options["model"]):
+        with model_pool.use(job.options["model"], job.options["compute_type"]) as served:
+            audio = job.filepath
+            if PREPROCESS_AUDIO:
+                # uploads are one-off: enhanced in memory, nothing written to the PCM cache
+                with tracing.span("preprocess"):
+                    audio = load_preprocessed_pcm(job.filepath, use_cache=False)
+            elif LANGUAGE_ID or job.options.get("long_audio"):
+                # decoded once in memory, shared by language ID and the model
+                with tracing.span("decode_audio"):
+                    audio = decode_audio(job.filepath)
+            options = language_options(served, job.filepath, audio) if LANGUAGE_ID else {}
+            if job.options.get("long_audio"):
+                segments = transcribe_chunked(audio, partial(transcribe_chunk, served, **options), chunk_pool,
+                                              chunk_sec=LONG_AUDIO_CHUNK_SEC, overlap_sec=LONG_AUDIO_OVERLAP_SEC)
+            else:
+                segments = run_model(served, audio, **options)
+            segments = iter(segments)
+            collected = []
+            while True:
+                # Faster-Whisper decodes lazily, so each span is that segment's inference time
+                with tracing.span(f"segment_{len(collected)}"):
+                    seg = next(segments, None)
+                if seg is None:
+                    break
+                collected.append(seg)
+                if len(collected) == 1:
+                    first_segment_seconds.observe(time.time() - job.created_at, model=job.options["model"])
+                yield seg
+        # only complete transcripts are cached
+        with tracing.span("write_results", segments=len(collected)):
+            transcript_cache.put(job.options["cache_key"], collected)
+
+
+def record_job(job):
+    """JobManager on_finish hook: outcome, latency, RTF and audio seconds of a finished job."""
+    model, outcome = job.options["model"], job.status
+    jobs_total.inc(outcome=outcome)
+    job_latency_seconds.observe(job.finished_at - job.created_at, model=model, outcome=outcome)
+    duration = job.options.get("duration_sec")
+    if outcome == "done" and duration:
+        job_rtf.observe((job.finished_at - job.started_at) / duration, model=model)
+        audio_seconds.inc(duration, model=model)
+
+
+jobs = JobManager(transcribe_job, workers=INFERENCE_WORKERS, max_queue=MAX_QUEUE_DEPTH, on_finish=record_job)
+
+
+def start_job(filepath, size=DEFAULT_MODEL, ctype=compute_type):
+    """Replay a cached transcript if we have one, otherwise queue inference (may raise QueueFullError)."""
+    duration = probe_audio(filepath)["duration_sec"]
+    long_audio = duration >= LONG_AUDIO_MIN_SEC
+    key = cache_key(filepath, size, ctype, long_audio)
+    options = {"cache_key": key, "model": size, "compute_type": ctype}
+    cached = transcript_cache.get(key)
+    if cached is not None:
+        jobs_total.inc(outcome="cached")
+        return jobs.add_completed(filepath, cached, **options)
+    try:
+        return jobs.submit(filepath, long_audio=long_audio, duration_sec=duration, **options)
+    except QueueFullError:
+        jobs_total.inc(outcome="rejected")
+        raise
 
 # ---------------------- HELPERS ----------------------
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+
+def queue_full_response(err):
+    return Response(str(err), status=429, headers={"Retry-After": str(err.retry_after)})
+
+
+def sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {data}\n\n"
+
 # ---------------------- ROUTES ----------------------
 
+@app.after_request
+def count_request(response):
+    http_requests.inc(endpoint=request.endpoint or "unmatched", status=response.status_code)
+    return response
+
+
+@app.route("/metrics")
+def metrics_export():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     duration_minutes = None
@@ -61,17 +341,37 @@ def index():
                 filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
                 file.save(filepath)
 
-                # Get audio duration
-                audio = AudioSegment.from_file(filepath)
-                duration_minutes = len(audio) / 60000
+                # Get audio duration from the container header (no full decode);
+                # corrupt / fake files are rejected here.
+                try:
+                    info = probe_audio(filepath)
+                except AudioProbeError as e:
+                    os.remove(filepath)
+                    return f"Unsupported or corrupt audio file: {e}", 400
+                duration_minutes = info["duration_sec"] / 60
+
+                try:
+                    size, ctype = resolve_model(request.form.get("model"), request.form.get("compute_type"))
+                except ValueError as e:
+                    return str(e), 400
+
+                # Queue transcription right away; /stream_fw subscribes to it
+                try:
+                    job = start_job(filepath, size, ctype)
+                except QueueFullError as e:
+                    return queue_full_response(e)
 
-                # Save path in session
+                # Save path, model and job in session
                 session["filepath"] = filepath
+                session["model"] = [size, ctype]
+                session["job_id"] = job.id
 
     return render_template(
         "index.html",
         duration=duration_minutes,
-        filepath=session.get("filepath")
+        filepath=session.get("filepath"),
+        models=ALLOWED_MODELS,
+        default_model=DEFAULT_MODEL,
     )
 
 
@@ -82,21 +382,110 @@ def stream_fw():
     if not filepath or not os.path.exists(filepath):
         return "No file uploaded"
 
+    job = jobs.get(session.get("job_id"))
+    if job is None:
+        # Job expired (or server restarted) -> queue the file again
+        try:
+            job = start_job(filepath, *session.get("model", [DEFAULT_MODEL, compute_type]))
+        except QueueFullError as e:
+            return queue_full_response(e)
+        session["job_id"] = job.id
+
     def generate():
-        segments, info = fw_model.transcribe(
-            filepath,
-            beam_size=15,
-            vad_filter=True,
-            chunk_length=30,
-            without_timestamps=False,
-            multilingual=True,
-        )
-        for segment in segments:
-            yield f"data: {segment.text}\n\n"
-        yield "data: [DONE]\n\n"
+        for kind, payload in jobs.subscribe(job):
+            if kind == "queue":
+                yield sse(json.dumps({"position": payload}), event="queue")
+            elif kind == "segment":
+                yield sse(payload["text"])
+            elif kind == "error":
+                yield sse(json.dumps({"error": payload}), event="job_error")
+                break
+        yield sse("[DONE]")
 
     return Response(generate(), mimetype="text/event-stream")
 
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Job status, including its position while queued."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify({**job.to_dict(), "queue_position": jobs.position(job)})
+
+
+@app.route("/jobs")
+def jobs_overview():
+    batching = {f"{size}/{ctype}": served.batcher.stats()
+                for (size, ctype), served in model_pool.resident() if served.batcher is not None}
+    return jsonify({**jobs.stats(), "batching": batching or None})
+
+
+@app.route("/models")
+def models_overview():
+    """Model pool: resident models, load times, budget and evictions."""
+    return jsonify({**model_pool.stats(), "default": DEFAULT_MODEL, "allowed": ALLOWED_MODELS,
+                    "compute_types": sorted(ALLOWED_COMPUTE_TYPES)})
+
+
+@app.route("/trace")
+def trace_export():
+    """Chrome/Perfetto trace of the spans recorded since the last export (start with ASR_TRACE=1)."""
+    if not tracing.is_enabled():
+        return "Tracing is disabled; start the app with ASR_TRACE=1", 404
+    return Response(json.dumps({"traceEvents": tracing.drain(), "displayTimeUnit": "ms"}),
+                    mimetype="application/json",
+                    headers={"Content-Disposition": "attachment; filename=trace.json"})
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify(transcript_cache.stats())
+
+
+live_sessions = threading.BoundedSemaphore(LIVE_MAX_SESSIONS)
+
+
+@sock.route("/ws/live")
+def live(ws):
+    """
+    Live microphone transcription. The client sends binary frames of 16 kHz
+    mono int16 PCM and the text message "stop" when done; the server replies
+    with JSON events: {"type": "partial"}, {"type": "committed"} (each word
+    carries its end-to-end latency_ms) and a final {"type": "stats"}.
+    """
+    try:
+        size, ctype = resolve_model(request.args.get("model"), request.args.get("compute_type"))
+    except ValueError as e:
+        ws.send(json.dumps({"type": "error", "error": str(e)}))
+        return
+    if not live_sessions.acquire(blocking=False):
+        ws.send(json.dumps({"type": "error", "error": "Too many live sessions, try again later"}))
+        return
+
+    try:
+        options = dict(LIVE_DECODE_OPTIONS)
+        language = request.args.get("language")
+        if language:
+            options["language"] = language
+        with model_pool.use(size, ctype) as served:
+            transcriber = StreamingTranscriber(served.model, window_sec=LIVE_WINDOW_SEC,
+                                               step_sec=LIVE_STEP_SEC, decode_options=options)
+            while True:
+                message = ws.receive()
+                if message is None or message == "stop":
+                    break
+                if isinstance(message, str):
+                    continue
+                for event in transcriber.push(message):
+                    ws.send(json.dumps(event))
+
+            for event in transcriber.finish():
+                ws.send(json.dumps(event))
+        ws.send(json.dumps({"type": "stats", **transcriber.stats()}))
+    finally:
+        live_sessions.release()
+
 # ---------------------- MAIN ----------------------
 
 if __name__ == "__main__":
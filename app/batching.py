@@ -0,0 +1,165 @@
+# app/batching.py
+"""
+batching.py
+----------------------------------
+Server-side micro-batching of VAD chunks across concurrent jobs.
+
+Each job runs faster-whisper's batched pipeline (VAD -> ~30 s chunks ->
+features) in its own worker thread, but its `forward()` call is routed to a
+shared MicroBatchScheduler instead of hitting the model directly. The
+scheduler collects chunks from every in-flight job, waits at most
+`max_wait_ms` for a batch to fill, runs one batched encode/generate, and
+hands each chunk's segments back to the job that owns it. Jobs consume their
+results in chunk order, so every SSE stream stays ordered.
+
+Chunks are only batched together when their decode options / task match;
+with multilingual=True the language token is chosen per chunk by the model,
+so jobs in different languages still share batches.
+"""
+
+import dataclasses
+import threading
+import time
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline
+
+
+class _ChunkRequest:
+    __slots__ = ("owner", "group", "features", "metadata", "tokenizer", "options",
+                 "arrived", "done", "result", "error")
+
+    def __init__(self, owner, group, features, metadata, tokenizer, options):
+        self.owner = owner
+        self.group = group
+        self.features = features
+        self.metadata = metadata
+        self.tokenizer = tokenizer
+        self.options = options
+        self.arrived = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatchScheduler:
+    """Single inference thread that batches chunk requests from many jobs."""
+
+    def __init__(self, model, batch_size=8, max_wait_ms=50):
+        self.pipeline = BatchedInferencePipeline(model)
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []   # _ChunkRequest in arrival order
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.chunks = 0
+        self._closed = False
+        threading.Thread(target=self._loop, name="micro-batcher", daemon=True).start()
+
+    @staticmethod
+    def _group_key(tokenizer, options):
+        # clip_timestamps are per-job and only used after forward(); everything else must match
+        opts = dataclasses.replace(options, clip_timestamps=None)
+        language = None if options.multilingual else tokenizer.language_code
+        return repr((tokenizer.task, language, opts))
+
+    def run_chunks(self, owner, features, tokenizer, chunks_metadata, options):
+        """Submit one job's chunks and block until all of them are decoded (in order)."""
+        group = self._group_key(tokenizer, options)
+        requests = [_ChunkRequest(owner, group, feat, meta, tokenizer, options)
+                    for feat, meta in zip(features, chunks_metadata)]
+        with self._cond:
+            self._pending.extend(requests)
+            self._cond.notify_all()
+        results = []
+        for req in requests:
+            req.done.wait()
+            if req.error is not None:
+                raise req.error
+            results.append(req.result)
+        return results
+
+    def _take_batch(self):
+        """Pick up to batch_size requests of the oldest request's group, round-robin across jobs."""
+        group = self._pending[0].group
+        per_owner = {}
+        for req in self._pending:
+            if req.group == group:
+                per_owner.setdefault(req.owner, []).append(req)
+        batch = []
+        queues = list(per_owner.values())
+        while len(batch) < self.batch_size and any(queues):
+            for q in queues:
+                if q and len(batch) < self.batch_size:
+                    batch.append(q.pop(0))
+        taken = set(map(id, batch))
+        self._pending = [r for r in self._pending if id(r) not in taken]
+        return batch
+
+    def _ready(self):
+        if not self._pending:
+            return False
+        group = self._pending[0].group
+        same = sum(1 for r in self._pending if r.group == group)
+        return same >= self.batch_size or time.monotonic() - self._pending[0].arrived >= self.max_wait
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._closed:
+                        return
+                    if self._pending:
+                        remaining = self.max_wait - (time.monotonic() - self._pending[0].arrived)
+                        self._cond.wait(timeout=max(remaining, 0.001))
+                    else:
+                        self._cond.wait()
+                batch = self._take_batch()
+
+            first = batch[0]
+            try:
+                outputs = self.pipeline.forward(
+                    np.stack([r.features for r in batch]),
+                    first.tokenizer,
+                    [r.metadata for r in batch],
+                    first.options,
+                )
+                for req, out in zip(batch, outputs):
+                    req.result = out
+            except Exception as e:
+                for req in batch:
+                    req.error = e
+            finally:
+                self.batches += 1
+                self.chunks += len(batch)
+                for req in batch:
+                    req.done.set()
+
+    def close(self):
+        """Stop the inference thread once nothing is pending (e.g. when its model is evicted)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "batch_size": self.batch_size,
+            "max_wait_ms": round(self.max_wait * 1000),
+            "batches": self.batches,
+            "chunks": self.chunks,
+            "avg_batch_fill": round(self.chunks / self.batches, 2) if self.batches else None,
+            "pending_chunks": pending,
+        }
+
+
+class ScheduledPipeline(BatchedInferencePipeline):
+    """Per-job batched pipeline whose forward() goes through the shared scheduler."""
+
+    def __init__(self, model, scheduler):
+        super().__init__(model)
+        self.scheduler = scheduler
+
+    def forward(self, features, tokenizer, chunks_metadata, options):
+        return self.scheduler.run_chunks(id(self), features, tokenizer, chunks_metadata, options)
@@ -0,0 +1,213 @@
+# app/jobs.py
+"""
+jobs.py
+----------------------------------
+Background transcription jobs for the Flask app.
+
+Uploads create a Job; a fixed pool of inference worker threads takes jobs
+from a bounded queue and runs them, appending segments as they are decoded.
+SSE requests only subscribe to a job's segments, so the number of concurrent
+model calls is capped at `workers` no matter how many clients are connected.
+When the queue is full, submit() raises QueueFullError with a retry hint.
+"""
+
+import math
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+JOB_TTL_SEC = 600   # finished jobs stay subscribable this long
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Transcription queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """One transcription request and the segments produced so far."""
+
+    def __init__(self, filepath, options=None):
+        self.id = uuid.uuid4().hex
+        self.filepath = filepath
+        self.options = options or {}
+        self.cached = False
+        self.status = "queued"      # queued -> running -> done | error
+        self.segments = []
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "error")
+
+    def _set(self, **fields):
+        with self.cond:
+            for k, v in fields.items():
+                setattr(self, k, v)
+            self.cond.notify_all()
+
+    def add_segment(self, segment):
+        with self.cond:
+            self.segments.append(segment)
+            self.cond.notify_all()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "cached": self.cached,
+            "segments": len(self.segments),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Bounded job queue served by a fixed pool of inference threads.
+
+    transcribe_fn(job) must yield segment dicts ({"start", "end", "text"}).
+    on_finish(job), if given, is called by the worker once a job is done or failed.
+    """
+
+    def __init__(self, transcribe_fn, workers=1, max_queue=8, on_finish=None):
+        self.transcribe_fn = transcribe_fn
+        self.on_finish = on_finish
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()   # id -> Job (insertion order == submit order)
+        self._lock = threading.Lock()
+        self._avg_job_sec = None     # EMA of job run time, for retry hints
+        self.running = 0
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True).start()
+
+    # --- submission / lookup ---
+    def submit(self, filepath, **options):
+        self._purge()
+        job = Job(filepath, options)
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError(self.retry_after()) from None
+            self._jobs[job.id] = job
+        return job
+
+    def add_completed(self, filepath, segments, **options):
+        """Register an already-finished job (e.g. a transcript cache hit) without queueing it."""
+        self._purge()
+        job = Job(filepath, options)
+        now = time.time()
+        job.segments = list(segments)
+        job.cached = True
+        job.status, job.started_at, job.finished_at = "done", now, now
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id) if job_id else None
+
+    def queued_jobs(self):
+        return [j for j in list(self._jobs.values()) if j.status == "queued"]
+
+    def position(self, job):
+        """1-based position among queued jobs; 0 once running or finished."""
+        if job.status != "queued":
+            return 0
+        for i, j in enumerate(self.queued_jobs(), start=1):
+            if j is job:
+                return i
+        return 0
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely free: roughly one job's run time per worker."""
+        per_job = self._avg_job_sec or 5.0
+        return max(1, math.ceil(per_job / max(1, self.workers)))
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "jobs_tracked": len(self._jobs),
+            "avg_job_sec": round(self._avg_job_sec, 3) if self._avg_job_sec else None,
+        }
+
+    def _purge(self):
+        cutoff = time.time() - JOB_TTL_SEC
+        with self._lock:
+            for job_id in [i for i, j in self._jobs.items() if j.finished and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+    # --- subscription ---
+    def subscribe(self, job, poll=1.0):
+        """
+        Yield ("queue", position) while waiting, ("segment", seg) for every
+        segment in order, then ("done", None) or ("error", message).
+        """
+        sent = 0
+        last_position = None
+        while True:
+            if job.status == "queued":
+                position = self.position(job)
+                if position != last_position:
+                    last_position = position
+                    yield "queue", position
+
+            with job.cond:
+                if sent >= len(job.segments) and not job.finished:
+                    job.cond.wait(timeout=poll)
+                new = job.segments[sent:]
+                status, error = job.status, job.error
+
+            for seg in new:
+                yield "segment", seg
+            sent += len(new)
+
+            if status == "done" and sent >= len(job.segments):
+                yield "done", None
+                return
+            if status == "error":
+                yield "error", error
+                return
+
+    # --- workers ---
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self.running += 1
+            job._set(status="running", started_at=time.time())
+            try:
+                for seg in self.transcribe_fn(job):
+                    job.add_segment(seg)
+                job._set(status="done", finished_at=time.time())
+            except Exception as e:
+                job._set(status="error", error=str(e), finished_at=time.time())
+            finally:
+                took = time.time() - job.started_at
+                with self._lock:
+                    self.running -= 1
+                    self._avg_job_sec = took if self._avg_job_sec is None else 0.8 * self._avg_job_sec + 0.2 * took
+                self._queue.task_done()
+                if self.on_finish is not None:
+                    try:
+                        self.on_finish(job)
+                    except Exception as e:   # a failing hook must not take the worker thread down
+                        print(f"⚠️ on_finish hook failed for job {job.id}: {type(e).__name__}: {e}")
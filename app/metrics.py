@@ -0,0 +1,199 @@
+# app/metrics.py
+"""
+metrics.py
+----------------------------------
+In-process metrics in the Prometheus text exposition format, for /metrics.
+
+Counters, gauges and histograms are plain Python objects updated on the hot
+path with one lock and a dict lookup (histograms add a bisect into the fixed
+bucket list); nothing is computed until a scrape renders the registry.
+Values that already live elsewhere (queue depth, model pool, process RSS)
+are read at scrape time through callback gauges instead of being mirrored.
+
+    registry = MetricsRegistry()
+    jobs_total = registry.counter("asr_jobs_total", "Jobs by outcome.", ["outcome"])
+    jobs_total.inc(outcome="done")
+    latency = registry.histogram("asr_job_latency_seconds", "Submit to finish.", buckets=(1, 5, 30))
+    latency.observe(2.4)
+    registry.gauge("asr_queue_depth", "Queued jobs.", fn=lambda: queue.qsize())
+    registry.render()   # text/plain; version=0.0.4
+"""
+
+import bisect
+import os
+import threading
+import time
+
+import psutil
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-second first segments up to multi-minute long-audio jobs
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self):
+        """[(suffix, label_values, extra_labels, value), ...] for rendering."""
+        with self._lock:
+            return [("", key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonic count; fn, if given, is read at scrape time instead (value or {label tuple: value})."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=(), fn=None):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.fn is None:
+            return super().samples()
+        return _callback_samples(self.fn())
+
+
+class Gauge(Counter):
+    """Current value; set()/inc()/dec(), or fn read at scrape time."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+def _callback_samples(result):
+    if isinstance(result, dict):
+        return [("", key if isinstance(key, tuple) else (key,), None, value) for key, value in result.items()]
+    return [("", (), None, result)]
+
+
+class Histogram(Metric):
+    """Observations counted into fixed cumulative buckets, plus their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(key, list(counts), total, n) for key, (counts, total, n) in self._values.items()]
+        out = []
+        for key, counts, total, n in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                out.append(("_bucket", key, [("le", _number(float(bound)))], cumulative))
+            out.append(("_sum", key, None, total))
+            out.append(("_count", key, None, n))
+        return out
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=(), fn=None):
+        return self._register(Counter(name, help_text, labelnames, fn))
+
+    def gauge(self, name, help_text, labelnames=(), fn=None):
+        return self._register(Gauge(name, help_text, labelnames, fn))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def register_process_metrics(registry):
+    """Standard process_* metrics (RSS, CPU seconds, threads, start time), read at scrape time."""
+    process = psutil.Process(os.getpid())
+    registry.gauge("process_resident_memory_bytes", "Resident memory size in bytes.",
+                   fn=lambda: process.memory_info().rss)
+    registry.counter("process_cpu_seconds_total", "Total user and system CPU time spent in seconds.",
+                     fn=lambda: sum(process.cpu_times()[:2]))
+    registry.gauge("process_threads", "Number of OS threads in the process.", fn=process.num_threads)
+    registry.gauge("process_start_time_seconds", "Start time of the process since unix epoch in seconds.",
+                   fn=lambda: process.create_time())
+    registry.gauge("process_uptime_seconds", "Seconds since the process started.",
+                   fn=lambda: time.time() - process.create_time())
@@ -0,0 +1,189 @@
+# app/model_pool.py
+"""
+model_pool.py
+----------------------------------
+On-demand pool of models keyed by (size, compute_type) under a RAM budget.
+
+A model is loaded the first time a request asks for it and stays resident
+while the pool's total footprint fits in `budget_bytes`. When a new load
+would exceed the budget, idle models are evicted least-recently-used first.
+Models currently in use (see `use()`) are never evicted; if only busy models
+are left, the new one is loaded over budget (counted in the stats) and the
+pool shrinks back once models are released.
+
+Footprint per model = resident-memory growth measured during its load, or
+the parameter-count estimate if that is larger (GPU loads barely move host
+RSS). Loads are serialized, so two large models never load at once.
+"""
+
+import gc
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+from code import tracing
+
+# Parameter counts of the Whisper checkpoints
+MODEL_PARAMS = {
+    "tiny": 39e6, "base": 74e6, "small": 244e6, "medium": 769e6,
+    "large-v1": 1550e6, "large-v2": 1550e6, "large-v3": 1550e6, "large": 1550e6,
+    "large-v3-turbo": 809e6, "turbo": 809e6, "distil-large-v3": 756e6,
+}
+BYTES_PER_WEIGHT = {
+    "float32": 4, "float16": 2, "bfloat16": 2,
+    "int8_float32": 1, "int8_float16": 1, "int8_bfloat16": 1, "int8": 1,
+}
+RUNTIME_OVERHEAD = 1.25   # buffers, vocab, allocator slack
+
+
+def estimate_bytes(size, compute_type):
+    params = MODEL_PARAMS.get(size.removesuffix(".en"), MODEL_PARAMS["large-v3"])
+    return int(params * BYTES_PER_WEIGHT.get(compute_type, 4) * RUNTIME_OVERHEAD)
+
+
+class PooledModel:
+    """One resident model plus its bookkeeping."""
+
+    def __init__(self, key, model, size_bytes, load_time):
+        self.key = key
+        self.model = model
+        self.size_bytes = size_bytes
+        self.load_time = load_time
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+        self.in_use = 0
+
+    def to_dict(self):
+        size, compute_type = self.key
+        return {
+            "size": size,
+            "compute_type": compute_type,
+            "size_mb": round(self.size_bytes / 2**20, 1),
+            "load_time_sec": round(self.load_time, 3),
+            "loaded_at": self.loaded_at,
+            "last_used": self.last_used,
+            "uses": self.uses,
+            "in_use": self.in_use,
+        }
+
+
+class ModelPool:
+    """
+    loader(size, compute_type) returns the object handed out by use();
+    unloader(obj), if given, releases anything it owns before it is dropped.
+    """
+
+    def __init__(self, loader, budget_bytes, unloader=None):
+        self.loader = loader
+        self.unloader = unloader
+        self.budget_bytes = budget_bytes
+        self._models = {}                     # (size, compute_type) -> PooledModel
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.over_budget_loads = 0
+
+    @property
+    def used_bytes(self):
+        return sum(m.size_bytes for m in self._models.values())
+
+    # --- access ---
+    @contextmanager
+    def use(self, size, compute_type):
+        """Pin the (size, compute_type) model for the duration of the block, loading it if needed."""
+        entry = self._acquire((size, compute_type))
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+                self._evict_for(0)   # settle an over-budget load once models go idle
+
+    def preload(self, size, compute_type):
+        with self.use(size, compute_type):
+            pass
+
+    def _pin(self, key):
+        entry = self._models.get(key)
+        if entry is not None:
+            entry.in_use += 1
+            entry.uses += 1
+            entry.last_used = time.time()
+        return entry
+
+    def _acquire(self, key):
+        with self._lock:
+            entry = self._pin(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+
+        with self._load_lock:
+            with self._lock:
+                entry = self._pin(key)   # loaded by another request while we waited
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+                self._evict_for(estimate_bytes(*key))
+
+            print(f"🔥 Loading Faster-Whisper model '{key[0]}' ({key[1]}) into the pool...")
+            rss_before = psutil.Process().memory_info().rss
+            start = time.perf_counter()
+            with tracing.span("load_model", model=key[0], compute_type=key[1]):
+                model = self.loader(*key)
+            load_time = time.perf_counter() - start
+            measured = psutil.Process().memory_info().rss - rss_before
+            entry = PooledModel(key, model, max(measured, estimate_bytes(*key)), load_time)
+
+            with self._lock:
+                self.loads += 1
+                self._models[key] = entry
+                self._evict_for(0, keep=key)
+                if self.used_bytes > self.budget_bytes:
+                    self.over_budget_loads += 1
+                    print(f"⚠️ Model pool over budget: {self.used_bytes / 2**20:.0f} MB "
+                          f"> {self.budget_bytes / 2**20:.0f} MB (remaining models are busy)")
+                return self._pin(key)
+
+    def _evict_for(self, incoming_bytes, keep=None):
+        """Evict idle models, least recently used first, until incoming_bytes fits (lock held)."""
+        idle = sorted((m for m in self._models.values() if not m.in_use and m.key != keep),
+                      key=lambda m: m.last_used)
+        evicted = False
+        for entry in idle:
+            if self.used_bytes + incoming_bytes <= self.budget_bytes:
+                break
+            del self._models[entry.key]
+            self.evictions += 1
+            evicted = True
+            print(f"♻️ Evicted model '{entry.key[0]}' ({entry.key[1]}) from the pool")
+            if self.unloader is not None:
+                self.unloader(entry.model)
+        if evicted:
+            gc.collect()
+
+    def resident(self):
+        """Snapshot of (key, model) for every resident model."""
+        with self._lock:
+            return [(key, entry.model) for key, entry in self._models.items()]
+
+    def stats(self):
+        with self._lock:
+            loaded = sorted((m.to_dict() for m in self._models.values()),
+                            key=lambda m: m["last_used"], reverse=True)
+            used = self.used_bytes
+        return {
+            "budget_mb": round(self.budget_bytes / 2**20, 1),
+            "used_mb": round(used / 2**20, 1),
+            "loaded": loaded,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "over_budget_loads": self.over_budget_loads,
+        }
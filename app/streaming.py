@@ -0,0 +1,174 @@
+# app/streaming.py
+"""
+streaming.py
+----------------------------------
+Incremental transcription of a live 16 kHz PCM stream.
+
+Audio frames are appended to a rolling buffer. Every `step_sec` of new audio
+the trailing buffer (at most `window_sec`) is re-decoded with word
+timestamps. Words are committed once they are stable across two consecutive
+decodes (longest common prefix, "local agreement"); the rest is sent as a
+partial hypothesis. The buffer is trimmed at the last committed word so each
+decode stays bounded.
+
+For every committed word we record end-to-end latency: wall time of the
+commit minus the wall time the audio containing the end of that word
+arrived.
+"""
+
+import re
+import time
+
+import numpy as np
+
+from code import tracing
+
+SAMPLE_RATE = 16000
+
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class StreamingTranscriber:
+
+    def __init__(self, model, window_sec=15.0, step_sec=1.0, decode_options=None, prompt_chars=200):
+        self.model = model
+        self.window_sec = window_sec
+        self.step_sec = step_sec
+        self.decode_options = decode_options or {}
+        self.prompt_chars = prompt_chars
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0.0        # stream time (s) of buffer[0]
+        self.received = 0               # total samples received
+        self.pending = 0                # samples since the last decode
+        self.arrivals = []              # (stream_end_sample, wall_time) per frame
+        self.committed = []             # [{"word", "start", "end", "latency_ms"}]
+        self.hypothesis = []            # uncommitted words from the previous decode
+        self.decodes = 0
+        self.decode_time = 0.0
+
+    # --- input ---
+    def push(self, frame):
+        """
+        Add PCM samples (int16 bytes or float32 array). Returns a list of events
+        ({"type": "partial" | "committed", ...}) produced by this frame.
+        """
+        if isinstance(frame, (bytes, bytearray)):
+            frame = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768.0
+        self.buffer = np.concatenate([self.buffer, frame])
+        self.received += len(frame)
+        self.pending += len(frame)
+        self.arrivals.append((self.received, time.time()))
+
+        if self.pending < self.step_sec * SAMPLE_RATE:
+            return []
+        self.pending = 0
+        return self._step(final=False)
+
+    def finish(self):
+        """Decode what's left and commit everything."""
+        if not len(self.buffer):
+            return []
+        return self._step(final=True)
+
+    # --- decoding ---
+    def _decode(self):
+        prompt = " ".join(w["word"] for w in self.committed)[-self.prompt_chars:] or None
+        start = time.perf_counter()
+        with tracing.span("live_decode", window_sec=round(len(self.buffer) / SAMPLE_RATE, 2)):
+            segments, _ = self.model.transcribe(
+                self.buffer, word_timestamps=True, initial_prompt=prompt, **self.decode_options)
+            words = []
+            for seg in segments:
+                for w in seg.words or []:
+                    words.append({"word": w.word.strip(),
+                                  "start": round(self.buffer_offset + w.start, 3),
+                                  "end": round(self.buffer_offset + w.end, 3)})
+        self.decodes += 1
+        self.decode_time += time.perf_counter() - start
+        # ignore anything that overlaps already-committed audio
+        last_end = self.committed[-1]["end"] if self.committed else 0.0
+        return [w for w in words if w["word"] and w["start"] >= last_end - 0.05]
+
+    def _arrival_time(self, stream_sec):
+        target = stream_sec * SAMPLE_RATE
+        for end_sample, wall in self.arrivals:
+            if end_sample >= target:
+                return wall
+        return self.arrivals[-1][1] if self.arrivals else time.time()
+
+    def _commit(self, words):
+        now = time.time()
+        out = []
+        for w in words:
+            w = dict(w, latency_ms=round((now - self._arrival_time(w["end"])) * 1000, 1))
+            self.committed.append(w)
+            out.append(w)
+        return out
+
+    def _step(self, final):
+        words = self._decode()
+
+        if final:
+            newly = self._commit(words)
+            self.hypothesis = []
+        else:
+            # local agreement: commit the common prefix of the last two hypotheses
+            n = 0
+            while (n < len(words) and n < len(self.hypothesis)
+                   and _norm(words[n]["word"]) == _norm(self.hypothesis[n]["word"])):
+                n += 1
+            newly = self._commit(words[:n])
+            self.hypothesis = words[n:]
+
+        newly += self._trim()
+        events = []
+        if newly:
+            events.append({
+                "type": "committed",
+                "words": newly,
+                "text": " ".join(w["word"] for w in self.committed),
+            })
+        events.append({"type": "partial", "text": " ".join(w["word"] for w in self.hypothesis)})
+        return events
+
+    def _trim(self):
+        """
+        Drop audio before the last committed word and hard-cap the buffer at
+        window_sec. Uncommitted words pushed out by the cap are force-committed
+        (and returned) rather than lost.
+        """
+        forced = []
+        cut = self.committed[-1]["end"] if self.committed else self.buffer_offset
+        overflow = (self.buffer_offset + len(self.buffer) / SAMPLE_RATE) - self.window_sec
+        if overflow > cut:
+            forced = self._commit([w for w in self.hypothesis if w["start"] < overflow])
+            self.hypothesis = [w for w in self.hypothesis if w["start"] >= overflow]
+            cut = max(overflow, forced[-1]["end"] if forced else overflow)
+        drop = int((cut - self.buffer_offset) * SAMPLE_RATE)
+        if drop > 0:
+            self.buffer = self.buffer[drop:]
+            self.buffer_offset += drop / SAMPLE_RATE
+        # arrivals older than the buffer are no longer needed
+        keep_from = int(self.buffer_offset * SAMPLE_RATE)
+        while len(self.arrivals) > 1 and self.arrivals[0][0] < keep_from:
+            self.arrivals.pop(0)
+        return forced
+
+    # --- reporting ---
+    def stats(self):
+        lat = sorted(w["latency_ms"] for w in self.committed)
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else None
+        audio_sec = self.received / SAMPLE_RATE
+        return {
+            "audio_sec": round(audio_sec, 2),
+            "committed_words": len(self.committed),
+            "decodes": self.decodes,
+            "decode_rtf": round(self.decode_time / audio_sec, 4) if audio_sec else None,
+            "latency_ms_p50": pct(0.5),
+            "latency_ms_p95": pct(0.95),
+            "window_sec": self.window_sec,
+            "step_sec": self.step_sec,
+        }
@@ -0,0 +1,99 @@
+# app/transcript_cache.py
+"""
+transcript_cache.py
+----------------------------------
+Persistent, content-addressed transcript cache (SQLite).
+
+Key = SHA-256 of {audio content hash, model name, compute type, decode
+options}, so re-uploading the same recording with the same settings replays
+the stored segments instead of running the model again. Entries are evicted
+least-recently-used first once the stored segments exceed `max_bytes`.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class TranscriptCache:
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                key TEXT PRIMARY KEY,
+                segments TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_access ON transcripts(last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(audio_hash, model_name, compute_type, options):
+        payload = json.dumps({"audio": audio_hash, "model": model_name,
+                              "compute_type": compute_type, "options": options}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Stored segment list for `key`, or None (counts a hit/miss)."""
+        with self._lock:
+            row = self._db.execute("SELECT segments FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE transcripts SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, segments):
+        blob = json.dumps(segments, ensure_ascii=False)
+        size = len(blob.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO transcripts (key, segments, size_bytes, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)", (key, blob, size, now, now))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM transcripts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+                "SELECT key, size_bytes FROM transcripts ORDER BY last_access ASC").fetchall():
+            self._db.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM transcripts").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+        }
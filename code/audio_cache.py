@@ -0,0 +1,116 @@
+# code/audio_cache.py
+"""
+audio_cache.py
+----------------------------------
+Shared decoded-PCM cache.
+
+Every file is decoded once with FFmpeg to 16 kHz mono float32 (the format all
+Whisper variants consume) and stored as a `.npy` file keyed by the file's
+content hash and the target format. Later reads — from any backend, any
+worker process, or a later sweep — memory-map the same array instead of
+decoding again.
+
+Cache location: $PCM_CACHE_DIR, default results/cache/pcm.
+"""
+
+import os
+import hashlib
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CACHE_DIR = BASE_DIR / "results" / "cache" / "pcm"
+SAMPLE_RATE = 16000
+
+# (path, size, mtime_ns) -> sha256, so a file is hashed once per process
+_hash_memo = {}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of the file's bytes (memoized on path/size/mtime)."""
+    stat = os.stat(path)
+    memo_key = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _hash_memo[memo_key] = digest
+    return digest
+
+
+def decode_pcm(path, sample_rate=SAMPLE_RATE):
+    """Decode any FFmpeg-readable file to mono float32 PCM in [-1, 1]."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", str(path),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode {path}: {e.stderr.decode(errors='ignore')[-500:]}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+class PCMCache:
+    """Content-addressed store of decoded PCM arrays as memory-mapped .npy files."""
+
+    def __init__(self, cache_dir=None, sample_rate=SAMPLE_RATE):
+        self.cache_dir = Path(cache_dir or os.environ.get("PCM_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.sample_rate = sample_rate
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path):
+        return f"{file_hash(path)}_{self.sample_rate}hz_mono_f32"
+
+    def path_for(self, path):
+        return self.cache_dir / f"{self.key(path)}.npy"
+
+    def load(self, path):
+        """Return the file's PCM as a read-only memory-mapped float32 array."""
+        npy_path = self.path_for(path)
+        if npy_path.exists():
+            self.hits += 1
+        else:
+            self.misses += 1
+            pcm = decode_pcm(path, self.sample_rate)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # write-then-rename so concurrent workers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".npy.tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, pcm)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, npy_path)
+        return np.load(npy_path, mmap_mode="r")
+
+    def duration(self, path):
+        return len(self.load(path)) / self.sample_rate
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        for p in self.cache_dir.glob("*.npy"):
+            p.unlink()
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Process-wide PCMCache (created lazily so $PCM_CACHE_DIR is honoured in workers)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PCMCache()
+    return _default_cache
+
+
+def load_pcm(path):
+    """Decoded 16 kHz mono float32 PCM for `path`, shared through the default cache."""
+    return get_cache().load(path)
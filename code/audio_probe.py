@@ -0,0 +1,409 @@
+# code/audio_probe.py
+"""
+audio_probe.py
+----------------------------------
+Header-only audio metadata probe.
+
+Reads duration, sample rate, channels and codec straight from container
+headers instead of decoding the whole file:
+- WAV  : RIFF `fmt ` / `data` chunks
+- MP3  : ID3v2 skip, frame header, Xing/Info/VBRI frame count; otherwise a
+         bounded frame scan (CBR detection / VBR average frame size)
+- M4A/MP4 : `moov` atoms (mdhd of the sound track, mp4a sample entry)
+- FLAC : STREAMINFO block
+Anything else falls back to `ffprobe` (still header-level, no decode).
+
+Files that don't parse as audio (random bytes, text renamed to .mp3, ...)
+raise AudioProbeError, so uploads can be rejected before any model work.
+Results are cached by file content hash.
+"""
+
+import os
+import json
+import struct
+import subprocess
+from collections import OrderedDict
+
+from code.audio_cache import file_hash
+
+MP3_SCAN_MAX_FRAMES = 2000          # bounded fallback scan for VBR MP3s without a Xing header
+MP3_SYNC_SEARCH_BYTES = 64 * 1024   # how far past the tags we look for the first frame
+MP3_MIN_CHAINED_FRAMES = 3          # consecutive valid frames required to accept a sync
+PROBE_CACHE_SIZE = 1024
+
+
+class AudioProbeError(ValueError):
+    """Raised when a file is not readable audio (corrupt, fake, or unsupported)."""
+
+
+def _info(container, codec, sample_rate, channels, duration, bit_rate=None, exact=True):
+    return {
+        "container": container,
+        "codec": codec,
+        "sample_rate": int(sample_rate),
+        "channels": int(channels),
+        "duration_sec": round(float(duration), 3),
+        "bit_rate": int(bit_rate) if bit_rate else None,
+        "exact": exact,   # False when duration is estimated (CBR/VBR scan)
+    }
+
+
+# ---------------------- WAV ----------------------
+
+WAV_CODECS = {1: "pcm", 3: "pcm_float", 6: "alaw", 7: "mulaw", 0xFFFE: "pcm_extensible"}
+
+
+def _probe_wav(f, size):
+    f.seek(12)
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, chunk_size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+            f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise AudioProbeError("WAV data chunk before fmt chunk")
+            fmt_tag, channels, sample_rate, byte_rate, _, bits = fmt
+            data_size = min(chunk_size, size - f.tell())   # streamed WAVs may store 0xFFFFFFFF
+            if not byte_rate:
+                raise AudioProbeError("WAV header has zero byte rate")
+            codec = WAV_CODECS.get(fmt_tag, f"wav_0x{fmt_tag:04x}")
+            if codec.startswith("pcm") and bits:
+                codec = f"{codec}_{bits}bit"
+            return _info("wav", codec, sample_rate, channels, data_size / byte_rate, byte_rate * 8)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), 1)
+    raise AudioProbeError("WAV file has no data chunk")
+
+
+# ---------------------- MP3 ----------------------
+
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+_MP3_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+_MP3_LAYERS = {1: 3, 2: 2, 3: 1}
+
+
+def _parse_mp3_header(b):
+    """Parse a 4-byte MPEG audio frame header; None if it isn't one."""
+    if len(b) < 4 or b[0] != 0xFF or (b[1] & 0xE0) != 0xE0:
+        return None
+    version = _MP3_VERSIONS.get((b[1] >> 3) & 3)
+    layer = _MP3_LAYERS.get((b[1] >> 1) & 3)
+    bitrate_idx = (b[2] >> 4) & 0xF
+    sr_idx = (b[2] >> 2) & 3
+    if version is None or layer is None or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_idx] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sr_idx]
+    padding = (b[2] >> 1) & 1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 576 if (layer == 3 and version != 1) else 1152
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        "version": version, "layer": layer, "bitrate": bitrate, "sample_rate": sample_rate,
+        "samples": samples, "length": length, "channels": 1 if (b[3] >> 6) == 3 else 2,
+    }
+
+
+def _find_mp3_sync(data, start):
+    """First offset >= start where MP3_MIN_CHAINED_FRAMES consistent frames follow each other."""
+    pos = data.find(b"\xff", start)
+    while pos != -1:
+        first = _parse_mp3_header(data[pos:pos + 4])
+        if first:
+            ok, nxt = True, pos
+            for _ in range(MP3_MIN_CHAINED_FRAMES):
+                h = _parse_mp3_header(data[nxt:nxt + 4])
+                if not h or h["sample_rate"] != first["sample_rate"] or h["layer"] != first["layer"]:
+                    ok = False
+                    break
+                nxt += h["length"]
+                if nxt >= len(data):
+                    break
+            if ok:
+                return pos, first
+        pos = data.find(b"\xff", pos + 1)
+    return None, None
+
+
+def _probe_mp3(f, size):
+    head = f.read(10)
+    start = 0
+    if head[:3] == b"ID3":
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    end = size
+    if size >= 128:
+        f.seek(size - 128)
+        if f.read(3) == b"TAG":
+            end -= 128
+
+    f.seek(start)
+    window = f.read(MP3_SYNC_SEARCH_BYTES)
+    offset, first = _find_mp3_sync(window, 0)
+    if first is None:
+        raise AudioProbeError("No MPEG audio frames found")
+    frame_start = start + offset
+    frame = window[offset:offset + first["length"]]
+
+    # Xing / Info header (LAME VBR & CBR) sits after the side info of the first frame
+    if first["version"] == 1:
+        side = 17 if first["channels"] == 1 else 32
+    else:
+        side = 9 if first["channels"] == 1 else 17
+    xing = frame[4 + side:4 + side + 12]
+    frames = None
+    if xing[:4] in (b"Xing", b"Info") and len(xing) >= 12 and struct.unpack(">I", xing[4:8])[0] & 1:
+        frames = struct.unpack(">I", xing[8:12])[0]
+    elif frame[36:40] == b"VBRI" and len(frame) >= 54:
+        frames = struct.unpack(">I", frame[50:54])[0]
+
+    codec = f"mp{first['layer']}"
+    audio_bytes = end - frame_start
+    if frames:
+        duration = frames * first["samples"] / first["sample_rate"]
+        return _info("mp3", codec, first["sample_rate"], first["channels"], duration,
+                     audio_bytes * 8 / duration if duration else None)
+
+    # --- bounded fallback scan: CBR if every scanned frame shares a bitrate, else average size ---
+    f.seek(frame_start)
+    pos, scanned, total_len, bitrates = frame_start, 0, 0, set()
+    while scanned < MP3_SCAN_MAX_FRAMES and pos < end:
+        h = _parse_mp3_header(f.read(4))
+        if not h:
+            break
+        scanned += 1
+        total_len += h["length"]
+        bitrates.add(h["bitrate"])
+        pos += h["length"]
+        f.seek(pos)
+    if not scanned:
+        raise AudioProbeError("Corrupt MPEG audio stream")
+    reached_end = pos >= end
+    if reached_end:
+        frames = scanned
+    elif len(bitrates) == 1:
+        frames = audio_bytes / first["length"]   # CBR
+    else:
+        frames = audio_bytes / (total_len / scanned)
+    duration = frames * first["samples"] / first["sample_rate"]
+    avg_bitrate = total_len * 8 * first["sample_rate"] / (scanned * first["samples"])
+    return _info("mp3", codec, first["sample_rate"], first["channels"], duration, avg_bitrate,
+                 exact=reached_end)
+
+
+# ---------------------- MP4 / M4A ----------------------
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _iter_atoms(data, start=0, end=None):
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise AudioProbeError("Corrupt MP4 atom")
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _read_moov(f, size):
+    """Seek through top-level atoms (skipping mdat) and return the moov payload."""
+    pos = 0
+    while pos + 8 <= size:
+        f.seek(pos)
+        atom_size, kind = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if atom_size == 1:
+            atom_size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif atom_size == 0:
+            atom_size = size - pos
+        if atom_size < header:
+            break
+        if kind == b"moov":
+            return f.read(atom_size - header)
+        pos += atom_size
+    raise AudioProbeError("MP4 file has no moov atom")
+
+
+def _probe_mp4(f, size):
+    moov = _read_moov(f, size)
+    movie_duration = None
+    audio = None
+
+    def walk(start, end, track):
+        nonlocal movie_duration, audio
+        for kind, body, stop in _iter_atoms(moov, start, end):
+            if kind == b"mvhd":
+                v = moov[body]
+                timescale, duration = (struct.unpack(">IQ", moov[body + 20:body + 32]) if v == 1
+                                       else struct.unpack(">II", moov[body + 12:body + 20]))
+                if timescale:
+                    movie_duration = duration / timescale
+            elif kind == b"trak":
+                t = {}
+                walk(body, stop, t)
+                if t.get("handler") == b"soun" and audio is None:
+                    audio = t
+            elif kind in _MP4_CONTAINERS:
+                walk(body, stop, track)
+            elif kind == b"hdlr":
+                track["handler"] = moov[body + 8:body + 12]
+            elif kind == b"mdhd":
+                v = moov[body]
+                timescale, duration = (struct.unpack(">IQ", moov[body + 20:body + 32]) if v == 1
+                                       else struct.unpack(">II", moov[body + 12:body + 20]))
+                if timescale:
+                    track["duration"] = duration / timescale
+                    track["timescale"] = timescale
+            elif kind == b"stsd":
+                entry = body + 8   # version/flags + entry count
+                fmt = moov[entry + 4:entry + 8]
+                track["codec"] = {b"mp4a": "aac", b"alac": "alac", b"Opus": "opus", b"fLaC": "flac",
+                                  b"ac-3": "ac3", b".mp3": "mp3"}.get(fmt, fmt.decode("latin-1").strip())
+                sample = entry + 8 + 8   # sample entry header + reserved/data_ref_index
+                channels, _ = struct.unpack(">HH", moov[sample + 8:sample + 12])
+                sr = struct.unpack(">I", moov[sample + 16:sample + 20])[0] >> 16
+                track["channels"] = channels
+                track["sample_rate"] = sr or track.get("timescale")
+
+    walk(0, len(moov), {})
+    if audio is None:
+        raise AudioProbeError("MP4 file has no audio track")
+    duration = audio.get("duration") or movie_duration
+    if not duration:
+        raise AudioProbeError("MP4 audio track has no duration")
+    return _info("mp4", audio.get("codec", "unknown"), audio.get("sample_rate") or audio.get("timescale", 0),
+                 audio.get("channels", 0), duration, size * 8 / duration)
+
+
+# ---------------------- FLAC ----------------------
+
+def _probe_flac(f, size):
+    header = f.read(4)
+    if len(header) < 4 or header[0] & 0x7F != 0:
+        raise AudioProbeError("FLAC file has no STREAMINFO block")
+    info = f.read(34)
+    if len(info) < 34:
+        raise AudioProbeError("Truncated FLAC STREAMINFO")
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        raise AudioProbeError("FLAC STREAMINFO has no sample count")
+    duration = total_samples / sample_rate
+    return _info("flac", "flac", sample_rate, channels, duration, size * 8 / duration)
+
+
+# ---------------------- ffprobe fallback ----------------------
+
+def _probe_ffprobe(path):
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries",
+           "stream=codec_name,sample_rate,channels:format=format_name,duration,bit_rate",
+           "-of", "json", str(path)]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except FileNotFoundError:
+        raise AudioProbeError("Unsupported audio container (ffprobe not available)")
+    except subprocess.CalledProcessError as e:
+        raise AudioProbeError(f"ffprobe could not read file: {e.stderr.decode(errors='ignore').strip()[-200:]}")
+    data = json.loads(out or b"{}")
+    streams = data.get("streams") or []
+    fmt = data.get("format") or {}
+    if not streams or not fmt.get("duration"):
+        raise AudioProbeError("No audio stream found")
+    s = streams[0]
+    return _info(fmt.get("format_name", "unknown").split(",")[0], s.get("codec_name", "unknown"),
+                 s.get("sample_rate", 0), s.get("channels", 0), float(fmt["duration"]), fmt.get("bit_rate"))
+
+
+# ---------------------- public API ----------------------
+
+def _probe_uncached(path):
+    try:
+        return _probe_headers(path)
+    except (struct.error, IndexError, ValueError) as e:
+        if isinstance(e, AudioProbeError):
+            raise
+        raise AudioProbeError(f"Corrupt audio header: {e}") from e
+
+
+def _probe_headers(path):
+    size = os.path.getsize(path)
+    if size == 0:
+        raise AudioProbeError("Empty file")
+    with open(path, "rb") as f:
+        magic = f.read(12)
+        f.seek(0)
+        if magic[:4] == b"RIFF" and magic[8:12] == b"WAVE":
+            info = _probe_wav(f, size)
+        elif magic[4:8] == b"ftyp":
+            info = _probe_mp4(f, size)
+        elif magic[:4] == b"fLaC":
+            f.seek(4)
+            info = _probe_flac(f, size)
+        elif magic[:3] == b"ID3" or _parse_mp3_header(magic[:4]) or str(path).lower().endswith(".mp3"):
+            info = _probe_mp3(f, size)
+        else:
+            info = _probe_ffprobe(path)
+
+    if info["duration_sec"] <= 0:
+        raise AudioProbeError("Audio has zero duration")
+    if not (1000 <= info["sample_rate"] <= 384000) or not (1 <= info["channels"] <= 32):
+        raise AudioProbeError(f"Implausible audio header: {info['sample_rate']} Hz, {info['channels']} ch")
+    return info
+
+
+_probe_cache = OrderedDict()   # content hash -> info dict or AudioProbeError
+
+
+def probe_audio(path, use_cache=True):
+    """
+    Return {"container", "codec", "sample_rate", "channels", "duration_sec",
+    "bit_rate", "exact"} from headers only. Raises AudioProbeError for
+    corrupt or non-audio files. Results (including failures) are cached by
+    file content hash.
+    """
+    if not use_cache:
+        return _probe_uncached(path)
+
+    key = file_hash(path)
+    cached = _probe_cache.get(key)
+    if cached is None:
+        try:
+            cached = _probe_uncached(path)
+        except AudioProbeError as e:
+            cached = e
+        _probe_cache[key] = cached
+        if len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    else:
+        _probe_cache.move_to_end(key)
+
+    if isinstance(cached, AudioProbeError):
+        raise cached
+    return dict(cached)
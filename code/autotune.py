@@ -0,0 +1,329 @@
+# code/autotune.py
+"""
+autotune.py
+----------------------------------
+Decode-parameter sweep that finds the speed / accuracy Pareto frontier.
+
+Every trial is one setting of the search space (beam size, compute type,
+cpu_threads / num_workers, VAD, chunk length, temperature fallback, ...)
+run through the normal backend interface and benchmark harness over an
+audio set with ground truth. For each trial it records:
+- RTF : total transcription time / total audio duration
+- WER / CER : micro-averaged against ground_truth_transcripts.json
+
+Trials that are not beaten on both RTF and WER by another trial form the
+Pareto frontier; the recommended config is the fastest frontier trial whose
+WER is within `max_wer_loss` of the best WER. With --write it is written back
+into model_configs.yaml (only that backend's keys are touched, comments kept).
+
+    python -m code.autotune --backend faster-whisper --search random --trials 24
+    python -m code.autotune --backend faster-whisper --search grid \\
+        --param beam_size 1 5 --param chunk_length 10 30 --write
+
+Search-space keys that are backend config keys (compute_type, cpu_threads,
+num_workers, vad) go into the model config; anything else is passed to the
+backend as a decode option. Each backend declares the keys it applies
+(`tunable_params`); the default space is cut down to those and a --param
+the backend would ignore is rejected. Trials are grouped by the backend's
+load-time settings (`load_params`) so each model is loaded once, and every
+(file, setting) result is checkpointed in the run manifest, so an
+interrupted sweep resumes.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+from pathlib import Path
+
+import yaml
+
+from code.benchmark_harness import benchmark_file, run_once
+from code.metrics_calculator import _normalize_text
+from code.metrics_engine import score_pair, corpus_metrics
+from code.run_manifest import RunManifest
+from models.base_backend import list_audio_files
+from models.registry import load_config, create_backend, load_backend_class, CONFIG_PATH
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TASK3_DIR = BASE_DIR / "notebooks" / "task3_optimization"
+GROUND_TRUTH = TASK3_DIR / "results" / "ground_truth_transcripts.json"
+AUDIO_DIR = TASK3_DIR / "data" / "converted"
+OUTPUT_DIR = BASE_DIR / "results" / "reports" / "autotune"
+
+# faster-whisper's load-time keys; other backends declare theirs as `load_params`
+LOAD_PARAMS = ("compute_type", "cpu_threads", "num_workers")
+# search-space keys that are top-level backend config keys; the rest are decode options
+CONFIG_PARAMS = LOAD_PARAMS + ("vad",)
+
+TEMPERATURE_FALLBACK = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
+
+
+def default_space(device="cpu", cores=None, params=None):
+    """Default search space, limited to `params` (a backend's tunable_params) if given."""
+    cores = cores or os.cpu_count() or 1
+    space = {
+        "beam_size": [1, 5, 15],
+        "compute_type": ["float16", "int8_float16"] if device == "cuda" else ["int8", "float32"],
+        "cpu_threads": sorted({max(1, cores // 2), cores}),
+        "num_workers": [1],
+        "vad": [False, True],
+        "chunk_length": [10, 30],
+        "temperature": [0.0, TEMPERATURE_FALLBACK],
+    }
+    return {k: v for k, v in space.items() if params is None or k in params}
+
+
+def trials_for(space, search="grid", n_trials=None, seed=0, load_params=LOAD_PARAMS):
+    """List of {param: value} settings: the full grid, or n_trials sampled from it."""
+    keys = list(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    if search == "random" and n_trials and n_trials < len(grid):
+        grid = random.Random(seed).sample(grid, n_trials)
+    # group by load-time settings so each model is loaded once
+    return sorted(grid, key=lambda p: json.dumps([p.get(k) for k in load_params], default=str))
+
+
+def trial_config(base_cfg, params):
+    """Backend config for one trial: config keys at top level, the rest as decode options."""
+    cfg = {**base_cfg, "decode_options": dict(base_cfg.get("decode_options") or {})}
+    for key, value in params.items():
+        if key in CONFIG_PARAMS:
+            cfg[key] = value
+        else:
+            cfg["decode_options"][key] = value
+    return cfg
+
+
+def reference_key(path):
+    """Ground-truth key of an audio file (stem without _16k / _enhanced suffixes)."""
+    stem = Path(path).stem
+    return re.sub(r"_(16k|enhanced)$", "", stem)
+
+
+def load_references(path=GROUND_TRUTH):
+    with open(path, "r", encoding="utf-8") as f:
+        return {reference_key(k): _normalize_text(v) for k, v in json.load(f).items()}
+
+
+def pareto_frontier(trials):
+    """Trials not dominated on (rtf, WER), sorted by RTF. Lower is better for both."""
+    def point(t):
+        return t["rtf"], t["WER"] if t["WER"] is not None else float("inf")
+
+    frontier = []
+    for t in trials:
+        rtf, wer = point(t)
+        dominated = any(point(o)[0] <= rtf and point(o)[1] <= wer and point(o) != (rtf, wer)
+                        for o in trials)
+        if not dominated:
+            frontier.append(t)
+    return sorted(frontier, key=point)
+
+
+def recommend(frontier, max_wer_loss=0.01):
+    """Fastest frontier trial within max_wer_loss (absolute WER) of the most accurate one."""
+    scored = [t for t in frontier if t["WER"] is not None]
+    if not scored:
+        return frontier[0] if frontier else None
+    best_wer = min(t["WER"] for t in scored)
+    return min((t for t in scored if t["WER"] <= best_wer + max_wer_loss), key=lambda t: t["rtf"])
+
+
+class Autotuner:
+
+    def __init__(self, backend_name, base_cfg, audio_files, references, output_dir=OUTPUT_DIR,
+                 repeats=1, resume=True, load_params=LOAD_PARAMS):
+        self.backend_name = backend_name
+        self.base_cfg = base_cfg
+        self.audio_files = audio_files
+        self.references = references
+        self.repeats = repeats
+        self.resume = resume
+        self.load_params = load_params
+        self.manifest = RunManifest.for_output_dir(output_dir)
+        self._model = (None, None, None)   # (load key, model, load time) of the last loaded model
+
+    def _backend(self, params, cfg):
+        backend, _ = create_backend(self.backend_name, cfg)
+        key = tuple(params.get(k) for k in self.load_params)
+        if self._model[0] == key:
+            backend.model, backend.load_time = self._model[1], self._model[2]
+            return backend
+        self._model = (None, None, None)   # drop the previous model before loading the next
+        backend.load()
+        print(f"🧠 Loaded {backend.model_name} ({backend.compute_type}) in {backend.load_time:.2f}s")
+        run_once(backend, self.audio_files[0])   # untimed warm-up after each load
+        self._model = (key, backend.model, backend.load_time)
+        return backend
+
+    def run_trial(self, params):
+        cfg = trial_config(self.base_cfg, params)
+        variant = cfg.get("variant", self.backend_name)
+        backend = None
+        records = []
+        for audio_file in self.audio_files:
+            key = self.manifest.key_for(audio_file, variant, cfg, 0, self.repeats)
+            record = self.manifest.get(key, audio_file) if self.resume else None
+            if record is None:
+                backend = backend or self._backend(params, cfg)
+                record = benchmark_file(backend, audio_file, repeats=self.repeats)
+                self.manifest.append(key, record)
+            records.append(record)
+
+        rows = []
+        for record in records:
+            scores = score_pair(self.references[reference_key(record["file"])],
+                                _normalize_text(record["transcript"]))
+            rows.append({"word_counts": scores["words"], "char_counts": scores["chars"]})
+        accuracy = corpus_metrics(rows)
+        audio_sec = sum(r["duration_sec"] for r in records)
+        proc_sec = sum(r["processing_time_sec"] for r in records)
+        return {
+            "params": params,
+            "rtf": round(proc_sec / audio_sec, 4) if audio_sec else None,
+            "WER": accuracy["WER"],
+            "CER": accuracy["CER"],
+            "audio_sec": round(audio_sec, 2),
+            "processing_time_sec": round(proc_sec, 4),
+            "files": len(records),
+        }
+
+    def run(self, trials):
+        results = []
+        for i, params in enumerate(trials, 1):
+            print(f"\n🔧 Trial {i}/{len(trials)}: {params}")
+            result = self.run_trial(params)
+            results.append(result)
+            print(f"✅ RTF: {result['rtf']} | WER: {result['WER']} | CER: {result['CER']}")
+        return results
+
+
+def _yaml_value(value):
+    """Inline YAML for one value (flow style for lists / dicts)."""
+    return yaml.safe_dump([value], default_flow_style=True, sort_keys=False).strip()[1:-1]
+
+
+def update_model_config(config_path, backend_name, updates):
+    """
+    Set top-level keys of one backend's block in model_configs.yaml, editing
+    the text so comments and the other backends stay as they are.
+    """
+    lines = Path(config_path).read_text(encoding="utf-8").splitlines(keepends=True)
+    header = re.compile(rf"^  {re.escape(backend_name)}:\s*(#.*)?$")
+    start = next((i for i, line in enumerate(lines) if header.match(line.rstrip("\n"))), None)
+    if start is None:
+        raise KeyError(f"'{backend_name}' not found in {config_path}")
+    end = start + 1
+    while end < len(lines):
+        line = lines[end]
+        if line.strip() and not line.lstrip().startswith("#") and len(line) - len(line.lstrip()) <= 2:
+            break
+        end += 1
+
+    last_key = start
+    for i in range(start + 1, end):
+        if lines[i].strip() and not lines[i].lstrip().startswith("#"):
+            last_key = i
+    for key, value in updates.items():
+        pattern = re.compile(rf"^    {re.escape(key)}:[^#\n]*?(\s+#.*)?$")
+        for i in range(start + 1, end):
+            match = pattern.match(lines[i].rstrip("\n"))
+            if match:
+                lines[i] = f"    {key}: {_yaml_value(value)}{match.group(1) or ''}\n"
+                break
+        else:
+            last_key += 1
+            end += 1
+            lines.insert(last_key, f"    {key}: {_yaml_value(value)}\n")
+
+    Path(config_path).write_text("".join(lines), encoding="utf-8")
+    return config_path
+
+
+def config_updates(params, base_cfg):
+    """Model-config keys to write for a trial's params."""
+    cfg = trial_config(base_cfg, params)
+    updates = {k: cfg[k] for k in CONFIG_PARAMS if k in params}
+    updates["decode_options"] = cfg["decode_options"]
+    return updates
+
+
+def print_frontier(frontier, recommended):
+    print("\n========== PARETO FRONTIER (RTF vs WER) ==========")
+    for t in frontier:
+        mark = "⭐" if t is recommended else "  "
+        print(f"{mark} RTF: {t['rtf']:<8} WER: {t['WER']!s:<8} CER: {t['CER']!s:<8} {t['params']}")
+    print("==================================================")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep decode parameters and find the RTF / WER Pareto frontier.")
+    parser.add_argument("--backend", default="faster-whisper", help="Key in model_configs.yaml.")
+    parser.add_argument("--config", default=str(CONFIG_PATH))
+    parser.add_argument("--audio-dir", default=str(AUDIO_DIR))
+    parser.add_argument("--ground-truth", default=str(GROUND_TRUTH))
+    parser.add_argument("--output-dir", default=str(OUTPUT_DIR))
+    parser.add_argument("--search", choices=("grid", "random"), default="random")
+    parser.add_argument("--trials", type=int, default=24, help="Trials sampled for --search random.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--param", nargs="+", action="append", default=[], metavar=("NAME", "VALUE"),
+                        help="Override one search dimension, e.g. --param beam_size 1 5 10 "
+                             "(values parsed as YAML, so `[0, 0.2, 0.4]` is a list).")
+    parser.add_argument("--repeats", type=int, default=1, help="Measured runs per file.")
+    parser.add_argument("--max-wer-loss", type=float, default=0.01,
+                        help="WER the recommendation may give up vs the most accurate trial.")
+    parser.add_argument("--fresh", action="store_true", help="Ignore checkpointed trial results.")
+    parser.add_argument("--write", action="store_true",
+                        help="Write the recommended settings into the backend's model_configs.yaml entry.")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.backend not in config:
+        parser.error(f"Not in {args.config}: {args.backend}. Configured: {list(config)}")
+    base_cfg = config[args.backend]
+    backend_cls, _ = load_backend_class(args.backend)
+
+    space = default_space(base_cfg.get("device", "cpu"), params=backend_cls.tunable_params)
+    for name, *values in args.param:
+        if not values:
+            parser.error(f"--param {name} needs at least one value")
+        if name not in backend_cls.tunable_params:
+            parser.error(f"{args.backend} does not apply --param {name}. "
+                         f"Tunable: {list(backend_cls.tunable_params)}")
+        space[name] = [yaml.safe_load(v) for v in values]
+
+    references = load_references(args.ground_truth)
+    audio_files = [f for f in list_audio_files(args.audio_dir) if reference_key(f) in references]
+    if not audio_files:
+        parser.error(f"No files in {args.audio_dir} have ground truth in {args.ground_truth}")
+    trials = trials_for(space, args.search, args.trials, args.seed, backend_cls.load_params)
+    print(f"🔍 {len(trials)} trials x {len(audio_files)} files ({args.search} search) for {args.backend}")
+
+    tuner = Autotuner(args.backend, base_cfg, audio_files, references, args.output_dir,
+                      repeats=args.repeats, resume=not args.fresh, load_params=backend_cls.load_params)
+    results = tuner.run(trials)
+    frontier = pareto_frontier(results)
+    recommended = recommend(frontier, args.max_wer_loss)
+    print_frontier(frontier, recommended)
+
+    report_path = Path(args.output_dir) / f"autotune_{args.backend}.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"backend": args.backend, "space": space, "files": [p.name for p in audio_files],
+                   "trials": results, "frontier": frontier, "recommended": recommended}, f, indent=2)
+    print(f"📁 Sweep saved to: {report_path}")
+
+    if recommended is not None:
+        updates = config_updates(recommended["params"], base_cfg)
+        print(f"⭐ Recommended for {args.backend}: {updates}")
+        if args.write:
+            update_model_config(args.config, args.backend, updates)
+            print(f"📝 Written to {args.config}")
+    return recommended
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# code/benchmark_harness.py
+"""
+benchmark_harness.py
+----------------------------------
+Phase-separated latency measurement shared by every backend.
+
+Phases timed per file:
+- load_model     : cold model load (once per backend, see ASRBackend.load)
+- decode_audio   : file -> model input (backend.load_audio)
+- vad            : speech detection + gathering speech regions (backends with vad enabled)
+- language_id    : one-shot language ID on a few speech windows (backends with language_id enabled)
+- first_segment  : transcribe() call until the first segment is available
+- transcription  : transcribe() call until every segment has been consumed
+- postprocess    : segments -> final text (backend.postprocess)
+
+Lazy backends (faster-whisper returns a generator) do their decoding while
+segments are consumed, so the transcription phase — and the resource
+monitor — only stop once the iterator is exhausted.
+
+With VAD enabled (`vad: true` in the model config or --vad) the model only
+sees the speech regions of the shared PCM (code/vad.py); segment timestamps
+are mapped back to the original file, silent files skip the model entirely,
+and the record gets the speech ratio plus an estimate of the compute saved.
+
+With `language_id: true` the file's language is identified once
+(code/language_id.py, cached per file across backends and repeats) and
+passed to transcribe() as a fixed setting; mixed-language files keep the
+backend's own detection. The record gets the result under "language_id".
+
+Every phase is also a tracing span (code/tracing.py) — decode_audio, vad,
+inference with one segment_<n> span per segment, postprocess — and the
+resource samples become counter tracks when tracing is enabled.
+
+Warm-up runs are executed and discarded; the remaining `repeats` runs are
+reported as p50 / p95.
+"""
+
+import time
+from pathlib import Path
+from code import tracing
+from code.resource_monitor import ResourceMonitor
+from code.vad import speech_map
+from code.language_id import identify_language
+
+PHASES = ("decode_audio", "vad", "language_id", "first_segment", "transcription", "postprocess")
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0..100) of a non-empty sequence."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(values):
+    return {
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "mean": round(sum(values) / len(values), 4),
+    }
+
+
+def run_once(backend, audio_file):
+    """
+    Run one full pass (decode -> [vad] -> transcribe -> postprocess) on a loaded backend.
+    Returns (timings, output, duration_sec, extra_fields, speech) where
+    speech is the file's SpeechMap, or None without VAD.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    with tracing.span("decode_audio"):
+        audio_input, duration, extra = backend.load_audio(audio_file)
+    timings["decode_audio"] = time.perf_counter() - start
+
+    speech = None
+    model_input = audio_input
+    try:
+        if backend.vad:
+            start = time.perf_counter()
+            with tracing.span("vad") as sp:
+                speech = speech_map(audio_file, audio_input, **backend.vad_options)
+                model_input = speech.collect(audio_input)
+                sp.set(speech_ratio=round(speech.speech_ratio, 4))
+            timings["vad"] = time.perf_counter() - start
+
+        lid, options = None, {}
+        if backend.language_id:
+            start = time.perf_counter()
+            with tracing.span("language_id") as sp:
+                lid = identify_language(audio_file, audio_input, speech=speech,
+                                        vad_options=backend.vad_options, **backend.language_id_options)
+                options = backend.language_options(lid)
+                sp.set(language=lid.language, mixed=lid.mixed)
+            timings["language_id"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with tracing.span("inference"):
+            if speech is not None and not speech.regions:
+                segments, info = [], None   # no speech: nothing for the model to do
+            else:
+                segments, info = backend.transcribe(model_input, **options)
+            segments = iter(segments)
+            collected = []
+            while True:
+                # lazy backends do the actual decoding inside next()
+                with tracing.span(f"segment_{len(collected)}"):
+                    seg = next(segments, None)
+                if seg is None:
+                    break
+                collected.append(seg)
+                if len(collected) == 1:
+                    timings["first_segment"] = time.perf_counter() - start
+            timings["transcription"] = time.perf_counter() - start
+            timings.setdefault("first_segment", timings["transcription"])
+    finally:
+        backend.release_audio(audio_input)
+
+    start = time.perf_counter()
+    with tracing.span("postprocess"):
+        if speech is not None:
+            collected = [backend.remap_segment(seg, speech) for seg in collected]
+        if speech is not None and not speech.regions:
+            output = {"text": "", "language": None}
+        else:
+            output = backend.postprocess(collected, info)
+        if lid is not None:
+            extra = {**extra, "language_id": lid.summary()}
+            if output.get("language") in (None, "unknown") and lid.language:
+                output = {**output, "language": lid.language}   # e.g. whisper.cpp reports none
+    timings["postprocess"] = time.perf_counter() - start
+
+    return timings, output, duration, extra, speech
+
+
+def vad_fields(backend, speech, duration, proc_time, vad_time):
+    """
+    Speech ratio and estimated compute saved by skipping non-speech audio.
+    The saving extrapolates this backend's transcription seconds per speech
+    second (from the latest file with speech) over the skipped audio, minus
+    the time VAD itself took.
+    """
+    skipped = max(0.0, duration - speech.speech_sec)
+    if speech.speech_sec > 0:
+        backend.vad_rate = proc_time / speech.speech_sec
+    rate = backend.vad_rate
+    saved = round(rate * skipped - vad_time, 4) if rate is not None else None
+    return {"vad": {**speech.summary(), "skipped_sec": round(skipped, 2)},
+            "speech_ratio": round(speech.speech_ratio, 4),
+            "compute_saved_sec": saved}
+
+
+def benchmark_file(backend, audio_file, warmup=0, repeats=1, monitor_interval=0.01):
+    """
+    Benchmark one file on a loaded backend.
+    Returns the file's result record with p50 processing time / RTF and a
+    per-phase p50/p95 breakdown under "phases".
+    """
+    if warmup:
+        with tracing.span("warmup", file=Path(audio_file).name, runs=warmup):
+            for _ in range(warmup):
+                run_once(backend, audio_file)
+
+    monitor = ResourceMonitor(interval=monitor_interval)
+    monitor.start()
+    runs = []
+    try:
+        with tracing.span("benchmark_file", file=Path(audio_file).name, backend=backend.variant):
+            for _ in range(max(1, repeats)):
+                runs.append(run_once(backend, audio_file))
+    finally:
+        monitor.stop()
+    tracing.record_monitor(monitor)
+    resource_stats = monitor.get_summary()
+
+    _, output, duration, extra, speech = runs[-1]
+    phases = {phase: summarize([t[phase] for t, *_ in runs]) for phase in PHASES if phase in runs[-1][0]}
+    rtfs = [t["transcription"] / duration for t, *_ in runs] if duration > 0 else [0]
+    proc_time = phases["transcription"]["p50"]
+
+    record = backend.result_record(audio_file, duration, proc_time, output, extra)
+    record.update({
+        "rtf": round(percentile(rtfs, 50), 4),
+        "rtf_p95": round(percentile(rtfs, 95), 4),
+        "first_segment_sec": phases["first_segment"]["p50"],
+        "model_load_sec": round(backend.load_time, 4) if backend.load_time is not None else None,
+        "warmup_runs": warmup,
+        "repeats": len(runs),
+        "phases": phases,
+        **resource_stats   # 👈 adds CPU, RAM, GPU stats
+    })
+    if speech is not None:
+        record.update(vad_fields(backend, speech, duration, proc_time, phases["vad"]["p50"]))
+    return record
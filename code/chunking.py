@@ -0,0 +1,143 @@
+# code/chunking.py
+"""
+chunking.py
+----------------------------------
+Long-audio mode: split at silence, transcribe chunks in parallel, stitch in order.
+
+- plan_chunks() cuts the PCM roughly every `chunk_sec` at the quietest
+  point within `search_sec` of the target, and starts every chunk after the
+  first `overlap_sec` early so words at a cut are heard in full by both sides.
+- Each chunk is transcribed independently on an executor (threads sharing a
+  multi-replica model, or a process pool — `transcribe_chunk` then has to be
+  picklable) and returns segment dicts relative to the chunk.
+- Stitcher offsets timestamps back onto the file, keeps each segment in the
+  chunk that owns its midpoint, and drops words the overlap repeated at the
+  start of a chunk.
+- transcribe_chunked() yields stitched segments in file order as soon as the
+  earliest unfinished chunk is done, so streams stay ordered.
+"""
+
+import re
+
+import numpy as np
+
+from code.audio_cache import SAMPLE_RATE
+
+FRAME_MS = 30
+SMOOTH_MS = 300        # silence is searched on energy averaged over this window
+MAX_DEDUPE_WORDS = 12
+
+
+class Chunk:
+    """
+    Sample range [start, end) fed to the model. The chunk owns [own_start, own_end);
+    start < own_start is the overlap shared with the previous chunk.
+    """
+
+    __slots__ = ("index", "start", "end", "own_start", "own_end")
+
+    def __init__(self, index, start, end, own_start, own_end):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.own_start = own_start
+        self.own_end = own_end
+
+    def __repr__(self):
+        return (f"Chunk({self.index}, {self.start / SAMPLE_RATE:.2f}-{self.end / SAMPLE_RATE:.2f}s, "
+                f"owns {self.own_start / SAMPLE_RATE:.2f}-{self.own_end / SAMPLE_RATE:.2f}s)")
+
+
+def _frame_energy(pcm, sample_rate):
+    frame = int(sample_rate * FRAME_MS / 1000)
+    n = len(pcm) // frame
+    frames = np.asarray(pcm[:n * frame], dtype=np.float32).reshape(n, frame)
+    energy = np.mean(frames ** 2, axis=1)
+    width = max(1, SMOOTH_MS // FRAME_MS)
+    return np.convolve(energy, np.ones(width) / width, mode="same"), frame
+
+
+def plan_chunks(pcm, sample_rate=SAMPLE_RATE, chunk_sec=60.0, overlap_sec=2.0, search_sec=5.0):
+    """Split `pcm` into Chunks of about chunk_sec, cut at the quietest nearby point."""
+    total = len(pcm)
+    chunk = int(chunk_sec * sample_rate)
+    if total <= chunk * 1.5:
+        return [Chunk(0, 0, total, 0, total)]
+
+    energy, frame = _frame_energy(pcm, sample_rate)
+    search = int(search_sec * sample_rate) // frame
+    cuts = [0]
+    while total - cuts[-1] > chunk * 1.5:   # never leave a tiny last chunk
+        target = (cuts[-1] + chunk) // frame
+        lo, hi = max(target - search, cuts[-1] // frame + 1), min(target + search, len(energy) - 1)
+        cuts.append(int(lo + np.argmin(energy[lo:hi + 1])) * frame)
+    cuts.append(total)
+
+    overlap = int(overlap_sec * sample_rate)
+    return [Chunk(i, max(0, own_start - overlap if i else 0), own_end, own_start, own_end)
+            for i, (own_start, own_end) in enumerate(zip(cuts[:-1], cuts[1:]))]
+
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _overlap_words(prev_words, words):
+    """Length of the longest suffix of prev_words repeated as a prefix of words (0 if < 2)."""
+    prev = [_norm(w) for w in prev_words[-MAX_DEDUPE_WORDS:]]
+    cur = [_norm(w) for w in words[:MAX_DEDUPE_WORDS]]
+    for k in range(min(len(prev), len(cur)), 1, -1):
+        if prev[-k:] == cur[:k]:
+            return k
+    return 0
+
+
+class Stitcher:
+    """Merges per-chunk segments (added in chunk order) into one ordered transcript."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.tail_words = []   # last words emitted, for overlap de-duplication
+
+    def add(self, chunk, segments):
+        """Return chunk's segments on the file timeline, minus what earlier chunks already produced."""
+        offset = chunk.start / self.sample_rate
+        own_start = chunk.own_start / self.sample_rate
+        out = []
+        for seg in segments:
+            start, end = seg["start"] + offset, seg["end"] + offset
+            # chunks only overlap backwards, so the lead-in is all the previous chunk owns
+            if (start + end) / 2 < own_start:
+                continue
+            out.append({**seg, "start": round(start, 3), "end": round(end, 3)})
+
+        if out and chunk.index > 0:
+            words = out[0]["text"].split()
+            k = _overlap_words(self.tail_words, words)
+            if k:
+                out[0]["text"] = (" " if out[0]["text"].startswith(" ") else "") + " ".join(words[k:])
+                if not words[k:]:
+                    out.pop(0)
+
+        for seg in out:
+            self.tail_words = (self.tail_words + seg["text"].split())[-MAX_DEDUPE_WORDS:]
+        return out
+
+
+def transcribe_chunked(pcm, transcribe_chunk, executor, sample_rate=SAMPLE_RATE,
+                       chunk_sec=60.0, overlap_sec=2.0, search_sec=5.0):
+    """
+    Transcribe `pcm` chunk by chunk on `executor`, yielding stitched segment
+    dicts ({"start", "end", "text", ...}) in file order.
+    transcribe_chunk(samples) must return that chunk's segment dicts.
+    """
+    chunks = plan_chunks(pcm, sample_rate, chunk_sec, overlap_sec, search_sec)
+    futures = [executor.submit(transcribe_chunk, np.ascontiguousarray(pcm[c.start:c.end]))
+               for c in chunks]
+    stitcher = Stitcher(sample_rate)
+    try:
+        for chunk, future in zip(chunks, futures):
+            yield from stitcher.add(chunk, future.result())
+    finally:
+        for future in futures:
+            future.cancel()
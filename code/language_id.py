@@ -0,0 +1,315 @@
+# code/language_id.py
+"""
+language_id.py
+----------------------------------
+One-shot spoken-language identification, shared by every backend.
+
+Instead of letting each backend (and each 30 s chunk inside it) detect the
+language again, a file gets one language-ID pass:
+- VAD (code/vad.py) finds the speech regions of the cached 16 kHz PCM,
+- a few short windows (default 3 x 10 s) are taken evenly across the speech,
+- a Whisper encoder scores the language of each window,
+- the per-window probabilities are averaged into a language + confidence.
+
+The result is cached per file (in-process and as JSON under
+$LANGID_CACHE_DIR, default results/cache/langid), so every backend, repeat
+and later sweep reuses it. Backends then get the language as a fixed
+setting and skip their own detection.
+
+Files whose confident windows disagree (e.g. English/Urdu code-switching)
+are flagged `mixed`; they, and files where no language reaches
+min_confidence, keep the backend's multilingual / auto-detect path.
+
+Engines:
+- "faster-whisper" : CTranslate2 Whisper encoder + language head (default)
+- "openai-whisper" : whisper.detect_language
+A loaded model object (e.g. the app's WhisperModel) or any callable
+window -> {language: probability} can be passed as `detector` instead.
+
+    python -m code.language_id data/*.mp3 --model base
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from code.audio_cache import SAMPLE_RATE, decode_pcm, file_hash, load_pcm
+from code.vad import SpeechMap, default_engine, detect_speech, speech_map
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CACHE_DIR = BASE_DIR / "results" / "cache" / "langid"
+
+LID_DEFAULTS = {
+    "engine": "faster-whisper",
+    "model": "base",
+    "windows": 3,              # speech windows scored per file
+    "window_sec": 10.0,
+    "min_confidence": 0.6,     # below this the language is not fixed
+}
+
+_detectors = {}      # (engine, model, device, compute_type) -> detect(window)
+_results_memo = {}   # cache key -> LanguageID
+
+
+class LanguageID:
+    """Language-ID result for one file."""
+
+    def __init__(self, language, confidence, windows, min_confidence=LID_DEFAULTS["min_confidence"]):
+        self.language = language          # most probable language over all windows (None: no speech)
+        self.confidence = confidence      # its mean probability
+        self.windows = windows            # [{"start_sec", "language", "probability"}, ...]
+        self.min_confidence = min_confidence
+
+    @property
+    def languages(self):
+        """Top language of each confident window -> number of such windows."""
+        counts = {}
+        for w in self.windows:
+            if w["probability"] >= self.min_confidence:
+                counts[w["language"]] = counts.get(w["language"], 0) + 1
+        return counts
+
+    @property
+    def mixed(self):
+        return len(self.languages) > 1
+
+    @property
+    def fixed(self):
+        """True when the language can be passed to backends as a fixed setting."""
+        return self.language is not None and not self.mixed and self.confidence >= self.min_confidence
+
+    def summary(self):
+        return {
+            "language": self.language,
+            "confidence": round(self.confidence, 4),
+            "mixed": self.mixed,
+            "fixed": self.fixed,
+            "languages": self.languages,
+        }
+
+    def to_dict(self):
+        return {"language": self.language, "confidence": self.confidence,
+                "windows": self.windows, "min_confidence": self.min_confidence}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["language"], data["confidence"], data["windows"], data["min_confidence"])
+
+    def __repr__(self):
+        return f"LanguageID({self.language}, confidence={self.confidence:.2f}, mixed={self.mixed})"
+
+
+# --- detectors -----------------------------------------------------------
+
+def faster_whisper_detector(model):
+    """detect(window) for a faster_whisper.WhisperModel: one encoder pass on the padded window."""
+    extractor = model.feature_extractor
+
+    def detect(window):
+        window = np.pad(window, (0, max(0, extractor.n_samples - len(window))))
+        features = extractor(window)[:, :extractor.nb_max_frames]
+        encoder_output = model.encode(features)
+        results = model.model.detect_language(encoder_output)[0]
+        return {token[2:-2]: prob for token, prob in results}   # "<|en|>" -> "en"
+
+    return detect
+
+
+def openai_whisper_detector(model):
+    """detect(window) for an openai-whisper model."""
+    import torch
+    import whisper
+
+    def detect(window):
+        audio = whisper.pad_or_trim(torch.from_numpy(np.asarray(window, dtype=np.float32)))
+        mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels).to(model.device)
+        _, probs = model.detect_language(mel)
+        return probs
+
+    return detect
+
+
+def load_detector(engine, model, device="cpu", compute_type="int8"):
+    """Language detector for an engine and model name, loaded once per process."""
+    key = (engine, model, device, compute_type)
+    if key not in _detectors:
+        if engine == "faster-whisper":
+            from faster_whisper import WhisperModel
+            _detectors[key] = faster_whisper_detector(WhisperModel(model, device=device, compute_type=compute_type))
+        elif engine == "openai-whisper":
+            import whisper
+            _detectors[key] = openai_whisper_detector(whisper.load_model(model, device=device))
+        else:
+            raise ValueError(f"Unknown language-ID engine: {engine}")
+    return _detectors[key]
+
+
+def as_detector(detector):
+    """Accept a detect(window) callable or a loaded faster-whisper / openai-whisper model."""
+    if hasattr(detector, "feature_extractor") and hasattr(detector, "encode"):
+        return faster_whisper_detector(detector)
+    if hasattr(detector, "detect_language") and hasattr(detector, "dims"):
+        return openai_whisper_detector(detector)
+    if callable(detector):
+        return detector
+    raise TypeError(f"Not a language detector: {detector!r}")
+
+
+# --- windows ---------------------------------------------------------------
+
+def speech_windows(pcm, speech, windows=3, window_sec=10.0, sample_rate=SAMPLE_RATE):
+    """
+    Up to `windows` windows of `window_sec` speech, spread evenly over the
+    speech regions (gathered across region boundaries). Returns
+    [(start_sec_in_file, samples), ...]; short files give one shorter window.
+    """
+    total = sum(e - s for s, e in speech.regions)
+    if total == 0 or windows < 1:
+        return []
+    length = min(int(window_sec * sample_rate), total)
+    starts = []
+    for i in range(windows):
+        center = (i + 0.5) * total / windows
+        start = int(min(max(0, center - length / 2), total - length))
+        if start not in starts:
+            starts.append(start)
+
+    out = []
+    for start in starts:
+        parts, pos, need = [], 0, length
+        for s, e in speech.regions:
+            if need == 0:
+                break
+            if pos + (e - s) > start:
+                lo = s + max(0, start - pos)
+                hi = min(e, lo + need)
+                parts.append(pcm[lo:hi])
+                need -= hi - lo
+            pos += e - s
+        window = np.concatenate(parts).astype(np.float32, copy=False)
+        out.append((speech.to_original(start / sample_rate), window))
+    return out
+
+
+def combine(scores, min_confidence):
+    """Average per-window {language: prob} into a LanguageID."""
+    if not scores:
+        return LanguageID(None, 0.0, [], min_confidence)
+    totals = {}
+    for _, probs in scores:
+        for lang, p in probs.items():
+            totals[lang] = totals.get(lang, 0.0) + float(p)
+    language = max(totals, key=totals.get)
+    windows = []
+    for start_sec, probs in scores:
+        top = max(probs, key=probs.get)
+        windows.append({"start_sec": start_sec, "language": top, "probability": round(float(probs[top]), 4)})
+    return LanguageID(language, totals[language] / len(scores), windows, min_confidence)
+
+
+# --- cached entry point ------------------------------------------------------
+
+def _cache_dir():
+    return Path(os.environ.get("LANGID_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+def _cache_key(audio_file, detector_name, options):
+    fingerprint = json.dumps({"detector": detector_name, **options}, sort_keys=True, default=str)
+    return f"{file_hash(audio_file)}_{hashlib.sha256(fingerprint.encode()).hexdigest()[:12]}"
+
+
+def identify_language(audio_file, pcm=None, speech=None, detector=None, detector_name=None,
+                      vad_options=None, use_cache=True, **options):
+    """
+    Language of `audio_file` from a few VAD speech windows, cached per file.
+
+    pcm: the file's 16 kHz PCM (default: the shared decode cache).
+    speech: a SpeechMap already computed for this PCM (default: run VAD).
+    detector: model object or detect(window) callable; by default the
+              engine/model in `options` is loaded once per process.
+    detector_name: cache identity of a passed-in detector (e.g. "faster-whisper:large-v3").
+    use_cache: False skips every per-file cache (PCM .npy, VAD regions, result memo
+               and JSON), for one-off inputs such as service uploads.
+    """
+    options = {**LID_DEFAULTS, **options}
+    vad_options = vad_options or {}
+    if detector is not None:
+        detector_name = detector_name or getattr(detector, "__name__", type(detector).__name__)
+    else:
+        detector_name = f"{options['engine']}:{options['model']}"
+
+    key = path = None
+    if use_cache:
+        key_options = {k: options[k] for k in ("windows", "window_sec", "min_confidence")}
+        key = _cache_key(audio_file, detector_name, {**key_options, "vad": vad_options})
+        result = _results_memo.get(key)
+        if result is not None:
+            return result
+        path = _cache_dir() / f"{key}.json"
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                result = _results_memo[key] = LanguageID.from_dict(json.load(f))
+            return result
+
+    if pcm is None:
+        pcm = load_pcm(audio_file) if use_cache else decode_pcm(audio_file)
+    if speech is None:
+        if use_cache:
+            speech = speech_map(audio_file, pcm, **vad_options)
+        else:
+            vad = {**vad_options, "engine": vad_options.get("engine") or default_engine()}
+            speech = SpeechMap(detect_speech(pcm, **vad), len(pcm), engine=vad["engine"])
+    windows = speech_windows(pcm, speech, options["windows"], options["window_sec"])
+    if windows:
+        if detector is None:
+            detect = load_detector(options["engine"], options["model"], options.get("device", "cpu"),
+                                   options.get("compute_type", "int8"))
+        else:
+            detect = as_detector(detector)
+        scores = [(start_sec, detect(window)) for start_sec, window in windows]
+    else:
+        scores = []
+    result = combine(scores, options["min_confidence"])
+
+    if use_cache:
+        _results_memo[key] = result
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(result.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Identify the spoken language of audio files once, with caching.")
+    parser.add_argument("inputs", nargs="+", help="Audio files or directories.")
+    parser.add_argument("--engine", default=LID_DEFAULTS["engine"], choices=["faster-whisper", "openai-whisper"])
+    parser.add_argument("--model", default=LID_DEFAULTS["model"])
+    parser.add_argument("--windows", type=int, default=LID_DEFAULTS["windows"])
+    parser.add_argument("--window-sec", type=float, default=LID_DEFAULTS["window_sec"])
+    parser.add_argument("--min-confidence", type=float, default=LID_DEFAULTS["min_confidence"])
+    args = parser.parse_args(argv)
+
+    files = []
+    for item in args.inputs:
+        p = Path(item)
+        files.extend(sorted(f for f in p.glob("*") if f.is_file()) if p.is_dir() else [p])
+
+    results = {}
+    for audio_file in files:
+        lid = identify_language(audio_file, engine=args.engine, model=args.model, windows=args.windows,
+                                window_sec=args.window_sec, min_confidence=args.min_confidence)
+        results[audio_file.name] = lid.summary()
+        flag = " 🔀 mixed" if lid.mixed else ("" if lid.fixed else " ❔ low confidence")
+        print(f"🗣️ {audio_file.name}: {lid.language} ({lid.confidence:.2f}){flag}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
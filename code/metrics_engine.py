@@ -0,0 +1,145 @@
+# code/metrics_engine.py
+"""
+metrics_engine.py
+----------------------------------
+Batch WER / CER scoring of many models against one reference set.
+
+- The reference results JSON is loaded once; every prediction JSON is loaded
+  once and all models are scored in a single pass over the files.
+- Each (file, model) pair gets one word alignment and one character
+  alignment (jiwer.process_words / process_characters), from which hits,
+  substitutions, deletions and insertions are taken — WER and CER are derived
+  from those counts instead of separate jiwer.wer / jiwer.cer calls.
+- Files are scored on a process pool (one task per file, all models).
+- Corpus-level WER / CER are micro-averaged: total edits / total reference
+  tokens over all files, so long files weigh more than short ones.
+
+Per-file WER / CER stay None when either side is empty (same as
+calculate_metrics); their counts still enter the corpus totals, so an empty
+prediction counts as all deletions.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import jiwer
+
+from code.metrics_calculator import _normalize_text
+
+COUNT_KEYS = ("hits", "substitutions", "deletions", "insertions")
+
+
+def load_transcripts(path):
+    """{file name: normalized transcript} from a results JSON (accepts 'transcript' or 'text')."""
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    if isinstance(items, dict):
+        items = [items]
+    transcripts = {}
+    for it in items:
+        text = it.get("transcript") if it.get("transcript") is not None else it.get("text", "")
+        transcripts[Path(it.get("file", "")).name] = _normalize_text(text)
+    return transcripts
+
+
+def _counts(output):
+    return {k: getattr(output, k) for k in COUNT_KEYS}
+
+
+def _empty_counts(ref_len, hyp_len):
+    return {"hits": 0, "substitutions": 0, "deletions": ref_len, "insertions": hyp_len}
+
+
+def error_rate(counts):
+    ref_len = counts["hits"] + counts["substitutions"] + counts["deletions"]
+    edits = counts["substitutions"] + counts["deletions"] + counts["insertions"]
+    return edits / ref_len if ref_len else None
+
+
+def score_pair(ref, hyp):
+    """Word- and character-level edit counts (one alignment each) plus WER / CER."""
+    if not ref or not hyp:
+        words = _empty_counts(len(ref.split()), len(hyp.split()))
+        chars = _empty_counts(len(ref), len(hyp))
+        return {"words": words, "chars": chars, "WER": None, "CER": None}
+    words = _counts(jiwer.process_words(ref, hyp))
+    chars = _counts(jiwer.process_characters(ref, hyp))
+    return {"words": words, "chars": chars,
+            "WER": round(error_rate(words), 4), "CER": round(error_rate(chars), 4)}
+
+
+def _score_file(task):
+    """Pool task: score every model's transcript of one file against its reference."""
+    fname, ref, hyps = task
+    rows = {}
+    for model, hyp in hyps.items():
+        scores = score_pair(ref, hyp)
+        rows[model] = {
+            "file": fname,
+            "reference_len_chars": len(ref),
+            "prediction_len_chars": len(hyp),
+            "WER": scores["WER"],
+            "CER": scores["CER"],
+            "word_counts": scores["words"],
+            "char_counts": scores["chars"],
+        }
+    return rows
+
+
+def corpus_metrics(rows):
+    """Micro-averaged WER / CER over per-file rows."""
+    totals = {}
+    for level in ("word_counts", "char_counts"):
+        totals[level] = {k: sum(r[level][k] for r in rows) for k in COUNT_KEYS}
+    wer, cer = error_rate(totals["word_counts"]), error_rate(totals["char_counts"])
+    return {
+        "files": len(rows),
+        "WER": round(wer, 4) if wer is not None else None,
+        "CER": round(cer, 4) if cer is not None else None,
+        "word_counts": totals["word_counts"],
+        "char_counts": totals["char_counts"],
+    }
+
+
+def evaluate_models(reference_json, prediction_jsons, workers=None, chunksize=16):
+    """
+    Score every prediction JSON against one reference JSON.
+    prediction_jsons: {model label: results JSON path}.
+    workers: process-pool size (default: CPU count); 0 scores inline.
+    Returns {"per_file": {label: [rows]}, "corpus": {label: metrics}}.
+    """
+    references = load_transcripts(reference_json)
+    predictions = {label: load_transcripts(path) for label, path in prediction_jsons.items()}
+
+    tasks = []
+    for fname, ref in references.items():
+        hyps = {label: preds[fname] for label, preds in predictions.items() if fname in preds}
+        for label, preds in predictions.items():
+            if fname not in preds:
+                print(f"⚠️ {label}: prediction missing for {fname}; skipping.")
+        if hyps:
+            tasks.append((fname, ref, hyps))
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            scored = list(pool.map(_score_file, tasks, chunksize=chunksize))
+    else:
+        scored = [_score_file(t) for t in tasks]
+
+    per_file = {label: [] for label in prediction_jsons}
+    for rows in scored:   # pool.map keeps reference file order
+        for label, row in rows.items():
+            per_file[label].append(row)
+    corpus = {label: corpus_metrics(rows) for label, rows in per_file.items()}
+    return {"per_file": per_file, "corpus": corpus}
+
+
+def save_metrics(rows, output_path):
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+    return output_path
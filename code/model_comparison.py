@@ -1,33 +1,162 @@
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="ctranslate2")
-import yaml
+import argparse
+import json
+import os
 from pathlib import Path
-from models.faster_whisper.faster_whisper_model import transcribe_audio as faster_whisper_run
-from models.openai_whisper.openai_whisper_model import transcribe_audio as openai_whisper_run
-from models.whisper_cpp.whisper_cpp_model import transcribe_audio as whisper_cpp_run   # 👈 add this
-from models.whisperx.whisperx_model import transcribe_audio as whisperx_run
+from models.registry import load_config, create_backend, CONFIG_PATH
+from code import tracing
+from code.parallel_runner import run_parallel
+from code.work_queue import run_distributed
+from code.results_store import ResultsStore, DEFAULT_DB
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-config_path = BASE_DIR / "models" / "model_configs.yaml"
-
-with open(config_path, "r", encoding="utf-8") as f:
-    config = yaml.safe_load(f)
 
 AUDIO_DIR = BASE_DIR / "tests" / "test_audio_samples"
 OUTPUT_DIR = BASE_DIR / "results" / "reports"
 
-# Run each model
-# print("\n🚀 Running Faster-Whisper...")
-# faster_output = faster_whisper_run(config["models"]["faster-whisper"], AUDIO_DIR, OUTPUT_DIR)
 
-print("\n🚀 Running OpenAI Whisper...")
-openai_output = openai_whisper_run(config["models"]["openai-whisper"], AUDIO_DIR, OUTPUT_DIR)
+def run_backend(name, model_cfg, audio_dir=AUDIO_DIR, output_dir=OUTPUT_DIR, warmup=0, repeats=1, resume=True):
+    """
+    Import, load and run a single backend.
+    Returns a summary dict with import/load timings and the report path.
+    """
+    summary = {"backend": name, "status": "ok", "import_time_sec": None,
+               "load_time_sec": None, "output_json": None}
+    try:
+        backend, import_time = create_backend(name, model_cfg)
+    except ImportError as e:
+        print(f"⚠️ Skipping {name}: framework not installed ({e})")
+        summary["status"] = "import_error"
+        return summary
+
+    summary["import_time_sec"] = round(import_time, 4)
+    print(f"📦 Imported {name} in {import_time:.2f}s")
+
+    summary["output_json"] = str(backend.run(audio_dir, output_dir, warmup=warmup, repeats=repeats, resume=resume))
+    # None when every file was reused from the run manifest (model never loaded)
+    summary["load_time_sec"] = round(backend.load_time, 4) if backend.load_time is not None else None
+    return summary
+
+
+def parallel_summaries(results):
+    """Collapse per-worker startup timings from run_parallel into one row per backend."""
+    summaries = []
+    for name, res in results.items():
+        startup = res["startup"]
+        mean = lambda key: round(sum(s[key] for s in startup) / len(startup), 4) if startup else None
+        summaries.append({
+            "backend": name,
+            "status": "ok" if not res["failures"] else f"{len(res['failures'])} failed",
+            "import_time_sec": mean("import_time_sec"),
+            "load_time_sec": mean("load_time_sec"),
+            "output_json": res["output_json"],
+        })
+    return summaries
+
+
+def print_startup_summary(summaries):
+    print("\n========== BACKEND STARTUP ==========")
+    for s in summaries:
+        imp = f"{s['import_time_sec']:.2f}s" if s["import_time_sec"] is not None else "-"
+        load = f"{s['load_time_sec']:.2f}s" if s["load_time_sec"] is not None else "-"
+        print(f"{s['backend']:<15} import: {imp:>8} | load: {load:>8} | {s['status']}")
+    print("=====================================")
+
+
+def store_run(args, config, summaries):
+    """Record every backend's results of this run in the results store; returns the run_id."""
+    with ResultsStore(args.db) as store:
+        run_id = store.start_run(label=args.run_label, backends=[s["backend"] for s in summaries],
+                                 audio_dir=args.audio_dir, vad=args.vad, language_id=args.language_id,
+                                 warmup=args.warmup, repeats=args.repeats)
+        for s in summaries:
+            if not s["output_json"]:
+                continue
+            with open(s["output_json"], "r", encoding="utf-8") as f:
+                store.add_transcriptions(run_id, json.load(f), config[s["backend"]])
+    return run_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Whisper backends over the test audio set.")
+    parser.add_argument("--backends", nargs="+", default=None,
+                        help="Backends to run (keys of model_configs.yaml). Defaults to all configured.")
+    parser.add_argument("--config", default=str(CONFIG_PATH))
+    parser.add_argument("--audio-dir", default=str(AUDIO_DIR))
+    parser.add_argument("--output-dir", default=str(OUTPUT_DIR))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Run (backend, file) jobs on a process pool with this many workers "
+                             "(with --queue: local queue workers, 0 = only workers started elsewhere).")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="CPU threads per worker (default: cores // workers).")
+    parser.add_argument("--pin-cores", action="store_true",
+                        help="Pin each worker to its own physical cores (see code/replica_planner.py).")
+    parser.add_argument("--queue", default=None, metavar="PATH",
+                        help="Distributed mode: queue jobs in this shared SQLite file for "
+                             "`python -m code.work_queue worker` processes on any host.")
+    parser.add_argument("--pcm-cache-dir", default=None,
+                        help="Where decoded 16 kHz PCM is cached (default: results/cache/pcm).")
+    parser.add_argument("--vad", action="store_true",
+                        help="Transcribe only VAD speech regions for every backend (same as `vad: true`).")
+    parser.add_argument("--language-id", action="store_true",
+                        help="Identify each file's language once and pass it to every backend (same as `language_id: true`).")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore checkpointed results in <output-dir>/run_manifest.jsonl and re-run every file.")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="Record tracing spans + resource counters and write a Chrome/Perfetto trace JSON.")
+    parser.add_argument("--db", default=str(DEFAULT_DB),
+                        help="Results store the run is recorded in (query with `python -m code.results_store`).")
+    parser.add_argument("--run-label", default=None, help="Free-form label stored with this run.")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="Untimed warm-up runs per file before measuring.")
+    parser.add_argument("--repeats", type=int, default=1,
+                        help="Measured runs per file; reports p50/p95 per phase.")
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        tracing.enable()   # before the pool starts, so workers inherit it
+    if args.pcm_cache_dir:
+        os.environ["PCM_CACHE_DIR"] = args.pcm_cache_dir   # inherited by pool workers
+    config = load_config(args.config)
+    selected = args.backends or list(config)
+    unknown = [b for b in selected if b not in config]
+    if unknown:
+        parser.error(f"Not in {args.config}: {unknown}. Configured: {list(config)}")
+
+    if args.vad:
+        config = {name: {**cfg, "vad": True} for name, cfg in config.items()}
+    if args.language_id:
+        config = {name: {**cfg, "language_id": True} for name, cfg in config.items()}
+
+    if args.queue:
+        results = run_distributed(selected, config, args.audio_dir, args.output_dir, args.queue,
+                                  workers=args.workers or 0, threads_per_worker=args.threads_per_worker,
+                                  warmup=args.warmup, repeats=args.repeats, resume=not args.fresh,
+                                  label=args.run_label)
+        summaries = parallel_summaries(results)
+    elif args.workers or args.threads_per_worker or args.pin_cores:
+        results = run_parallel(selected, config, args.audio_dir, args.output_dir,
+                               workers=args.workers, threads_per_worker=args.threads_per_worker,
+                               warmup=args.warmup, repeats=args.repeats, resume=not args.fresh,
+                               pin_cores=args.pin_cores)
+        summaries = parallel_summaries(results)
+    else:
+        summaries = []
+        for name in selected:
+            print(f"\n🚀 Running {name}...")
+            summaries.append(run_backend(name, config[name], args.audio_dir, args.output_dir,
+                                         warmup=args.warmup, repeats=args.repeats, resume=not args.fresh))
+
+    print_startup_summary(summaries)
+    run_id = store_run(args, config, summaries)
+    if args.trace:
+        print(f"🧭 Trace written to: {tracing.export_chrome(args.trace)} (open in ui.perfetto.dev)")
+    print("\n✅ All models completed!")
+    print(f"📁 Reports saved to: {args.output_dir}")
+    print(f"🗄️ Results stored as run {run_id} in {args.db}")
+    return summaries
 
-# print("\n🚀 Running Whisper.cpp...")
-# cpp_output = whisper_cpp_run(config["models"]["whisper-cpp"], AUDIO_DIR, OUTPUT_DIR)
-#
-print("\n🚀 Running WhisperX...")
-whisperx_output = whisperx_run(config["models"]["whisperx"], AUDIO_DIR, OUTPUT_DIR)
 
-print("\n✅ All models completed!")
-print(f"📁 Reports saved to: {OUTPUT_DIR}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# code/parallel_runner.py
+"""
+parallel_runner.py
+----------------------------------
+Process-pool runner that spreads (backend, file) jobs over worker processes.
+
+- Each worker keeps its loaded backend model and reuses it for every job of
+  that backend. Jobs are submitted backend-major, so a worker normally loads
+  each model at most once.
+- `threads_per_worker` is applied to OMP/MKL env vars in the worker before any
+  framework is imported and passed to the backend as `cpu_threads`, so
+  workers x threads can fill the machine without oversubscribing it.
+- With pin_cores=True each worker is pinned to its own set of physical cores
+  (code/replica_planner.py) with matching thread counts, and jobs go to
+  whichever pinned replica is free.
+- Results are merged back in a stable (backend, file name) order and written
+  to the usual per-backend `*_results.json` reports.
+"""
+
+import os
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from code import tracing
+from code.replica_planner import THREAD_ENV_VARS, read_topology, plan_replicas, pin
+from code.run_manifest import RunManifest, with_threads
+from models.base_backend import list_audio_files, results_path, save_results
+from models.registry import BACKENDS
+
+# --- per-worker state (lives in each child process) ---
+_worker_config = None
+_worker_threads = None
+_worker_backend = None    # (name, backend) currently resident in this worker
+
+
+def plan_workers(workers=None, threads_per_worker=None, cpu_count=None):
+    """
+    Resolve (workers, threads_per_worker) so workers * threads <= available cores.
+    Either value may be None and is derived from the other.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if workers and threads_per_worker:
+        if workers * threads_per_worker > cpu_count:
+            print(f"⚠️ {workers} workers x {threads_per_worker} threads oversubscribes {cpu_count} cores")
+        return workers, threads_per_worker
+    if workers:
+        return workers, max(1, cpu_count // workers)
+    if threads_per_worker:
+        return max(1, cpu_count // threads_per_worker), threads_per_worker
+    return cpu_count, 1
+
+
+def _init_worker(config, threads_per_worker, backends, replicas=None):
+    global _worker_config, _worker_threads
+    from models.registry import BACKENDS
+    BACKENDS.update(backends)   # carry over backends registered in the parent
+    _worker_config = config
+    _worker_threads = threads_per_worker
+    if replicas is not None:
+        replica = replicas.get()   # each worker takes one core set
+        pin(replica)
+        _worker_threads = replica.threads
+        return
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads_per_worker)
+
+
+def _get_backend(name):
+    """Return the worker's backend for `name`, loading it on first use."""
+    global _worker_backend
+    from models.registry import create_backend
+
+    if _worker_backend and _worker_backend[0] == name:
+        return _worker_backend[1], None
+
+    # Drop the previous model before loading the next one to cap worker RSS.
+    _worker_backend = None
+    cfg = dict(with_threads(_worker_config[name], _worker_threads))
+    backend, import_time = create_backend(name, cfg)
+    backend.load()
+    _worker_backend = (name, backend)
+    return backend, {"pid": os.getpid(), "import_time_sec": round(import_time, 4),
+                     "load_time_sec": round(backend.load_time, 4)}
+
+
+def _run_job(name, audio_file, warmup=0, repeats=1):
+    backend, startup = _get_backend(name)
+    record = backend.transcribe_file(Path(audio_file), warmup=warmup, repeats=repeats)
+    # workers inherit $ASR_TRACE; their spans are merged into the parent's trace
+    return record, startup, tracing.drain() if tracing.is_enabled() else None
+
+
+def run_parallel(backend_names, config, audio_dir, output_dir, workers=None, threads_per_worker=None,
+                 warmup=0, repeats=1, resume=True, pin_cores=False, use_smt=False):
+    """
+    Run every (backend, file) pair on a process pool.
+    Pairs already in the output dir's run manifest are reused (resume=True);
+    finished pairs are checkpointed there by the parent as they complete.
+    Returns {backend_name: {"output_json", "records", "startup", "failures"}}
+    where "startup" lists the import/load timings of each worker that loaded it.
+    pin_cores: pin every worker to its own physical cores (see code/replica_planner.py).
+    """
+    replicas = None
+    if pin_cores:
+        topology = read_topology()
+        workers, threads_per_worker = plan_workers(workers, threads_per_worker, topology.physical_cores)
+        replicas = plan_replicas(topology, workers, threads_per_worker, use_smt=use_smt)
+        threads_per_worker = replicas[0].threads
+    else:
+        workers, threads_per_worker = plan_workers(workers, threads_per_worker)
+    files = list_audio_files(audio_dir)
+    jobs = [(name, str(f)) for name in backend_names for f in files]
+
+    manifest = RunManifest.for_output_dir(output_dir)
+    # keyed on the config as the workers run it, so timings from another thread count aren't reused
+    keys = {(name, f): manifest.key_for(f, config[name].get("variant", name),
+                                        with_threads(config[name], threads_per_worker), warmup, repeats)
+            for name, f in jobs}
+    records = {}
+    if resume:
+        for job in jobs:
+            record = manifest.get(keys[job], job[1])
+            if record is not None:
+                records[job] = record
+    pending = [job for job in jobs if job not in records]
+
+    print(f"🧵 Parallel run: {len(pending)} jobs ({len(records)} reused from checkpoints) | "
+          f"{workers} workers x {threads_per_worker} threads{' (pinned)' if pin_cores else ''}")
+
+    startups = {name: [] for name in backend_names}
+    failures = {}
+    start = time.time()
+
+    # spawn: workers must import frameworks fresh, after the thread env vars are set
+    ctx = mp.get_context("spawn")
+    replica_queue = None
+    if replicas is not None:
+        replica_queue = ctx.Queue()
+        for replica in replicas:
+            replica_queue.put(replica)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker,
+                             initargs=(config, threads_per_worker, dict(BACKENDS), replica_queue)) as pool:
+        futures = {pool.submit(_run_job, name, f, warmup, repeats): (name, f) for name, f in pending}
+        for fut in as_completed(futures):
+            name, f = futures[fut]
+            try:
+                record, startup, trace_events = fut.result()
+            except Exception as e:
+                print(f"❌ {name} | {Path(f).name}: {e}")
+                failures.setdefault(name, []).append({"file": Path(f).name, "error": str(e)})
+                continue
+            records[(name, f)] = record
+            manifest.append(keys[(name, f)], record)
+            if trace_events:
+                tracing.add_events(trace_events)
+            if startup:
+                startups[name].append(startup)
+            print(f"✅ {name} | {record['file']} | Time: {record['processing_time_sec']:.2f}s | RTF: {record['rtf']}")
+
+    wall = time.time() - start
+    audio_sec = sum(r["duration_sec"] for job, r in records.items() if job in pending)
+    print(f"\n⏱️ Parallel wall time: {wall:.2f}s | {audio_sec / max(wall, 1e-9):.2f} audio-sec per wall-sec")
+
+    # --- merge in stable order and write one report per backend ---
+    summary = {}
+    for name in backend_names:
+        ordered = [records[(n, f)] for n, f in jobs if n == name and (n, f) in records]
+        output_json = None
+        if ordered:
+            first = ordered[0]
+            with tracing.span("write_results", backend=name, files=len(ordered)):
+                output_json = save_results(ordered, results_path(output_dir, first["variant"], first["model"]))
+            print(f"📁 {name}: {len(ordered)} results saved to {output_json}")
+        summary[name] = {
+            "output_json": str(output_json) if output_json else None,
+            "records": ordered,
+            "startup": startups[name],
+            "failures": failures.get(name, []),
+        }
+    return summary
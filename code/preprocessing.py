@@ -0,0 +1,384 @@
+# code/preprocessing.py
+"""
+preprocessing.py
+----------------------------------
+Streaming audio enhancement: 16 kHz mono, high-pass, spectral noise
+reduction and loudness normalization, in fixed-size NumPy blocks.
+
+The task3 notebook did this per file with librosa / scipy / noisereduce on
+whole arrays. Here the file is streamed from FFmpeg and every stage keeps
+only a small state between blocks, so memory stays flat for hour-long files:
+
+1. decode  : FFmpeg resamples to 16 kHz while decoding (swresample); samples
+             arrive in `block_sec` blocks of interleaved channels
+2. downmix : channel mean per block
+3. STFT    : 32 ms frames, 50% overlap, sqrt-Hann analysis / synthesis
+             (perfect reconstruction by overlap-add), carried across blocks
+   - high-pass : bins below `highpass_hz` removed with a raised-cosine edge
+   - noise     : per-bin noise floor = 10th percentile of frame power in each
+                 block, tracked across blocks (drops at once, rises slowly);
+                 power-subtraction gain sqrt(max(1 - strength * N / P, floor^2))
+4. loudness: gated running RMS of the output so far -> gain towards
+             `target_dbfs` (at most `max_gain_db`), ramped per block, then
+             clipped to +-0.99
+
+Output has exactly the input's length and is aligned with it (the STFT delay
+is removed). Entry points:
+- Preprocessor(...).process(block) / .flush() : the stream, block by block
+- preprocess_file(src, dst)                    : file -> enhanced 16-bit WAV
+- preprocess_files(paths, out_dir, workers)    : many files on a process pool
+- load_preprocessed_pcm(path, options)         : cached float32 PCM for backends
+- `python -m code.preprocessing ab ...`        : per-file RTF / WER with it on and off
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from code.audio_cache import SAMPLE_RATE, file_hash, get_cache
+from code.audio_probe import probe_audio
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_OPTIONS = {
+    "block_sec": 2.0,
+    "highpass_hz": 80.0,
+    "noise_reduction": True,
+    "nr_strength": 1.5,       # over-subtraction factor
+    "nr_floor": 0.15,         # minimum amplitude gain per bin (limits musical noise)
+    "loudness": True,
+    "target_dbfs": -20.0,     # RMS of gated (non-silent) audio
+    "max_gain_db": 30.0,
+}
+
+N_FFT = 512                   # 32 ms at 16 kHz
+HOP = N_FFT // 2
+GATE_DBFS = -50.0             # 100 ms windows quieter than this don't count towards loudness
+LOUDNESS_WINDOW = SAMPLE_RATE // 10
+
+
+class Preprocessor:
+    """Block-streaming enhancement of 16 kHz mono float32 audio."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown preprocessing options: {sorted(unknown)}")
+        self.options = {**DEFAULT_OPTIONS, **options}
+        self.sample_rate = sample_rate
+        self.block_size = int(self.options["block_sec"] * sample_rate)
+
+        self.window = np.sqrt(np.hanning(N_FFT + 1)[:-1]).astype(np.float32)   # periodic sqrt-Hann
+        freqs = np.fft.rfftfreq(N_FFT, 1 / sample_rate)
+        cutoff = self.options["highpass_hz"] or 0.0
+        ramp = np.clip((freqs - cutoff / 2) / max(cutoff / 2, 1e-9), 0, 1)
+        self.highpass = (0.5 - 0.5 * np.cos(np.pi * ramp)).astype(np.float32) if cutoff else None
+
+        self._in = np.zeros(N_FFT - HOP, np.float32)    # unframed input (pre-padded by the STFT delay)
+        self._ola = np.zeros(N_FFT - HOP, np.float32)   # overlap-add tail not yet complete
+        self._delay = N_FFT - HOP                        # output samples still to drop for alignment
+        self._received = 0
+        self._emitted = 0
+        self._noise = None
+        self._power_sum = 0.0
+        self._power_windows = 0
+        self._gain = None
+
+    # --- stages ---
+    def _spectral(self, frames):
+        spec = np.fft.rfft(frames * self.window, axis=1)
+        gain = np.ones(spec.shape, np.float32)
+        if self.highpass is not None:
+            gain *= self.highpass
+        if self.options["noise_reduction"] and len(frames):
+            power = (spec.real ** 2 + spec.imag ** 2).astype(np.float32)
+            if len(frames) >= 8:
+                block_noise = np.percentile(power, 10, axis=0)
+                if self._noise is None:
+                    self._noise = block_noise
+                else:
+                    self._noise = np.where(block_noise < self._noise, block_noise,
+                                           0.9 * self._noise + 0.1 * block_noise)
+            if self._noise is not None:
+                floor = self.options["nr_floor"] ** 2
+                ratio = self.options["nr_strength"] * self._noise / np.maximum(power, 1e-12)
+                gain *= np.sqrt(np.clip(1.0 - ratio, floor, 1.0))
+        return np.fft.irfft(spec * gain, n=N_FFT, axis=1).astype(np.float32) * self.window
+
+    def _stft_filter(self, block):
+        buf = np.concatenate((self._in, block))
+        n_frames = (len(buf) - N_FFT) // HOP + 1 if len(buf) >= N_FFT else 0
+        if n_frames == 0:
+            self._in = buf
+            return np.zeros(0, np.float32)
+        frames = np.lib.stride_tricks.sliding_window_view(buf, N_FFT)[::HOP][:n_frames]
+        out = self._spectral(frames)
+
+        ola = np.zeros((n_frames + 1) * HOP, np.float32)
+        ola[:N_FFT - HOP] += self._ola
+        ola[:n_frames * HOP].reshape(n_frames, HOP)[:] += out[:, :HOP]
+        ola[HOP:(n_frames + 1) * HOP].reshape(n_frames, HOP)[:] += out[:, HOP:]
+        self._ola = ola[n_frames * HOP:]
+        self._in = buf[n_frames * HOP:]
+        return ola[:n_frames * HOP]
+
+    def _normalize(self, block):
+        if not self.options["loudness"] or not len(block):
+            return block
+        n = len(block) // LOUDNESS_WINDOW
+        if n:
+            power = np.mean(block[:n * LOUDNESS_WINDOW].reshape(n, LOUDNESS_WINDOW) ** 2, axis=1)
+            loud = power[power > 10 ** (GATE_DBFS / 10)]
+            self._power_sum += float(loud.sum())
+            self._power_windows += len(loud)
+        target = self._gain if self._gain is not None else 1.0
+        if self._power_windows:
+            rms_db = 10 * np.log10(self._power_sum / self._power_windows)
+            gain_db = min(self.options["target_dbfs"] - rms_db, self.options["max_gain_db"])
+            target = 10 ** (gain_db / 20)
+        start = self._gain if self._gain is not None else target
+        self._gain = target
+        ramp = np.linspace(start, target, len(block), dtype=np.float32)   # no clicks between blocks
+        return np.clip(block * ramp, -0.99, 0.99)
+
+    # --- stream ---
+    def process(self, block):
+        """Enhance one block (mono or (samples, channels)); returns the samples ready so far."""
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 2:
+            block = block.mean(axis=1)
+        self._received += len(block)
+        out = self._stft_filter(block)
+        if self._delay:
+            drop = min(self._delay, len(out))
+            out = out[drop:]
+            self._delay -= drop
+        out = self._normalize(out)
+        self._emitted += len(out)
+        return out
+
+    def flush(self):
+        """Push out the samples still held by the STFT (call once at the end)."""
+        pad = np.zeros(N_FFT, np.float32)
+        out = self.process(pad)
+        self._received -= len(pad)
+        out = out[:max(0, len(out) - (self._emitted - self._received))]
+        self._emitted = self._received
+        return out
+
+    def stream(self, blocks):
+        for block in blocks:
+            out = self.process(block)
+            if len(out):
+                yield out
+        tail = self.flush()
+        if len(tail):
+            yield tail
+
+
+def decoded_blocks(path, block_size, sample_rate=SAMPLE_RATE):
+    """(samples, channels) float32 blocks of `path`, resampled by FFmpeg while it decodes."""
+    channels = probe_audio(path).get("channels") or 1
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", str(path),
+           "-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(sample_rate), "-ac", str(channels), "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    frame_bytes = 4 * channels
+    pending = b""
+    try:
+        while True:
+            data = proc.stdout.read(block_size * frame_bytes - len(pending))
+            if not data:
+                break
+            pending += data
+            if len(pending) >= block_size * frame_bytes:
+                yield np.frombuffer(pending, np.float32).reshape(-1, channels)
+                pending = b""
+        usable = len(pending) - len(pending) % frame_bytes
+        if usable:
+            yield np.frombuffer(pending[:usable], np.float32).reshape(-1, channels)
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"Failed to decode {path}: {stderr.decode(errors='ignore')[-500:]}")
+
+
+def preprocessed_blocks(path, **options):
+    """Enhanced 16 kHz mono float32 blocks of one file."""
+    pre = Preprocessor(**options)
+    return pre.stream(decoded_blocks(path, pre.block_size))
+
+
+def preprocess_file(src, dst, **options):
+    """Stream `src` through the pipeline into a 16-bit WAV at `dst`; returns timing stats."""
+    start = time.perf_counter()
+    Path(dst).parent.mkdir(parents=True, exist_ok=True)
+    samples = 0
+    with wave.open(str(dst), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        for block in preprocessed_blocks(src, **options):
+            w.writeframes((block * 32767).astype(np.int16).tobytes())
+            samples += len(block)
+    elapsed = time.perf_counter() - start
+    duration = samples / SAMPLE_RATE
+    return {"file": Path(src).name, "output": str(dst), "duration_sec": round(duration, 2),
+            "processing_time_sec": round(elapsed, 4), "rtf": round(elapsed / duration, 4) if duration else 0}
+
+
+def _preprocess_task(task):
+    src, dst, options = task
+    return preprocess_file(src, dst, **options)
+
+
+def preprocess_files(paths, out_dir, workers=None, suffix="_enhanced", **options):
+    """Enhance many files in parallel (one process per file); returns per-file stats in input order."""
+    tasks = [(str(p), str(Path(out_dir) / f"{Path(p).stem.removesuffix('_16k')}{suffix}.wav"), options)
+             for p in paths]
+    workers = os.cpu_count() if workers is None else workers
+    if workers and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            return list(pool.map(_preprocess_task, tasks))
+    return [_preprocess_task(t) for t in tasks]
+
+
+def options_key(options=None):
+    merged = {**DEFAULT_OPTIONS, **(options or {})}
+    return hashlib.sha256(json.dumps(merged, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def load_preprocessed_pcm(path, options=None, use_cache=True):
+    """
+    Enhanced PCM of `path` as a read-only memory-mapped float32 array, cached
+    next to the decoded-PCM cache (keyed by file hash + options). The cache file
+    is filled block by block, so building it never holds the whole file in memory.
+
+    use_cache: False builds the array in memory and writes nothing, for one-off
+               inputs such as service uploads.
+    """
+    options = options or {}
+    if not use_cache:
+        blocks = list(preprocessed_blocks(path, **options))
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+    cache = get_cache()
+    npy_path = cache.cache_dir / f"{file_hash(path)}_{SAMPLE_RATE}hz_mono_f32_pre{options_key(options)}.npy"
+    if not npy_path.exists():
+        cache.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, raw = tempfile.mkstemp(dir=cache.cache_dir, suffix=".f32.tmp")
+        try:
+            samples = 0
+            with os.fdopen(fd, "wb") as f:
+                for block in preprocessed_blocks(path, **options):
+                    f.write(block.tobytes())
+                    samples += len(block)
+            fd, tmp = tempfile.mkstemp(dir=cache.cache_dir, suffix=".npy.tmp")
+            os.close(fd)
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(samples,))
+            step = SAMPLE_RATE * 60
+            for offset in range(0, samples, step):
+                out[offset:offset + step] = np.fromfile(raw, np.float32, count=step, offset=offset * 4)
+            out.flush()
+            del out
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, npy_path)   # write-then-rename, like the decode cache
+        finally:
+            os.unlink(raw)
+    return np.load(npy_path, mmap_mode="r")
+
+
+# --- A/B benchmark: each file with preprocessing off and on ---
+def ab_benchmark(backend_name, model_cfg, audio_files, references, repeats=1):
+    """
+    Benchmark every file twice on one loaded backend (raw PCM, then enhanced PCM)
+    and score both transcripts. Returns one row per file with RTF / WER for
+    each side and the deltas (on - off; negative WER delta = improvement).
+    """
+    from code.autotune import reference_key
+    from code.benchmark_harness import benchmark_file
+    from code.metrics_calculator import _normalize_text
+    from code.metrics_engine import score_pair
+    from models.registry import create_backend
+
+    backends = {}
+    for mode in ("off", "on"):
+        backends[mode], _ = create_backend(backend_name, {**model_cfg, "preprocess": mode == "on"})
+    backends["off"].load()
+    backends["on"].model, backends["on"].load_time = backends["off"].model, backends["off"].load_time
+
+    rows = []
+    for audio_file in audio_files:
+        row = {"file": audio_file.name}
+        reference = references.get(reference_key(audio_file))
+        for mode, backend in backends.items():
+            print(f"🎧 {audio_file.name} | preprocessing {mode}")
+            record = benchmark_file(backend, audio_file, repeats=repeats)
+            row[f"rtf_{mode}"] = record["rtf"]
+            row[f"decode_sec_{mode}"] = record["phases"]["decode_audio"]["p50"]
+            row[f"WER_{mode}"] = (score_pair(reference, _normalize_text(record["transcript"]))["WER"]
+                                  if reference is not None else None)
+        row["rtf_delta"] = round(row["rtf_on"] - row["rtf_off"], 4)
+        row["WER_delta"] = (round(row["WER_on"] - row["WER_off"], 4)
+                            if row["WER_on"] is not None and row["WER_off"] is not None else None)
+        rows.append(row)
+    return rows
+
+
+def print_ab(rows):
+    print("\n========== PREPROCESSING A/B (off -> on) ==========")
+    for r in rows:
+        print(f"{r['file']:<52} RTF: {r['rtf_off']} -> {r['rtf_on']} | "
+              f"WER: {r['WER_off']} -> {r['WER_on']} (Δ {r['WER_delta']})")
+    print("===================================================")
+
+
+def main(argv=None):
+    from code.autotune import AUDIO_DIR, GROUND_TRUTH, load_references
+    from models.base_backend import list_audio_files
+    from models.registry import load_config, CONFIG_PATH
+
+    parser = argparse.ArgumentParser(description="Streaming audio preprocessing.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Enhance files into <out-dir>/<name>_enhanced.wav.")
+    run.add_argument("inputs", nargs="+", help="Audio files or directories.")
+    run.add_argument("--out-dir", required=True)
+    run.add_argument("--workers", type=int, default=None)
+    ab = sub.add_parser("ab", help="Per-file RTF / WER of a backend with preprocessing off vs on.")
+    ab.add_argument("--backend", default="faster-whisper")
+    ab.add_argument("--config", default=str(CONFIG_PATH))
+    ab.add_argument("--audio-dir", default=str(AUDIO_DIR))
+    ab.add_argument("--ground-truth", default=str(GROUND_TRUTH))
+    ab.add_argument("--repeats", type=int, default=1)
+    ab.add_argument("--output", default=str(BASE_DIR / "results" / "reports" / "preprocessing_ab.json"))
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        paths = [p for item in args.inputs
+                 for p in (list_audio_files(item) if Path(item).is_dir() else [Path(item)])]
+        for stats in preprocess_files(paths, args.out_dir, workers=args.workers):
+            print(f"✅ {stats['file']} -> {stats['output']} ({stats['duration_sec']}s audio, RTF {stats['rtf']})")
+        return None
+
+    config = load_config(args.config)
+    rows = ab_benchmark(args.backend, config[args.backend], list_audio_files(args.audio_dir),
+                        load_references(args.ground_truth), repeats=args.repeats)
+    print_ab(rows)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"backend": args.backend, "files": rows}, f, indent=2)
+    print(f"📁 A/B report saved to: {args.output}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# code/replica_planner.py
+"""
+replica_planner.py
+----------------------------------
+Core-pinned layouts of model replicas for CPU-only inference.
+
+One int8 model with 32-64 threads stops scaling long before the cores run
+out, and several unpinned processes each starting a full OpenMP team fight
+over the same cores. Instead the physical cores are split into N disjoint
+sets, one per replica, and each replica runs with:
+- its process affinity restricted to its own cores (os.sched_setaffinity),
+- cpu_threads = number of cores in the set,
+- OMP/MKL thread counts to match, with threads bound to their cores.
+
+Topology comes from /sys (physical package, core id, NUMA node) for the CPUs
+this process may use. SMT siblings count as one core (the second hardware
+thread adds little for GEMM-heavy decoding) unless use_smt=True, and core
+sets are cut in NUMA-node order so a replica does not straddle nodes when
+the split allows it.
+
+    python -m code.replica_planner                       # topology + candidate layouts
+    python -m code.replica_planner --backend faster-whisper --layouts 1x8 2x4 4x2 8x1
+
+The second form runs the benchmark set once per layout through the pinned
+process pool (code/parallel_runner.py) and reports aggregate audio-seconds
+processed per wall-second, to choose between few wide and many narrow
+replicas.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from glob import glob
+from pathlib import Path
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SYSFS = "/sys/devices/system"
+
+
+def parse_cpulist(text):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def _read(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def allowed_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CPUTopology:
+    """Physical cores (each a list of its logical CPUs) of the CPUs this process may use."""
+
+    def __init__(self, cores, node_of=None):
+        self.cores = cores                  # [[cpu, smt sibling, ...], ...] in NUMA-node order
+        self.node_of = node_of or {}        # cpu -> NUMA node
+
+    @property
+    def physical_cores(self):
+        return len(self.cores)
+
+    @property
+    def logical_cpus(self):
+        return sum(len(c) for c in self.cores)
+
+    @property
+    def nodes(self):
+        return sorted({self.node_of.get(c[0], 0) for c in self.cores})
+
+    def summary(self):
+        return {"physical_cores": self.physical_cores, "logical_cpus": self.logical_cpus,
+                "numa_nodes": len(self.nodes), "smt": self.logical_cpus > self.physical_cores}
+
+
+def read_topology(sysfs=SYSFS, cpus=None):
+    """Topology of `cpus` (default: this process's affinity) from sysfs; one core per CPU if unavailable."""
+    cpus = allowed_cpus() if cpus is None else cpus
+    node_of = {}
+    for node_dir in glob(f"{sysfs}/node/node[0-9]*"):
+        node = int(Path(node_dir).name[4:])
+        for cpu in parse_cpulist(_read(f"{node_dir}/cpulist", "")):
+            node_of[cpu] = node
+
+    cores = {}
+    for cpu in cpus:
+        base = f"{sysfs}/cpu/cpu{cpu}/topology"
+        package = int(_read(f"{base}/physical_package_id", 0))
+        core_id = int(_read(f"{base}/core_id", cpu))
+        cores.setdefault((node_of.get(cpu, 0), package, core_id), []).append(cpu)
+    ordered = [sorted(cores[key]) for key in sorted(cores)]
+    return CPUTopology(ordered, node_of)
+
+
+class Replica:
+    """One model replica: its index, pinned CPUs and thread count."""
+
+    def __init__(self, index, cpus, threads):
+        self.index = index
+        self.cpus = cpus
+        self.threads = threads
+
+    def env(self):
+        """Thread settings for a process running this replica (set before frameworks load)."""
+        env = {var: str(self.threads) for var in THREAD_ENV_VARS}
+        env.update({"OMP_PROC_BIND": "close", "OMP_PLACES": "cores"})
+        return env
+
+    def to_dict(self):
+        return {"index": self.index, "cpus": self.cpus, "threads": self.threads}
+
+    def __repr__(self):
+        return f"Replica({self.index}, cpus={self.cpus}, threads={self.threads})"
+
+
+def plan_replicas(topology, replicas, threads=None, use_smt=False):
+    """
+    Split the physical cores into `replicas` disjoint, contiguous core sets of
+    `threads` cores each (default: as many as divide evenly). Leftover cores
+    stay unused so every replica runs at the same width.
+    """
+    if replicas < 1:
+        raise ValueError("replicas must be >= 1")
+    threads = threads or topology.physical_cores // replicas
+    if threads < 1 or replicas * threads > topology.physical_cores:
+        raise ValueError(f"{replicas} replicas x {threads} cores doesn't fit "
+                         f"{topology.physical_cores} physical cores")
+    plan = []
+    for i in range(replicas):
+        cores = topology.cores[i * threads:(i + 1) * threads]
+        cpus = [cpu for core in cores for cpu in (core if use_smt else core[:1])]
+        plan.append(Replica(i, cpus, len(cpus)))
+    return plan
+
+
+def candidate_layouts(topology):
+    """(replicas, threads) pairs that use every physical core: 1xN ... Nx1."""
+    n = topology.physical_cores
+    return [(r, n // r) for r in range(1, n + 1) if n % r == 0]
+
+
+def parse_layout(text):
+    """'4x8' -> (4, 8)"""
+    replicas, _, threads = text.lower().partition("x")
+    return int(replicas), int(threads)
+
+
+def pin(replica):
+    """Pin the calling process to the replica's CPUs and set its thread env vars."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, replica.cpus)
+    os.environ.update(replica.env())
+
+
+def compare_layouts(backend, config, audio_dir, layouts, use_smt=False, repeats=1):
+    """
+    Run the audio set once per (replicas, threads) layout on a pinned process pool.
+    Returns one row per layout with aggregate audio-seconds per wall-second,
+    both end to end and excluding the (parallel) model loads at start-up.
+    """
+    from code.parallel_runner import run_parallel
+
+    rows = []
+    for replicas, threads in layouts:
+        print(f"\n📐 Layout {replicas}x{threads}")
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            result = run_parallel([backend], config, audio_dir, output_dir, workers=replicas,
+                                  threads_per_worker=threads, repeats=repeats, resume=False,
+                                  pin_cores=True, use_smt=use_smt)[backend]
+            wall = time.perf_counter() - start
+        audio_sec = sum(r["duration_sec"] for r in result["records"])
+        load = max((s["load_time_sec"] for s in result["startup"]), default=0.0)
+        rows.append({
+            "layout": f"{replicas}x{threads}",
+            "replicas": replicas,
+            "threads": threads,
+            "files": len(result["records"]),
+            "failures": len(result["failures"]),
+            "audio_sec": round(audio_sec, 2),
+            "wall_sec": round(wall, 3),
+            "audio_sec_per_wall_sec": round(audio_sec / wall, 3) if wall else None,
+            "audio_sec_per_wall_sec_excl_load": round(audio_sec / (wall - load), 3) if wall > load else None,
+        })
+    return rows
+
+
+def print_layouts(rows):
+    print("\n========== REPLICA LAYOUTS ==========")
+    print(f"{'layout':<8} {'files':>5} {'wall s':>8} {'audio s/wall s':>15} {'excl. load':>11}")
+    best = max(rows, key=lambda r: r["audio_sec_per_wall_sec"] or 0)
+    for r in rows:
+        mark = " ⭐" if r is best else ""
+        print(f"{r['layout']:<8} {r['files']:>5} {r['wall_sec']:>8} {r['audio_sec_per_wall_sec']!s:>15} "
+              f"{r['audio_sec_per_wall_sec_excl_load']!s:>11}{mark}")
+    print("=====================================")
+
+
+def main(argv=None):
+    from models.registry import load_config, CONFIG_PATH
+
+    parser = argparse.ArgumentParser(description="Plan and compare core-pinned CPU replica layouts.")
+    parser.add_argument("--backend", default=None, help="Benchmark this backend (key of model_configs.yaml).")
+    parser.add_argument("--config", default=str(CONFIG_PATH))
+    parser.add_argument("--audio-dir", default=str(BASE_DIR / "tests" / "test_audio_samples"))
+    parser.add_argument("--layouts", nargs="+", default=None, metavar="RxT",
+                        help="Layouts to compare, e.g. 1x16 2x8 4x4 (default: every even split).")
+    parser.add_argument("--smt", action="store_true", help="Give replicas the SMT siblings of their cores too.")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", default=str(BASE_DIR / "results" / "reports" / "replica_layouts.json"))
+    args = parser.parse_args(argv)
+
+    topology = read_topology()
+    layouts = [parse_layout(l) for l in args.layouts] if args.layouts else candidate_layouts(topology)
+    print(f"🖥️ Topology: {topology.summary()}")
+    for replicas, threads in layouts:
+        plan = plan_replicas(topology, replicas, threads, use_smt=args.smt)
+        print(f"  {replicas}x{threads}: " + " | ".join(",".join(map(str, r.cpus)) for r in plan))
+    if not args.backend:
+        return None
+
+    config = load_config(args.config)
+    rows = compare_layouts(args.backend, config, args.audio_dir, layouts, use_smt=args.smt, repeats=args.repeats)
+    print_layouts(rows)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"backend": args.backend, "topology": topology.summary(), "layouts": rows}, f, indent=2)
+    print(f"📁 Layout comparison saved to: {args.output}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,31 @@
-import psutil
-import time
+# code/resource_monitor.py
+"""
+resource_monitor.py
+----------------------------------
+Low-overhead resource sampling for the inference process tree.
+
+A daemon thread samples, every `interval` seconds:
+- CPU : CPU time of this process and its children (psutil cpu_times deltas),
+        so other processes on the machine don't leak into the numbers
+- RSS : resident memory of the same process tree
+- GPU : device utilization / memory (NVML handles resolved once) and the GPU
+        memory held by processes of the tree
+
+Samples go into a fixed-size numpy ring buffer with timestamps; count, sum
+and max are kept as running totals over the whole run and percentiles are
+taken over the samples still in the ring (the most recent `capacity`). CPU
+per sample is the tree's CPU-time rate over the trailing CPU_WINDOW_SEC. The
+child-process list is refreshed only every `children_refresh` seconds, so a
+10 ms interval costs a few percent of one core at most (reported as
+monitor_cpu_sec).
+"""
+
 import threading
+import time
+from collections import deque
+
+import numpy as np
+import psutil
 
 try:
     import pynvml
@@ -9,64 +34,169 @@ try:
 except Exception:
     HAS_NVML = False
 
+# CPU time is only accounted in scheduler ticks (~10 ms), so per-sample CPU is
+# measured over a short trailing window instead of the last interval alone
+CPU_WINDOW_SEC = 0.1
+
+_nvml_handles = None
+
+
+def nvml_handles():
+    """NVML device handles, looked up once per process."""
+    global _nvml_handles
+    if _nvml_handles is None:
+        _nvml_handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+    return _nvml_handles
+
+
+class RingBuffer:
+    """Fixed-capacity array of samples (one column per metric) with running count/sum/max."""
+
+    def __init__(self, columns, capacity=65536):
+        self.columns = {name: i for i, name in enumerate(columns)}
+        self.capacity = capacity
+        self.data = np.zeros((capacity, len(columns)))
+        self.count = 0                                   # samples ever appended
+        self.sum = np.zeros(len(columns))
+        self.max = np.full(len(columns), -np.inf)
+
+    def append(self, row):
+        row = np.asarray(row, dtype=float)
+        self.data[self.count % self.capacity] = row
+        self.count += 1
+        self.sum += row
+        np.maximum(self.max, row, out=self.max)
+
+    def values(self, column):
+        """Retained samples of one column, oldest first."""
+        col = self.data[:, self.columns[column]]
+        if self.count <= self.capacity:
+            return col[:self.count].copy()
+        start = self.count % self.capacity
+        return np.concatenate((col[start:], col[:start]))
+
+    def mean(self, column):
+        return float(self.sum[self.columns[column]] / self.count) if self.count else 0.0
+
+    def peak(self, column):
+        return float(self.max[self.columns[column]]) if self.count else 0.0
+
+    def percentile(self, column, q):
+        values = self.values(column)
+        return float(np.percentile(values, q)) if len(values) else 0.0
+
 
 class ResourceMonitor:
     """
-    Monitors CPU, RAM, and GPU (if available) usage during model inference.
-    Automatically adapts the sampling interval for short GPU bursts.
+    Monitors CPU, RAM, and GPU (if available) usage of the inference process
+    tree during model inference.
     """
-    def __init__(self, interval=0.1, expected_duration=None):
+
+    COLUMNS = ("t", "cpu", "rss", "gpu", "gpu_mem", "gpu_proc_mem")
+
+    def __init__(self, interval=0.01, capacity=65536, pid=None, children_refresh=0.5):
         """
-        interval: Sampling frequency (seconds). If None, it adapts automatically.
-        expected_duration: Estimated inference duration in seconds (optional).
+        interval: Sampling period (seconds).
+        capacity: Samples kept for percentiles (ring buffer size).
+        pid: Root of the monitored process tree (default: this process).
+        children_refresh: How often (seconds) the child-process list is re-scanned.
         """
-        # # Auto-tune interval based on expected duration
-        # if interval is None:
-        #     if expected_duration and expected_duration < 10:
-        #         interval = 0.1    # Fast sampling for short runs
-        #     elif expected_duration and expected_duration < 60:
-        #         interval = 0.1
-        #     else:
-        #         interval = 0.1    # Long runs -> reduce overhead
         self.interval = interval
+        self.children_refresh = children_refresh
+        self.root = psutil.Process(pid)
+        self.cpu_count = psutil.cpu_count() or 1
+        self.total_mem = psutil.virtual_memory().total
+        self.buffer = RingBuffer(self.COLUMNS, capacity)
 
-        self.cpu_usage = []
-        self.memory_usage = []
-        self.gpu_usage = []
-        self.gpu_mem = []
         self.running = False
         self.thread = None
+        self.started_at = None
+        self.monitor_cpu_sec = 0.0
+        self._procs = {}              # pid -> psutil.Process (kept so psutil can reuse its state)
+        self._children_at = 0.0
+        self._cpu_history = deque()   # (t, tree cpu seconds) within CPU_WINDOW_SEC
+
+    # --- sampling ---
+    def _tree(self, now):
+        if now - self._children_at >= self.children_refresh:
+            self._children_at = now
+            try:
+                current = [self.root] + self.root.children(recursive=True)
+            except psutil.NoSuchProcess:
+                current = []
+            self._procs = {p.pid: self._procs.get(p.pid, p) for p in current}
+        return self._procs
+
+    def _tree_usage(self, now):
+        """(cpu seconds, rss bytes) summed over the process tree."""
+        cpu, rss = 0.0, 0
+        for pid, proc in list(self._tree(now).items()):
+            try:
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    cpu += times.user + times.system
+                    if proc is self.root:   # includes children that already exited
+                        cpu += times.children_user + times.children_system
+                    rss += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                self._procs.pop(pid, None)
+        return cpu, rss
+
+    def _gpu_usage(self):
+        """(avg utilization %, avg memory %, tree GPU memory bytes) across devices."""
+        util, mem, proc_mem = [], [], 0
+        for handle in nvml_handles():
+            util.append(pynvml.nvmlDeviceGetUtilizationRates(handle).gpu)
+            info = pynvml.nvmlDeviceGetMemoryInfo(handle)
+            mem.append(info.used / info.total * 100)
+            for p in pynvml.nvmlDeviceGetComputeRunningProcesses(handle):
+                if p.pid in self._procs and p.usedGpuMemory:
+                    proc_mem += p.usedGpuMemory
+        return sum(util) / len(util), sum(mem) / len(mem), proc_mem
+
+    def sample(self):
+        """Take one sample now (also usable without the background thread)."""
+        now = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = now
+        cpu_time, rss = self._tree_usage(now)
+        history = self._cpu_history
+        history.append((now, cpu_time))
+        while len(history) > 2 and now - history[1][0] >= CPU_WINDOW_SEC:
+            history.popleft()
+        cpu_pct = 0.0
+        (t0, cpu0) = history[0]
+        if now > t0:
+            # share of the whole machine, like psutil.cpu_percent(). Children that start
+            # and exit between list refreshes land in one window, hence the clamp.
+            cpu_pct = min(100.0, max(0.0, (cpu_time - cpu0) / (now - t0) / self.cpu_count * 100))
+
+        gpu = gpu_mem = gpu_proc_mem = 0.0
+        if HAS_NVML:
+            try:
+                gpu, gpu_mem, gpu_proc_mem = self._gpu_usage()
+            except Exception:
+                pass
+        self.buffer.append((now - self.started_at, cpu_pct, rss, gpu, gpu_mem, gpu_proc_mem))
 
     def _monitor(self):
+        thread_start = time.thread_time()
+        deadline = time.perf_counter()
         while self.running:
-            # CPU + RAM
-            cpu = psutil.cpu_percent(interval=None)
-            mem = psutil.virtual_memory().percent
-            self.cpu_usage.append(cpu)
-            self.memory_usage.append(mem)
-
-            # GPU
-            if HAS_NVML:
-                try:
-                    device_count = pynvml.nvmlDeviceGetCount()
-                    util_list, mem_list = [], []
-                    for i in range(device_count):
-                        handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                        util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                        mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                        util_list.append(util.gpu)
-                        mem_list.append(mem_info.used / mem_info.total * 100)
-                    # Average across all GPUs
-                    self.gpu_usage.append(sum(util_list) / len(util_list))
-                    self.gpu_mem.append(sum(mem_list) / len(mem_list))
-                except Exception:
-                    pass
-
-            time.sleep(self.interval)
+            self.sample()
+            deadline += self.interval
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.perf_counter()   # fell behind: don't burst to catch up
+        self.monitor_cpu_sec = time.thread_time() - thread_start
 
     def start(self):
+        self.started_at = time.perf_counter()
+        self._cpu_history = deque([(self.started_at, self._tree_usage(self.started_at)[0])])
         self.running = True
-        self.thread = threading.Thread(target=self._monitor, daemon=True)
+        self.thread = threading.Thread(target=self._monitor, name="resource-monitor", daemon=True)
         self.thread.start()
 
     def stop(self):
@@ -74,19 +204,36 @@ class ResourceMonitor:
         if self.thread:
             self.thread.join(timeout=1)
 
+    # --- results ---
+    def series(self, column):
+        """(timestamps_sec, values) of the retained samples for one column."""
+        return self.buffer.values("t"), self.buffer.values(column)
+
     def get_summary(self):
+        b = self.buffer
+        mb = 1024 * 1024
+        elapsed = b.peak("t") if b.count else 0.0
         summary = {
-            "avg_cpu": sum(self.cpu_usage) / len(self.cpu_usage) if self.cpu_usage else 0,
-            "max_cpu": max(self.cpu_usage, default=0),
-            "avg_mem": sum(self.memory_usage) / len(self.memory_usage) if self.memory_usage else 0,
-            "max_mem": max(self.memory_usage, default=0),
+            "avg_cpu": round(b.mean("cpu"), 2),
+            "max_cpu": round(b.peak("cpu"), 2),
+            "p95_cpu": round(b.percentile("cpu", 95), 2),
+            "avg_cpu_cores": round(b.mean("cpu") * self.cpu_count / 100, 2),
+            "avg_mem": round(b.mean("rss") / self.total_mem * 100, 2),
+            "max_mem": round(b.peak("rss") / self.total_mem * 100, 2),
+            "avg_rss_mb": round(b.mean("rss") / mb, 1),
+            "max_rss_mb": round(b.peak("rss") / mb, 1),
+            "p95_rss_mb": round(b.percentile("rss", 95) / mb, 1),
+            "monitor_samples": b.count,
+            "monitor_interval_ms": round(elapsed / max(1, b.count - 1) * 1000, 2) if b.count > 1 else None,
+            "monitor_cpu_sec": round(self.monitor_cpu_sec, 4),
         }
 
-        if self.gpu_usage:
+        if HAS_NVML and b.count:
             summary.update({
-                "avg_gpu": sum(self.gpu_usage) / len(self.gpu_usage),
-                "max_gpu": max(self.gpu_usage, default=0),
-                "avg_gpu_mem": sum(self.gpu_mem) / len(self.gpu_mem),
-                "max_gpu_mem": max(self.gpu_mem, default=0),
+                "avg_gpu": round(b.mean("gpu"), 2),
+                "max_gpu": round(b.peak("gpu"), 2),
+                "avg_gpu_mem": round(b.mean("gpu_mem"), 2),
+                "max_gpu_mem": round(b.peak("gpu_mem"), 2),
+                "max_gpu_proc_mem_mb": round(b.peak("gpu_proc_mem") / mb, 1),
             })
         return summary
@@ -0,0 +1,340 @@
+# code/results_store.py
+"""
+results_store.py
+----------------------------------
+Local SQLite store for transcription and metrics results across runs.
+
+Every benchmark run (code/model_comparison.py) registers a row in `runs` and
+writes one `transcriptions` row per (backend, file); code/transcription_benchmark.py
+adds one `metrics` row per (backend, file) against the reference backend.
+Comparing results becomes a query instead of re-reading every report JSON:
+
+    with ResultsStore() as store:
+        store.stats("rtf", by="backend", language="ur", since_run="20261018-101500")
+        store.combined_summary()          # latest result per (backend, file)
+
+- Backends are labelled `<variant>_<model>` (same as the report file names),
+  taken from the records themselves, so no short-name mapping is needed.
+- The filter columns (run, backend, file, language, config key) are indexed;
+  headline numbers get their own columns and the full record is kept as JSON.
+- Runs are ordered by an integer sequence, so "since run X" is a range scan.
+- Percentiles are computed with numpy over the matching rows (SQLite has no
+  percentile aggregate); tens of thousands of rows take milliseconds.
+
+The database is a single file (default results/results.sqlite), opened in WAL
+mode so reports can be queried while a run is writing.
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+import uuid
+from collections import defaultdict
+from glob import glob
+from pathlib import Path
+
+import numpy as np
+
+from code.run_manifest import config_fingerprint
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DB = BASE_DIR / "results" / "results.sqlite"
+
+# record keys stored as real columns (everything else stays in the JSON blob)
+TRANSCRIPTION_COLUMNS = (
+    "framework", "model", "device", "compute_type", "language",
+    "duration_sec", "processing_time_sec", "rtf", "rtf_p95", "first_segment_sec",
+    "avg_cpu", "max_cpu", "avg_mem", "max_mem", "avg_gpu", "max_gpu", "avg_gpu_mem", "max_gpu_mem",
+)
+METRIC_COLUMNS = ("WER", "CER", "reference_len_chars", "prediction_len_chars")
+NUMERIC_COLUMNS = {
+    "transcriptions": {"duration_sec", "processing_time_sec", "rtf", "rtf_p95", "first_segment_sec",
+                       "avg_cpu", "max_cpu", "avg_mem", "max_mem", "avg_gpu", "max_gpu",
+                       "avg_gpu_mem", "max_gpu_mem"},
+    "metrics": {"WER", "CER", "reference_len_chars", "prediction_len_chars"},
+}
+GROUP_COLUMNS = {"backend", "file", "language", "device", "compute_type", "run_id", "model", "framework"}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id      TEXT UNIQUE NOT NULL,
+    started_at  REAL NOT NULL,
+    label       TEXT,
+    info        TEXT
+);
+CREATE TABLE IF NOT EXISTS transcriptions (
+    id          INTEGER PRIMARY KEY,
+    run_seq     INTEGER NOT NULL REFERENCES runs(seq),
+    backend     TEXT NOT NULL,
+    file        TEXT NOT NULL,
+    config_key  TEXT,
+    {", ".join(f"{c} {'REAL' if c in NUMERIC_COLUMNS['transcriptions'] else 'TEXT'}" for c in TRANSCRIPTION_COLUMNS)},
+    record      TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_tr_run ON transcriptions(run_seq);
+CREATE INDEX IF NOT EXISTS ix_tr_backend_file ON transcriptions(backend, file, run_seq);
+CREATE INDEX IF NOT EXISTS ix_tr_file ON transcriptions(file);
+CREATE INDEX IF NOT EXISTS ix_tr_language ON transcriptions(language);
+CREATE INDEX IF NOT EXISTS ix_tr_config ON transcriptions(config_key);
+CREATE TABLE IF NOT EXISTS metrics (
+    id          INTEGER PRIMARY KEY,
+    run_seq     INTEGER NOT NULL REFERENCES runs(seq),
+    backend     TEXT NOT NULL,
+    reference   TEXT NOT NULL,
+    file        TEXT NOT NULL,
+    WER REAL, CER REAL, reference_len_chars INTEGER, prediction_len_chars INTEGER,
+    counts      TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_mt_run ON metrics(run_seq);
+CREATE INDEX IF NOT EXISTS ix_mt_backend_file ON metrics(backend, file, run_seq);
+CREATE INDEX IF NOT EXISTS ix_mt_file ON metrics(file);
+"""
+
+
+def backend_label(record):
+    """`<variant>_<model>`, the label used for report files and store rows."""
+    return f"{record.get('variant')}_{record.get('model')}"
+
+
+def config_key(model_cfg):
+    payload = json.dumps(config_fingerprint(model_cfg), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def new_run_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+class ResultsStore:
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.conn.close()
+
+    # --- runs ---
+    def start_run(self, label=None, **info):
+        """Register a run; returns its run_id."""
+        run_id = new_run_id()
+        with self.conn:
+            self.conn.execute("INSERT INTO runs (run_id, started_at, label, info) VALUES (?, ?, ?, ?)",
+                              (run_id, time.time(), label, json.dumps(info, default=str)))
+        return run_id
+
+    def runs(self):
+        return self.query("SELECT run_id, started_at, label, info FROM runs ORDER BY seq")
+
+    def latest_run(self):
+        row = self.conn.execute("SELECT run_id FROM runs ORDER BY seq DESC LIMIT 1").fetchone()
+        return row["run_id"] if row else None
+
+    def transcription_run(self, backend):
+        """run_id of the newest run holding transcriptions of `backend` (None if there is none)."""
+        row = self.conn.execute("SELECT runs.run_id FROM transcriptions JOIN runs ON runs.seq = transcriptions.run_seq "
+                                "WHERE transcriptions.backend = ? ORDER BY transcriptions.run_seq DESC LIMIT 1",
+                                (backend,)).fetchone()
+        return row["run_id"] if row else None
+
+    def _run_seq(self, run_id):
+        row = self.conn.execute("SELECT seq FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown run: {run_id}")
+        return row["seq"]
+
+    # --- writes ---
+    def add_transcriptions(self, run_id, records, model_cfg=None):
+        """
+        Insert result records (as written to *_results.json) in one transaction.
+        model_cfg, if given, is fingerprinted into config_key so runs of the same
+        backend with different settings can be told apart.
+        """
+        seq = self._run_seq(run_id)
+        key = config_key(model_cfg) if model_cfg is not None else None
+        rows = [(seq, backend_label(r), r.get("file"), key,
+                 *(r.get(c) for c in TRANSCRIPTION_COLUMNS), json.dumps(r, ensure_ascii=False))
+                for r in records if r.get("file")]
+        columns = ("run_seq", "backend", "file", "config_key", *TRANSCRIPTION_COLUMNS, "record")
+        with self.conn:
+            self.conn.executemany(f"INSERT INTO transcriptions ({', '.join(columns)}) "
+                                  f"VALUES ({', '.join('?' * len(columns))})", rows)
+        return len(rows)
+
+    def add_metrics(self, run_id, reference, per_file):
+        """Insert metrics rows; per_file is {backend: [rows]} as returned by evaluate_models."""
+        seq = self._run_seq(run_id)
+        rows = [(seq, backend, reference, r["file"], *(r.get(c) for c in METRIC_COLUMNS),
+                 json.dumps({k: r[k] for k in ("word_counts", "char_counts") if k in r}))
+                for backend, items in per_file.items() for r in items if r.get("file")]
+        with self.conn:
+            self.conn.executemany("INSERT INTO metrics (run_seq, backend, reference, file, WER, CER, "
+                                  "reference_len_chars, prediction_len_chars, counts) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    # --- queries ---
+    def query(self, sql, params=()):
+        """Run any SELECT; rows as dicts."""
+        return [dict(r) for r in self.conn.execute(sql, params)]
+
+    def _filters(self, table, run=None, since_run=None, backends=None, language=None, files=None):
+        clauses, params = [], []
+        if run is not None:
+            clauses.append(f"{table}.run_seq = ?")
+            params.append(self._run_seq(run))
+        if since_run is not None:
+            clauses.append(f"{table}.run_seq >= ?")
+            params.append(self._run_seq(since_run))
+        for column, values in (("backend", backends), ("file", files)):
+            if values:
+                values = [values] if isinstance(values, str) else list(values)
+                clauses.append(f"{table}.{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if language is not None:
+            clauses.append("transcriptions.language = ?")
+            params.append(language)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def stats(self, column="rtf", by="backend", percentiles=(50, 95), **filters):
+        """
+        Count / mean / percentiles of one numeric column grouped by another, e.g.
+        stats("rtf", by="backend", language="ur", since_run=run_id).
+        Filters: run, since_run, backends, language, files. Metric columns
+        (WER, CER, ...) are joined to the transcription of the same run/backend/file.
+        """
+        table = "metrics" if column in NUMERIC_COLUMNS["metrics"] else "transcriptions"
+        if column not in NUMERIC_COLUMNS[table]:
+            raise ValueError(f"Not a numeric column: {column}")
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Can't group by {by!r}; one of {sorted(GROUP_COLUMNS)}")
+
+        source = "transcriptions"
+        if table == "metrics":
+            source = ("metrics JOIN transcriptions ON transcriptions.run_seq = metrics.run_seq "
+                      "AND transcriptions.backend = metrics.backend AND transcriptions.file = metrics.file")
+        group = "runs.run_id" if by == "run_id" else f"{'transcriptions' if by not in ('backend', 'file') else table}.{by}"
+        where, params = self._filters(table, **filters)
+        sql = (f"SELECT {group} AS grp, {table}.{column} AS value FROM {source} "
+               f"JOIN runs ON runs.seq = {table}.run_seq{where}")
+
+        groups = defaultdict(list)
+        for grp, value in self.conn.execute(sql, params):
+            if value is not None:
+                groups[grp].append(value)
+        out = {}
+        for grp in sorted(groups, key=str):
+            values = np.asarray(groups[grp], dtype=float)
+            out[grp] = {"count": len(values), "mean": round(float(values.mean()), 4),
+                        **{f"p{q}": round(float(np.percentile(values, q)), 4) for q in percentiles}}
+        return out
+
+    def latest_results(self, run=None, **filters):
+        """Most recent transcription row per (backend, file), optionally within one run."""
+        where, params = self._filters("transcriptions", run=run, **filters)
+        sql = ("SELECT transcriptions.* FROM transcriptions JOIN ("
+               f"  SELECT backend, file, MAX(id) AS id FROM transcriptions{where} GROUP BY backend, file"
+               ") latest ON latest.id = transcriptions.id ORDER BY transcriptions.file, transcriptions.backend")
+        return self.query(sql, params)
+
+    def latest_metrics(self, run=None, **filters):
+        """Most recent metrics row per (backend, file)."""
+        where, params = self._filters("metrics", run=run, **filters)
+        sql = ("SELECT metrics.* FROM metrics JOIN ("
+               f"  SELECT backend, file, MAX(id) AS id FROM metrics{where} GROUP BY backend, file"
+               ") latest ON latest.id = metrics.id")
+        return self.query(sql, params)
+
+    def combined_summary(self, run=None, **filters):
+        """[{"file", "models": {backend: {...}}}] — latest results joined with their metrics."""
+        combined = defaultdict(dict)
+        for row in self.latest_results(run=run, **filters):
+            combined[row["file"]][row["backend"]] = {
+                c: row[c] for c in ("framework", "device", "compute_type", "duration_sec",
+                                    "processing_time_sec", "rtf", "avg_cpu", "max_cpu", "avg_mem",
+                                    "max_mem", "avg_gpu", "max_gpu", "avg_gpu_mem", "max_gpu_mem")}
+        metric_filters = {k: v for k, v in filters.items() if k != "language"}
+        for row in self.latest_metrics(run=run, **metric_filters):
+            if row["file"] in combined:
+                combined[row["file"]].setdefault(row["backend"], {}).update(
+                    {c: row[c] for c in METRIC_COLUMNS})
+        return [{"file": fname, "models": models} for fname, models in combined.items()]
+
+    # --- import of existing JSON reports ---
+    def import_reports(self, report_dir, label="import"):
+        """
+        Load *_results.json and metrics_*_vs_baseline.json from a report directory
+        into a new run. Metrics files name their model by a short name; it is
+        matched to the one imported backend label containing it.
+        """
+        run_id = self.start_run(label=label, report_dir=str(report_dir))
+        labels = set()
+        for path in sorted(glob(str(Path(report_dir) / "*_results.json"))):
+            records = _read_json_list(path)
+            self.add_transcriptions(run_id, records)
+            labels.update(backend_label(r) for r in records)
+
+        reference = next((b for b in labels if b.startswith("openai-whisper")), "baseline")
+        per_file = {}
+        for path in sorted(glob(str(Path(report_dir) / "metrics_*_vs_baseline.json"))):
+            short = Path(path).name.removeprefix("metrics_").removesuffix("_vs_baseline.json")
+            matches = [b for b in labels if short in b]
+            per_file[matches[0] if len(matches) == 1 else short] = _read_json_list(path)
+        self.add_metrics(run_id, reference, per_file)
+        return run_id
+
+
+def _read_json_list(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [data] if isinstance(data, dict) else data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the benchmark results store.")
+    parser.add_argument("--db", default=str(DEFAULT_DB))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("runs", help="List runs.")
+    stats = sub.add_parser("stats", help="Percentiles of a column grouped by another.")
+    stats.add_argument("column", nargs="?", default="rtf")
+    stats.add_argument("--by", default="backend")
+    stats.add_argument("--language", default=None)
+    stats.add_argument("--since", dest="since_run", default=None, help="Only runs from this run_id on.")
+    stats.add_argument("--run", default=None)
+    stats.add_argument("--backends", nargs="+", default=None)
+    imp = sub.add_parser("import", help="Import existing report JSONs as a run.")
+    imp.add_argument("report_dir", nargs="?", default=str(BASE_DIR / "results" / "reports"))
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        if args.command == "runs":
+            for run in store.runs():
+                started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started_at"]))
+                print(f"{run['run_id']:<24} {started}  {run['label'] or ''}")
+        elif args.command == "stats":
+            result = store.stats(args.column, by=args.by, language=args.language, since_run=args.since_run,
+                                 run=args.run, backends=args.backends)
+            print(f"\n========== {args.column} by {args.by} ==========")
+            for grp, s in result.items():
+                print(f"{str(grp):<32} n={s['count']:<6} mean={s['mean']:<8} p50={s['p50']:<8} p95={s['p95']}")
+        elif args.command == "import":
+            print(f"✅ Imported {args.report_dir} as run {store.import_reports(args.report_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# code/run_manifest.py
+"""
+run_manifest.py
+----------------------------------
+Append-only checkpoint log that makes benchmark sweeps resumable.
+
+Every finished (file, backend) result is appended as one JSON line to
+`run_manifest.jsonl` in the output directory, keyed by
+SHA-256(audio content hash, backend, model name, decode config, warmup,
+repeats). On the next run, pairs whose key is already in the log are
+reused instead of re-transcribed, so:
+- an interrupted sweep resumes where it stopped,
+- adding one sample to the corpus costs one transcription per backend,
+- changing a model's config (or the audio) invalidates only its entries.
+
+The effective cpu_threads is part of the key (records hold timings, which
+depend on it); parallel runners key on the config as their workers run it
+(with_threads). A cpu_threads of 0 / None is the framework default and is
+left out. Report paths are runtime-only and not part of the key.
+A line cut short by a crash is ignored on load.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from code.audio_cache import file_hash
+
+MANIFEST_NAME = "run_manifest.jsonl"
+
+# model-config keys that don't change the transcript / measurement being cached
+RUNTIME_KEYS = {"output_json", "output_dir"}
+
+
+def with_threads(model_cfg, threads=None):
+    """model_cfg as a worker with `threads` CPU threads runs it (an explicit cpu_threads wins)."""
+    if threads and not model_cfg.get("cpu_threads"):
+        return {**model_cfg, "cpu_threads": threads}
+    return model_cfg
+
+
+def config_fingerprint(model_cfg):
+    return {k: v for k, v in sorted(model_cfg.items())
+            if k not in RUNTIME_KEYS and not (k == "cpu_threads" and not v)}
+
+
+def run_key(audio_hash, backend, model_cfg, warmup=0, repeats=1):
+    payload = json.dumps({
+        "audio": audio_hash,
+        "backend": backend,
+        "model": model_cfg.get("name"),
+        "config": config_fingerprint(model_cfg),
+        "warmup": warmup,
+        "repeats": repeats,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}   # key -> record
+        self.reused = 0
+        self.appended = 0
+        if self.path.exists():
+            self._load()
+
+    @classmethod
+    def for_output_dir(cls, output_dir):
+        return cls(Path(output_dir) / MANIFEST_NAME)
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue   # partial last line from an interrupted write
+                self.entries[entry["key"]] = entry["record"]
+
+    def key_for(self, audio_file, backend, model_cfg, warmup=0, repeats=1):
+        return run_key(file_hash(audio_file), backend, model_cfg, warmup, repeats)
+
+    def get(self, key, audio_file=None):
+        """Stored record for `key` (file name updated to `audio_file`'s), or None."""
+        record = self.entries.get(key)
+        if record is None:
+            return None
+        self.reused += 1
+        if audio_file is not None:
+            record = {**record, "file": Path(audio_file).name}
+        return record
+
+    def append(self, key, record):
+        """Durably append one finished result (one write + fsync per line)."""
+        line = json.dumps({"key": key, "completed_at": time.time(), "record": record},
+                          ensure_ascii=False) + "\n"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            data = line.encode("utf-8")
+            while data:
+                data = data[os.write(fd, data):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.entries[key] = record
+        self.appended += 1
@@ -0,0 +1,189 @@
+# code/tracing.py
+"""
+tracing.py
+----------------------------------
+Span-based hot-path tracing with Chrome / Perfetto trace export.
+
+    from code import tracing
+    with tracing.span("decode_audio", file=name):
+        ...
+
+Spans are recorded as Chrome "complete" events (start + duration, per
+thread); ResourceMonitor samples can be attached as counter tracks with
+record_monitor(). export_chrome() writes JSON that chrome://tracing and
+ui.perfetto.dev open directly.
+
+Disabled by default. While disabled span() returns one shared no-op context
+manager, so an instrumented call costs a global lookup and a function call.
+enable() also sets $ASR_TRACE so spawned worker processes trace too; their
+events can be shipped back with drain() and merged with add_events().
+Timestamps come from perf_counter_ns (CLOCK_MONOTONIC), which is shared by
+every process on the machine, so merged traces line up.
+
+Events are kept in a ring buffer of $ASR_TRACE_MAX_EVENTS (default 100000)
+until drain(); in a long-running process that is never drained the oldest
+events are dropped, counted, and reported as a `trace_events_dropped` marker
+in the next drain.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+ENV_VAR = "ASR_TRACE"
+MAX_EVENTS = int(os.environ.get("ASR_TRACE_MAX_EVENTS", "100000"))
+
+_enabled = os.environ.get(ENV_VAR) == "1"
+_events = deque(maxlen=MAX_EVENTS)   # Chrome trace event dicts; deque.append is atomic under the GIL
+_dropped = 0                          # events pushed out of the full buffer since the last drain
+_thread_names = {}                    # (pid, tid) -> name
+
+
+def _record(event):
+    global _dropped
+    if len(_events) == _events.maxlen:
+        if not _dropped:
+            print(f"⚠️ Trace buffer full ({_events.maxlen} events); dropping the oldest until drain() "
+                  f"(raise ASR_TRACE_MAX_EVENTS or poll /trace)")
+        _dropped += 1   # approximate under concurrent appends; it is only reported
+    _events.append(event)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        thread = threading.current_thread()
+        pid = os.getpid()
+        _thread_names.setdefault((pid, thread.ident), thread.name)
+        event = {"name": self.name, "ph": "X", "ts": self.start / 1000, "dur": (end - self.start) / 1000,
+                 "pid": pid, "tid": thread.ident}
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        if self.args:
+            event["args"] = self.args
+        _record(event)
+        return False
+
+    def set(self, **args):
+        """Attach extra args (e.g. results known only at the end of the span)."""
+        self.args.update(args)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+    os.environ[ENV_VAR] = "1"
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    os.environ.pop(ENV_VAR, None)
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, **args):
+    """Context manager timing one span; a no-op while tracing is disabled."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def instant(name, **args):
+    """A zero-length marker event."""
+    if _enabled:
+        thread = threading.current_thread()
+        _record({"name": name, "ph": "i", "s": "t", "ts": time.perf_counter_ns() / 1000,
+                 "pid": os.getpid(), "tid": thread.ident, "args": args})
+
+
+def record_monitor(monitor, prefix=""):
+    """Add a stopped ResourceMonitor's samples as counter tracks (CPU %, RSS MB, GPU %)."""
+    if not _enabled or monitor.started_at is None:
+        return
+    pid = os.getpid()
+    base_us = monitor.started_at * 1e6   # perf_counter seconds -> trace microseconds
+    times = monitor.buffer.values("t")
+    tracks = {
+        "cpu %": monitor.buffer.values("cpu"),
+        "rss MB": monitor.buffer.values("rss") / (1024 * 1024),
+    }
+    if monitor.buffer.peak("gpu") > 0 or monitor.buffer.peak("gpu_mem") > 0:
+        tracks["gpu %"] = monitor.buffer.values("gpu")
+        tracks["gpu mem %"] = monitor.buffer.values("gpu_mem")
+    for name, values in tracks.items():
+        for t, v in zip(times, values):
+            _record({"name": prefix + name, "ph": "C", "ts": base_us + t * 1e6,
+                     "pid": pid, "args": {"value": round(float(v), 2)}})
+
+
+def dropped():
+    """Events dropped from the full buffer since the last drain()."""
+    return _dropped
+
+
+def drain():
+    """Remove and return this process's recorded events (e.g. to ship them to a parent)."""
+    global _dropped
+    events = []
+    for _ in range(len(_events)):
+        try:
+            events.append(_events.popleft())
+        except IndexError:   # emptied by a concurrent drain
+            break
+    if _dropped:
+        thread = threading.current_thread()
+        events.append({"name": "trace_events_dropped", "ph": "i", "s": "p", "ts": time.perf_counter_ns() / 1000,
+                       "pid": os.getpid(), "tid": thread.ident, "args": {"count": _dropped}})
+        _dropped = 0
+    names = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+             for (pid, tid), name in _thread_names.items()]
+    return names + events
+
+
+def add_events(events):
+    """Merge events drained in another process."""
+    for event in events:
+        _record(event)
+
+
+def export_chrome(path):
+    """Write every recorded event (plus thread names) as Chrome trace JSON; returns the path."""
+    events = drain()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return path
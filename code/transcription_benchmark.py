@@ -11,25 +11,71 @@
 #
 # # You can pass repo_root to make resolution explicit
 # evaluate_json(reference_json=reference, prediction_json=prediction, output_path=output)
+import argparse
+import json
 from pathlib import Path
-from code.metrics_calculator import evaluate_json
+from code.metrics_engine import evaluate_models, save_metrics
+from code.results_store import ResultsStore, backend_label
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 reports = BASE_DIR / "results" / "reports"
 
+reference = "openai-whisper_large-v3_results.json"
 pairs = [
-    ("openai-whisper_large-v3_results.json", "faster-whisper_large-v3_results.json", "metrics_faster_vs_baseline.json"),
-    ("openai-whisper_large-v3_results.json", "whisperx_large-v2_results.json", "metrics_whisperx_vs_baseline.json"),
-    ("openai-whisper_large-v3_results.json", "whisper-cpp_large-v3_results.json", "metrics_cpp_vs_baseline.json"),
+    ("faster-whisper_large-v3_results.json", "metrics_faster_vs_baseline.json"),
+    ("whisperx_large-v2_results.json", "metrics_whisperx_vs_baseline.json"),
+    ("whisper-cpp_large-v3_results.json", "metrics_cpp_vs_baseline.json"),
 ]
 
-for ref, pred, out in pairs:
-    print(f"\n🔍 Comparing {pred} vs {ref}")
-    evaluate_json(
-        reference_json=reports / ref,
-        prediction_json=reports / pred,
-        output_path=reports / out
-    )
+
+def store_metrics(store, reference_label, per_file, run_id=None):
+    """
+    Store metrics rows ({backend: [rows]}) next to the transcriptions they score:
+    in `run_id` if given, otherwise in the newest run holding each backend's
+    transcriptions, so stats("WER") can join them. Returns the run_ids used.
+    """
+    by_run, fallback = {}, None
+    for backend, rows in per_file.items():
+        run = run_id or store.transcription_run(backend)
+        if run is None:
+            print(f"⚠️ No stored transcriptions for {backend}; its metrics go to a separate run")
+            fallback = run = fallback or store.start_run(label="metrics")
+        by_run.setdefault(run, {})[backend] = rows
+    for run, items in by_run.items():
+        store.add_metrics(run, reference_label, items)
+    return list(by_run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score every model against the baseline and store the metrics.")
+    parser.add_argument("--run", default=None,
+                        help="Run to attach the metrics to (default: the run holding each backend's transcriptions).")
+    args = parser.parse_args(argv)
+
+    # Baseline loaded once; all models scored in one pass on a process pool
+    print(f"🔍 Comparing {len(pairs)} models vs {reference}")
+    results = evaluate_models(reports / reference, {pred: reports / pred for pred, _ in pairs})
+
+    for pred, out in pairs:
+        print(f"✅ Metrics report saved to: {save_metrics(results['per_file'][pred], reports / out)}")
+
+    summary_path = save_metrics(results["corpus"], reports / "metrics_corpus_summary.json")
+
+    # Store metrics under the backend labels, in the run their transcriptions came from
+    labels = {pred: backend_label(json.loads((reports / pred).read_text(encoding="utf-8"))[0])
+              for pred, _ in pairs}
+    with ResultsStore() as store:
+        run_ids = store_metrics(store, backend_label(json.loads((reports / reference).read_text(encoding="utf-8"))[0]),
+                                {labels[pred]: rows for pred, rows in results["per_file"].items()}, args.run)
+    print("\n========== CORPUS (micro-averaged) ==========")
+    for pred, metrics in results["corpus"].items():
+        print(f"{pred:<40} WER: {metrics['WER']} | CER: {metrics['CER']} | files: {metrics['files']}")
+    print(f"📁 Corpus summary saved to: {summary_path}")
+    print(f"🗄️ Metrics stored with run(s) {', '.join(run_ids)}")
+
+
+if __name__ == "__main__":
+    main()
 
 # from code.metrics_calculator import evaluate_json
 #
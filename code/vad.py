@@ -0,0 +1,158 @@
+# code/vad.py
+"""
+vad.py
+----------------------------------
+Shared voice-activity pre-segmentation for every backend.
+
+detect_speech() turns a file's cached 16 kHz PCM into speech regions
+(sample ranges). A SpeechMap concatenates those regions into one array for
+the model and maps timestamps measured on that array back to the original
+file, so any backend can transcribe only speech.
+
+Engines:
+- "silero" : faster-whisper's bundled Silero VAD (onnxruntime), when installed
+- "energy" : frame-energy fallback in numpy, for environments without it
+
+Regions are memoized per (file hash, engine, options), so repeats and other
+backends in the same process reuse them.
+"""
+
+import bisect
+import importlib.util
+
+import numpy as np
+
+from code.audio_cache import SAMPLE_RATE, file_hash
+
+# Same option names / defaults as faster-whisper's VadOptions
+VAD_DEFAULTS = {
+    "threshold": 0.5,
+    "min_speech_duration_ms": 250,
+    "min_silence_duration_ms": 2000,
+    "speech_pad_ms": 400,
+}
+
+ENERGY_FRAME_MS = 30
+ENERGY_FLOOR_DB = -50.0      # frames quieter than this are never speech
+ENERGY_MARGIN_DB = 12.0      # speech must be this far above the noise floor
+
+_regions_memo = {}
+
+
+def default_engine():
+    # find_spec only locates the package; faster-whisper (ctranslate2, av, ...) is imported on first use
+    return "silero" if importlib.util.find_spec("faster_whisper") is not None else "energy"
+
+
+def energy_speech_regions(pcm, sample_rate=SAMPLE_RATE, min_speech_duration_ms=250,
+                          min_silence_duration_ms=2000, speech_pad_ms=400, **_):
+    """Speech regions from frame RMS energy relative to the file's noise floor."""
+    frame = int(sample_rate * ENERGY_FRAME_MS / 1000)
+    n_frames = len(pcm) // frame
+    if n_frames == 0:
+        return []
+    frames = np.asarray(pcm[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+    threshold = max(ENERGY_FLOOR_DB, np.percentile(db, 10) + ENERGY_MARGIN_DB)
+    active = db > threshold
+
+    # run boundaries of active frames -> sample ranges
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    runs = [[s * frame, e * frame] for s, e in zip(edges[::2], edges[1::2])]
+
+    min_gap = sample_rate * min_silence_duration_ms / 1000
+    merged = []
+    for run in runs:
+        if merged and run[0] - merged[-1][1] < min_gap:
+            merged[-1][1] = run[1]
+        else:
+            merged.append(run)
+
+    min_len = sample_rate * min_speech_duration_ms / 1000
+    pad = int(sample_rate * speech_pad_ms / 1000)
+    regions = []
+    for start, end in merged:
+        if end - start < min_len:
+            continue
+        start, end = max(0, start - pad), min(len(pcm), end + pad)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def detect_speech(pcm, sample_rate=SAMPLE_RATE, engine=None, **options):
+    """Speech regions of `pcm` as a list of (start_sample, end_sample)."""
+    engine = engine or default_engine()
+    options = {**VAD_DEFAULTS, **options}
+    if engine == "silero":
+        try:
+            from faster_whisper.vad import VadOptions, get_speech_timestamps
+        except ImportError as e:
+            raise ImportError("Silero VAD needs faster-whisper (pip install faster-whisper)") from e
+        chunks = get_speech_timestamps(np.asarray(pcm, dtype=np.float32),
+                                       VadOptions(**options), sampling_rate=sample_rate)
+        return [(c["start"], c["end"]) for c in chunks]
+    if engine == "energy":
+        return energy_speech_regions(pcm, sample_rate, **options)
+    raise ValueError(f"Unknown VAD engine: {engine}")
+
+
+class SpeechMap:
+    """Speech regions of one file, plus the mapping from speech-only time back to file time."""
+
+    def __init__(self, regions, total_samples, sample_rate=SAMPLE_RATE, engine=None):
+        self.regions = [(int(s), int(e)) for s, e in regions]
+        self.total_samples = total_samples
+        self.sample_rate = sample_rate
+        self.engine = engine
+        # start of each region inside the concatenated speech array
+        self._offsets = []
+        pos = 0
+        for start, end in self.regions:
+            self._offsets.append(pos)
+            pos += end - start
+        self.speech_samples = pos
+
+    @property
+    def speech_sec(self):
+        return self.speech_samples / self.sample_rate
+
+    @property
+    def speech_ratio(self):
+        return self.speech_samples / self.total_samples if self.total_samples else 0.0
+
+    def collect(self, pcm):
+        """Concatenate the speech regions of `pcm` into one float32 array."""
+        if not self.regions:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate([pcm[s:e] for s, e in self.regions]).astype(np.float32, copy=False)
+
+    def to_original(self, t, is_end=False):
+        """Map a time (s) on the collected speech audio to a time in the original file."""
+        if not self.regions:
+            return t
+        sample = t * self.sample_rate
+        # an end time that falls exactly on a boundary belongs to the earlier region
+        find = bisect.bisect_left if is_end else bisect.bisect_right
+        i = max(0, find(self._offsets, sample) - 1)
+        return round((self.regions[i][0] + sample - self._offsets[i]) / self.sample_rate, 3)
+
+    def summary(self):
+        return {
+            "engine": self.engine,
+            "regions": len(self.regions),
+            "speech_sec": round(self.speech_sec, 2),
+            "speech_ratio": round(self.speech_ratio, 4),
+        }
+
+
+def speech_map(audio_file, pcm, engine=None, **options):
+    """SpeechMap for a file's PCM, memoized on its content hash and the VAD settings."""
+    engine = engine or default_engine()
+    key = (file_hash(audio_file), engine, tuple(sorted(options.items())))
+    regions = _regions_memo.get(key)
+    if regions is None:
+        regions = _regions_memo[key] = detect_speech(pcm, engine=engine, **options)
+    return SpeechMap(regions, len(pcm), engine=engine)
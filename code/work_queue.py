@@ -0,0 +1,603 @@
+# code/work_queue.py
+"""
+work_queue.py
+----------------------------------
+Multi-node benchmark work queue on a shared SQLite file.
+
+A coordinator writes one job per (backend, model, file, config) of a sweep;
+any number of worker processes, on this host or others that mount the same
+storage, claim jobs, run them and write the result record back:
+
+- claim      : atomically leases the oldest queued job (preferring the
+               backend the worker already has loaded) for `lease_sec`
+- heartbeat  : a worker thread renews the lease every lease_sec / 3
+- complete   : stores the record, only while the worker still holds the lease
+- requeue    : leases that expire (worker killed, host lost) go back to the
+               queue on the next claim / status call; a job that keeps
+               failing or expiring is marked failed after `max_attempts`
+
+Job keys are the run-manifest keys (code/run_manifest.py), so pairs already
+checkpointed in the output dir are not re-run, and `collect` writes the
+usual per-backend reports and appends the manifest. The thread count is part
+of the key: `enqueue --threads N` fixes it for the sweep; otherwise each
+result is checkpointed under the cpu_threads its worker ran with.
+`python -m code.model_comparison --queue PATH` runs a sweep this way and
+records it in the results store like any other run.
+
+    python -m code.work_queue run --backends faster-whisper whisper-cpp --workers 4   # one host
+    python -m code.work_queue enqueue --queue /shared/queue.sqlite --backends faster-whisper --threads 8
+    python -m code.work_queue worker --queue /shared/queue.sqlite --threads 8          # on each host
+    python -m code.work_queue status --queue /shared/queue.sqlite
+    python -m code.work_queue collect --queue /shared/queue.sqlite --sweep <sweep_id>
+
+The queue uses SQLite's rollback journal (not WAL, which needs shared memory
+on one host), so the shared filesystem must support POSIX byte-range locks
+(local disk, NFSv4 with locking); hosts need NTP-synchronized clocks since
+leases are wall-clock deadlines. Audio paths are stored absolute and must
+resolve on every worker.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from code.audio_cache import file_hash
+from code.replica_planner import THREAD_ENV_VARS
+from code.results_store import new_run_id
+from code.run_manifest import RunManifest, run_key, with_threads
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_QUEUE = BASE_DIR / "results" / "work_queue.sqlite"
+
+LEASE_SEC = 120
+MAX_ATTEMPTS = 3
+POLL_SEC = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    sweep_id    TEXT PRIMARY KEY,
+    created_at  REAL NOT NULL,
+    label       TEXT,
+    info        TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY,
+    sweep_id     TEXT NOT NULL REFERENCES sweeps(sweep_id),
+    job_key      TEXT NOT NULL,
+    backend      TEXT NOT NULL,
+    target       TEXT,
+    model        TEXT,
+    file         TEXT NOT NULL,
+    config       TEXT NOT NULL,
+    warmup       INTEGER NOT NULL DEFAULT 0,
+    repeats      INTEGER NOT NULL DEFAULT 1,
+    status       TEXT NOT NULL DEFAULT 'queued',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker       TEXT,
+    lease_id     TEXT,
+    lease_until  REAL,
+    record       TEXT,
+    startup      TEXT,
+    error        TEXT,
+    created_at   REAL NOT NULL,
+    finished_at  REAL,
+    UNIQUE (sweep_id, job_key)
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs(status, sweep_id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id      TEXT PRIMARY KEY,
+    host           TEXT,
+    pid            INTEGER,
+    started_at     REAL,
+    last_heartbeat REAL,
+    current_job    INTEGER,
+    jobs_done      INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+JOB_STATUSES = ("queued", "leased", "done", "failed")
+
+
+class WorkQueue:
+    """One connection to the shared queue file (use one per thread)."""
+
+    def __init__(self, path=DEFAULT_QUEUE, timeout=60.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def _tx(self):
+        """Write transaction holding the database lock from the start (no lost claims)."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # --- coordinator ---
+    def create_sweep(self, label=None, **info):
+        sweep_id = new_run_id()
+        with self._tx() as conn:
+            conn.execute("INSERT INTO sweeps (sweep_id, created_at, label, info) VALUES (?, ?, ?, ?)",
+                         (sweep_id, time.time(), label, json.dumps(info, default=str)))
+        return sweep_id
+
+    def enqueue(self, sweep_id, jobs, max_attempts=MAX_ATTEMPTS):
+        """
+        Add jobs ({"job_key", "backend", "target", "file", "config", "warmup", "repeats"},
+        optionally a finished "record") to a sweep; duplicate keys are ignored.
+        Returns the number of jobs added.
+        """
+        now = time.time()
+        rows = [(sweep_id, j["job_key"], j["backend"], j.get("target"), j["config"].get("name"),
+                 str(j["file"]), json.dumps(j["config"], default=str), j.get("warmup", 0), j.get("repeats", 1),
+                 "done" if j.get("record") else "queued", max_attempts,
+                 json.dumps(j["record"], ensure_ascii=False) if j.get("record") else None,
+                 "manifest" if j.get("record") else None, now, now if j.get("record") else None)
+                for j in jobs]
+        with self._tx() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO jobs (sweep_id, job_key, backend, target, model, file, config, "
+                             "warmup, repeats, status, max_attempts, record, worker, created_at, finished_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+
+    def requeue_expired(self, now=None):
+        """Put jobs with expired leases back in the queue (or fail them after max_attempts)."""
+        now = now or time.time()
+        with self._tx() as conn:
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired (worker lost) on every attempt', "
+                "finished_at = ?, lease_id = NULL WHERE status = 'leased' AND lease_until < ? "
+                "AND attempts >= max_attempts", (now, now)).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, lease_id = NULL, lease_until = NULL "
+                "WHERE status = 'leased' AND lease_until < ?", (now,)).rowcount
+        if requeued or failed:
+            print(f"♻️ Requeued {requeued} jobs with expired leases" + (f", {failed} failed" if failed else ""))
+        return requeued
+
+    # --- workers ---
+    def register_worker(self, worker_id):
+        now = time.time()
+        with self._tx() as conn:
+            conn.execute("INSERT OR REPLACE INTO workers (worker_id, host, pid, started_at, last_heartbeat) "
+                         "VALUES (?, ?, ?, ?, ?)", (worker_id, socket.gethostname(), os.getpid(), now, now))
+
+    def claim(self, worker_id, lease_sec=LEASE_SEC, prefer_backend=None, sweep_id=None):
+        """Lease the next queued job (of `prefer_backend` first); returns the job dict or None."""
+        self.requeue_expired()
+        now = time.time()
+        with self._tx() as conn:
+            sweep_clause = "AND sweep_id = ?" if sweep_id else ""
+            row = conn.execute(f"SELECT id FROM jobs WHERE status = 'queued' {sweep_clause} "
+                               "ORDER BY backend = ? DESC, id LIMIT 1",
+                               ((sweep_id,) if sweep_id else ()) + (prefer_backend,)).fetchone()
+            if row is None:
+                return None
+            lease_id = uuid.uuid4().hex
+            conn.execute("UPDATE jobs SET status = 'leased', worker = ?, lease_id = ?, lease_until = ?, "
+                         "attempts = attempts + 1 WHERE id = ?", (worker_id, lease_id, now + lease_sec, row["id"]))
+            conn.execute("UPDATE workers SET current_job = ?, last_heartbeat = ? WHERE worker_id = ?",
+                         (row["id"], now, worker_id))
+            job = dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+        job["config"] = json.loads(job["config"])
+        return job
+
+    def heartbeat(self, worker_id, job=None, lease_sec=LEASE_SEC):
+        """Mark the worker alive and extend its job's lease; False if the lease was lost."""
+        now = time.time()
+        with self._tx() as conn:
+            conn.execute("UPDATE workers SET last_heartbeat = ? WHERE worker_id = ?", (now, worker_id))
+            if job is None:
+                return True
+            return conn.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND lease_id = ? "
+                                "AND status = 'leased'", (now + lease_sec, job["id"], job["lease_id"])).rowcount == 1
+
+    def complete(self, job, record, startup=None):
+        """Store a finished job's record; False if its lease expired and it was handed out again."""
+        with self._tx() as conn:
+            done = conn.execute("UPDATE jobs SET status = 'done', record = ?, startup = ?, error = NULL, "
+                                "finished_at = ?, lease_id = NULL WHERE id = ? AND lease_id = ? "
+                                "AND status = 'leased'",
+                                (json.dumps(record, ensure_ascii=False), json.dumps(startup) if startup else None,
+                                 time.time(), job["id"], job["lease_id"])).rowcount == 1
+            conn.execute("UPDATE workers SET current_job = NULL, jobs_done = jobs_done + ? WHERE worker_id = ?",
+                         (int(done), job["worker"]))
+        return done
+
+    def fail(self, job, error):
+        """Record a job error: back to the queue, or failed once max_attempts is reached."""
+        with self._tx() as conn:
+            conn.execute("UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+                         "error = ?, worker = NULL, lease_id = NULL, lease_until = NULL, "
+                         "finished_at = CASE WHEN attempts >= max_attempts THEN ? END "
+                         "WHERE id = ? AND lease_id = ?", (error, time.time(), job["id"], job["lease_id"]))
+            conn.execute("UPDATE workers SET current_job = NULL WHERE worker_id = ?", (job["worker"],))
+
+    # --- progress / results ---
+    def sweeps(self):
+        return [dict(r) for r in self.conn.execute("SELECT * FROM sweeps ORDER BY created_at")]
+
+    def latest_sweep(self):
+        row = self.conn.execute("SELECT sweep_id FROM sweeps ORDER BY created_at DESC LIMIT 1").fetchone()
+        return row["sweep_id"] if row else None
+
+    def counts(self, sweep_id=None):
+        """{status: jobs} over one sweep (default: all)."""
+        where, params = ("WHERE sweep_id = ?", (sweep_id,)) if sweep_id else ("", ())
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for row in self.conn.execute(f"SELECT status, COUNT(*) AS n FROM jobs {where} GROUP BY status", params):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def pending(self, sweep_id=None):
+        counts = self.counts(sweep_id)
+        return counts["queued"] + counts["leased"]
+
+    def status(self, sweep_id=None):
+        """Per-backend job counts and the workers seen, with seconds since their last heartbeat."""
+        self.requeue_expired()
+        where, params = ("WHERE sweep_id = ?", (sweep_id,)) if sweep_id else ("", ())
+        backends = {}
+        for row in self.conn.execute(f"SELECT backend, status, COUNT(*) AS n FROM jobs {where} "
+                                     "GROUP BY backend, status ORDER BY backend", params):
+            backends.setdefault(row["backend"], dict.fromkeys(JOB_STATUSES, 0))[row["status"]] = row["n"]
+        now = time.time()
+        workers = [{**dict(r), "since_heartbeat_sec": round(now - r["last_heartbeat"], 1)}
+                   for r in self.conn.execute("SELECT * FROM workers ORDER BY worker_id")]
+        return {"sweep_id": sweep_id, "backends": backends, "totals": self.counts(sweep_id), "workers": workers}
+
+    def jobs(self, sweep_id, status=None):
+        sql, params = "SELECT * FROM jobs WHERE sweep_id = ?", [sweep_id]
+        if status:
+            sql, params = sql + " AND status = ?", params + [status]
+        rows = []
+        for r in self.conn.execute(sql + " ORDER BY id", params):
+            row = dict(r)
+            row["config"] = json.loads(row["config"])
+            for key in ("record", "startup"):
+                row[key] = json.loads(row[key]) if row[key] else None
+            rows.append(row)
+        return rows
+
+
+# --- coordinator helpers ---------------------------------------------------
+
+def sweep_jobs(backend_names, config, audio_dir, output_dir=None, warmup=0, repeats=1, resume=True, threads=None):
+    """
+    Job dicts for every (backend, file); pairs checkpointed in output_dir's manifest carry their record.
+    threads: CPU threads per worker; set as the jobs' cpu_threads (unless the config has one) so
+    the checkpoint key matches what the workers run.
+    """
+    from models.base_backend import list_audio_files
+    from models.registry import BACKENDS
+
+    manifest = RunManifest.for_output_dir(output_dir) if output_dir else None
+    jobs = []
+    for name in backend_names:
+        cfg = with_threads(config[name], threads)
+        for audio_file in list_audio_files(audio_dir):
+            key = run_key(file_hash(audio_file), cfg.get("variant", name), cfg, warmup, repeats)
+            record = manifest.get(key, audio_file) if manifest is not None and resume else None
+            jobs.append({"job_key": key, "backend": name, "target": BACKENDS.get(name),
+                         "file": str(Path(audio_file).resolve()), "config": cfg,
+                         "warmup": warmup, "repeats": repeats, "record": record})
+    return jobs
+
+
+def enqueue_sweep(queue, backend_names, config, audio_dir, output_dir=None, warmup=0, repeats=1,
+                  resume=True, max_attempts=MAX_ATTEMPTS, label=None, threads=None):
+    """Create a sweep and queue its jobs; returns the sweep_id."""
+    jobs = sweep_jobs(backend_names, config, audio_dir, output_dir, warmup, repeats, resume, threads)
+    sweep_id = queue.create_sweep(label=label, backends=backend_names, audio_dir=str(audio_dir),
+                                  warmup=warmup, repeats=repeats)
+    queue.enqueue(sweep_id, jobs, max_attempts=max_attempts)
+    reused = sum(1 for j in jobs if j["record"])
+    print(f"📬 Sweep {sweep_id}: {len(jobs) - reused} jobs queued ({reused} reused from checkpoints)")
+    return sweep_id
+
+
+def wait_for_sweep(queue, sweep_id, poll_sec=POLL_SEC, workers=None):
+    """
+    Block until no job of the sweep is queued or leased, printing progress.
+    workers: local worker processes; if all of them exit with jobs left, stop waiting.
+    """
+    last = None
+    while True:
+        counts = queue.status(sweep_id)["totals"]
+        if counts != last:
+            print("⏳ " + " | ".join(f"{k}: {v}" for k, v in counts.items()))
+            last = counts
+        if counts["queued"] + counts["leased"] == 0:
+            return counts
+        if workers and all(p.poll() is not None for p in workers):
+            print("⚠️ All local workers exited with jobs left in the queue")
+            return counts
+        time.sleep(poll_sec)
+
+
+def collect_sweep(queue, sweep_id, output_dir):
+    """
+    Write per-backend reports (file-name order) for a sweep's finished jobs and
+    checkpoint new results in the output dir's manifest. Returns the same
+    {backend: {"output_json", "records", "startup", "failures"}} as run_parallel.
+    """
+    from models.base_backend import results_path, save_results
+
+    manifest = RunManifest.for_output_dir(output_dir)
+    summary = {}
+    for job in queue.jobs(sweep_id):
+        entry = summary.setdefault(job["backend"], {"output_json": None, "records": [], "startup": [], "failures": []})
+        if job["status"] == "done":
+            entry["records"].append(job["record"])
+            key = job["job_key"]
+            ran_with = job["record"].get("cpu_threads")
+            if ran_with and ran_with != job["config"].get("cpu_threads"):
+                # the worker's --threads applied: checkpoint under the config it actually ran
+                key = run_key(file_hash(job["file"]), job["config"].get("variant", job["backend"]),
+                              {**job["config"], "cpu_threads": ran_with}, job["warmup"], job["repeats"])
+            if key not in manifest.entries:
+                manifest.append(key, job["record"])
+            if job["startup"]:
+                entry["startup"].append(job["startup"])
+        elif job["status"] == "failed":
+            entry["failures"].append({"file": Path(job["file"]).name, "error": job["error"]})
+    for name, entry in summary.items():
+        entry["records"].sort(key=lambda r: r["file"])
+        if entry["records"]:
+            first = entry["records"][0]
+            entry["output_json"] = str(save_results(entry["records"], results_path(output_dir, first["variant"],
+                                                                                   first["model"])))
+            print(f"📁 {name}: {len(entry['records'])} results saved to {entry['output_json']}")
+        for failure in entry["failures"]:
+            print(f"❌ {name} | {failure['file']}: {failure['error']}")
+    return summary
+
+
+def start_local_workers(queue_path, count, threads=None, lease_sec=LEASE_SEC, sweep_id=None):
+    """Spawn `count` worker processes on this host (`python -m code.work_queue worker`)."""
+    cmd = [sys.executable, "-m", "code.work_queue", "worker", "--queue", str(queue_path), "--lease-sec", str(lease_sec)]
+    if threads:
+        cmd += ["--threads", str(threads)]
+    if sweep_id:
+        cmd += ["--sweep", sweep_id]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(BASE_DIR), os.environ.get("PYTHONPATH")]))}
+    return [subprocess.Popen(cmd + ["--worker-id", f"{socket.gethostname()}-local{i}"], cwd=BASE_DIR, env=env)
+            for i in range(count)]
+
+
+def run_distributed(backend_names, config, audio_dir, output_dir, queue_path=DEFAULT_QUEUE, workers=0,
+                    threads_per_worker=None, warmup=0, repeats=1, resume=True, lease_sec=LEASE_SEC,
+                    max_attempts=MAX_ATTEMPTS, label=None):
+    """
+    Enqueue a sweep, start `workers` local workers (0: rely on workers started
+    elsewhere), wait for the queue to drain and collect the reports.
+    """
+    with WorkQueue(queue_path) as queue:
+        sweep_id = enqueue_sweep(queue, backend_names, config, audio_dir, output_dir, warmup, repeats,
+                                 resume, max_attempts, label, threads_per_worker)
+        procs = start_local_workers(queue_path, workers, threads_per_worker, lease_sec, sweep_id) if workers else []
+        start = time.time()
+        try:
+            wait_for_sweep(queue, sweep_id, workers=procs)
+        finally:
+            for p in procs:
+                p.wait()
+        wall = time.time() - start
+        summary = collect_sweep(queue, sweep_id, output_dir)
+    audio_sec = sum(r["duration_sec"] for s in summary.values() for r in s["records"])
+    print(f"\n⏱️ Sweep wall time: {wall:.2f}s | {audio_sec / max(wall, 1e-9):.2f} audio-sec per wall-sec")
+    return summary
+
+
+# --- worker ----------------------------------------------------------------
+
+class Heartbeat(threading.Thread):
+    """
+    Renews the current job's lease every lease_sec / 3 on its own connection.
+    A failed renewal (e.g. the shared file is locked) is logged and retried on
+    the next beat; a lease found expired is remembered so the worker can drop the job.
+    """
+
+    def __init__(self, queue_path, worker_id, lease_sec):
+        super().__init__(name="heartbeat", daemon=True)
+        self.queue_path = queue_path
+        self.worker_id = worker_id
+        self.lease_sec = lease_sec
+        self.job = None          # job whose lease is being renewed, set by the worker loop
+        self.lost_lease = None   # lease_id of a job whose lease expired and was handed out again
+        self.stopped = threading.Event()
+
+    def run(self):
+        queue = None
+        try:
+            while not self.stopped.wait(self.lease_sec / 3):
+                job = self.job
+                try:
+                    queue = queue or WorkQueue(self.queue_path)
+                    if not queue.heartbeat(self.worker_id, job, self.lease_sec):
+                        self.lost_lease = job["lease_id"]
+                except sqlite3.Error as e:
+                    print(f"⚠️ Heartbeat failed for {self.worker_id}: {type(e).__name__}: {e}")
+        finally:
+            if queue is not None:
+                queue.close()
+
+    def lost(self, job):
+        """True once a renewal found `job`'s lease expired."""
+        return self.lost_lease is not None and self.lost_lease == job["lease_id"]
+
+    def stop(self):
+        self.stopped.set()
+
+
+def run_worker(queue_path=DEFAULT_QUEUE, worker_id=None, threads=None, lease_sec=LEASE_SEC, poll_sec=POLL_SEC,
+               wait=False, max_jobs=None, sweep_id=None):
+    """
+    Claim and run jobs until the queue has nothing queued or leased (or forever
+    with wait=True). The loaded backend is kept while consecutive jobs use it.
+    """
+    from models.registry import BACKENDS, create_backend, register_backend
+
+    if threads:
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = str(threads)   # before any framework is imported
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path)
+    queue.register_worker(worker_id)
+    heartbeat = Heartbeat(queue_path, worker_id, lease_sec)
+    heartbeat.start()
+    print(f"👷 Worker {worker_id} on {queue_path}")
+
+    loaded = None   # (backend name, config json, backend)
+    done = 0
+    try:
+        while max_jobs is None or done < max_jobs:
+            job = queue.claim(worker_id, lease_sec, prefer_backend=loaded[0] if loaded else None, sweep_id=sweep_id)
+            if job is None:
+                if not wait and queue.pending(sweep_id) == 0:
+                    break
+                time.sleep(poll_sec)
+                continue
+
+            heartbeat.job = job
+            name = job["backend"]
+            try:
+                startup = None
+                cfg_json = json.dumps(job["config"], sort_keys=True, default=str)
+                if loaded is None or loaded[:2] != (name, cfg_json):
+                    loaded = None   # drop the previous model before loading the next one
+                    if job["target"] and BACKENDS.get(name) != job["target"]:
+                        register_backend(name, job["target"])
+                    cfg = dict(with_threads(job["config"], threads))
+                    backend, import_time = create_backend(name, cfg)
+                    backend.load()
+                    loaded = (name, cfg_json, backend)
+                    startup = {"worker": worker_id, "host": socket.gethostname(), "pid": os.getpid(),
+                               "import_time_sec": round(import_time, 4), "load_time_sec": round(backend.load_time, 4)}
+                if heartbeat.lost(job):
+                    # the lease ran out (e.g. during a long load) and the job went back to the queue
+                    print(f"⚠️ Lease lost for {name} | {Path(job['file']).name}; job dropped (it was requeued)")
+                    continue
+                record = loaded[2].transcribe_file(Path(job["file"]), warmup=job["warmup"], repeats=job["repeats"])
+            except Exception as e:
+                print(f"❌ {name} | {Path(job['file']).name}: {e}")
+                queue.fail(job, f"{type(e).__name__}: {e}")
+                continue
+            finally:
+                heartbeat.job = None
+
+            if queue.complete(job, record, startup):
+                done += 1
+                print(f"✅ {name} | {record['file']} | Time: {record['processing_time_sec']:.2f}s | RTF: {record['rtf']}")
+            else:
+                print(f"⚠️ Lease lost for {name} | {record['file']}; result discarded (job was requeued)")
+    finally:
+        heartbeat.stop()
+        queue.close()
+    print(f"👋 Worker {worker_id} finished {done} jobs")
+    return done
+
+
+# --- CLI -------------------------------------------------------------------
+
+def print_status(status):
+    print(f"\n========== WORK QUEUE {status['sweep_id'] or '(all sweeps)'} ==========")
+    print(f"{'backend':<18} " + " ".join(f"{s:>7}" for s in JOB_STATUSES))
+    for name, counts in status["backends"].items():
+        print(f"{name:<18} " + " ".join(f"{counts[s]:>7}" for s in JOB_STATUSES))
+    for w in status["workers"]:
+        print(f"👷 {w['worker_id']:<28} jobs: {w['jobs_done']:>4} | job: {w['current_job'] or '-'} | "
+              f"heartbeat {w['since_heartbeat_sec']}s ago")
+    print("=" * 44)
+
+
+def main(argv=None):
+    from models.registry import load_config, CONFIG_PATH
+
+    parser = argparse.ArgumentParser(description="Distributed benchmark work queue (shared SQLite file).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def sweep_args(p):
+        p.add_argument("--backends", nargs="+", default=None)
+        p.add_argument("--config", default=str(CONFIG_PATH))
+        p.add_argument("--audio-dir", default=str(BASE_DIR / "tests" / "test_audio_samples"))
+        p.add_argument("--output-dir", default=str(BASE_DIR / "results" / "reports"))
+        p.add_argument("--warmup", type=int, default=0)
+        p.add_argument("--repeats", type=int, default=1)
+        p.add_argument("--fresh", action="store_true", help="Queue every pair, ignoring the output dir's manifest.")
+        p.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        p.add_argument("--label", default=None)
+
+    for command in ("enqueue", "worker", "status", "collect", "run"):
+        p = sub.add_parser(command)
+        p.add_argument("--queue", default=str(DEFAULT_QUEUE), help="Queue database on storage shared by all workers.")
+        if command in ("enqueue", "run"):
+            sweep_args(p)
+        if command in ("enqueue", "worker", "run"):
+            p.add_argument("--threads", type=int, default=None, help="CPU threads per worker.")
+        if command in ("worker", "run"):
+            p.add_argument("--lease-sec", type=float, default=LEASE_SEC)
+        if command in ("worker", "status", "collect"):
+            p.add_argument("--sweep", default=None)
+    sub.choices["run"].add_argument("--workers", type=int, default=2, help="Local worker processes.")
+    sub.choices["worker"].add_argument("--worker-id", default=None)
+    sub.choices["worker"].add_argument("--wait", action="store_true", help="Keep polling when the queue is empty.")
+    sub.choices["worker"].add_argument("--max-jobs", type=int, default=None)
+    sub.choices["collect"].add_argument("--output-dir", default=str(BASE_DIR / "results" / "reports"))
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        return run_worker(args.queue, args.worker_id, args.threads, args.lease_sec, wait=args.wait,
+                          max_jobs=args.max_jobs, sweep_id=args.sweep)
+
+    if args.command in ("enqueue", "run"):
+        config = load_config(args.config)
+        selected = args.backends or list(config)
+        if args.command == "run":
+            return run_distributed(selected, config, args.audio_dir, args.output_dir, args.queue, args.workers,
+                                   args.threads, args.warmup, args.repeats, not args.fresh, args.lease_sec,
+                                   args.max_attempts, args.label)
+        with WorkQueue(args.queue) as queue:
+            return enqueue_sweep(queue, selected, config, args.audio_dir, args.output_dir, args.warmup,
+                                 args.repeats, not args.fresh, args.max_attempts, args.label, args.threads)
+
+    with WorkQueue(args.queue) as queue:
+        sweep_id = args.sweep or queue.latest_sweep()
+        if args.command == "status":
+            status = queue.status(sweep_id)
+            print_status(status)
+            return status
+        return collect_sweep(queue, sweep_id, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
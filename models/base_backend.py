@@ -0,0 +1,245 @@
+# models/base_backend.py
+"""
+base_backend.py
+----------------------------------
+Common interface shared by every ASR backend under models/*.
+
+A backend module imports its framework at module level and defines one
+ASRBackend subclass. The registry (models/registry.py) imports that module
+only when the backend is selected, so picking one backend never pulls in
+the others' frameworks.
+"""
+
+import time
+import json
+import os
+import dataclasses
+from pathlib import Path
+from code import tracing
+from code.audio_cache import load_pcm, SAMPLE_RATE
+from code.preprocessing import load_preprocessed_pcm
+from code.benchmark_harness import benchmark_file
+from code.run_manifest import RunManifest
+
+
+def list_audio_files(audio_dir):
+    """Files in audio_dir in a stable (name-sorted) order."""
+    return sorted(p for p in Path(audio_dir).glob("*") if p.is_file())
+
+
+def results_path(output_dir, variant, model_name):
+    return Path(output_dir) / f"{variant}_{model_name}_results.json"
+
+
+def save_results(results, json_path):
+    os.makedirs(Path(json_path).parent, exist_ok=True)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    return json_path
+
+
+class ASRBackend:
+    """
+    Base class for a transcription backend.
+
+    Subclasses implement load_model(), transcribe() and postprocess(); the
+    per-file benchmark loop (code/benchmark_harness.py) and JSON report are
+    shared in run().
+    """
+    variant = None
+    # autotune search keys this backend applies (code/autotune.py), and the ones that need a reload
+    tunable_params = ("cpu_threads", "vad")
+    load_params = ("cpu_threads",)
+
+    def __init__(self, model_cfg):
+        self.cfg = model_cfg
+        self.model_name = model_cfg["name"]
+        self.framework = model_cfg.get("framework", self.variant)
+        self.device = self.resolve_device()
+        self.compute_type = self.resolve_compute_type()
+        self.cpu_threads = model_cfg.get("cpu_threads")   # None -> framework default
+        self.vad = bool(model_cfg.get("vad", False))       # transcribe speech regions only
+        self.vad_options = model_cfg.get("vad_options") or {}
+        self.vad_rate = None   # transcription sec per speech sec, for compute-saved estimates
+        self.decode_options = model_cfg.get("decode_options") or {}   # beam_size, temperature, ...
+        self.preprocess = bool(model_cfg.get("preprocess", False))     # enhance audio (code/preprocessing.py)
+        self.preprocess_options = model_cfg.get("preprocess_options") or {}
+        self.language_id = bool(model_cfg.get("language_id", False))   # one-shot LID (code/language_id.py)
+        self.language_id_options = model_cfg.get("language_id_options") or {}
+        self.model = None
+        self.load_time = None
+
+    # --- configuration -------------------------------------------------
+    def resolve_device(self):
+        return self.cfg.get("device", "cpu")
+
+    def resolve_compute_type(self):
+        return self.cfg.get("compute_type", "float16" if self.device == "cuda" else "int8")
+
+    def config_lines(self):
+        """Extra (label, value) pairs printed in the configuration banner."""
+        return []
+
+    def print_config(self):
+        print("\n========== MODEL CONFIGURATION ==========")
+        print(f"Model Variant : {self.variant}")
+        print(f"Framework     : {self.framework}")
+        print(f"Model Name    : {self.model_name}")
+        print(f"Device        : {self.device}")
+        print(f"Compute Type  : {self.compute_type}")
+        if self.cpu_threads:
+            print(f"CPU Threads   : {self.cpu_threads}")
+        if self.vad:
+            print(f"VAD           : {self.vad_options.get('engine') or 'auto'}")
+        if self.decode_options:
+            print(f"Decode Options: {self.decode_options}")
+        if self.preprocess:
+            print(f"Preprocessing : {self.preprocess_options or 'default'}")
+        if self.language_id:
+            print(f"Language ID   : {self.language_id_options or 'default'}")
+        for label, value in self.config_lines():
+            print(f"{label:<14}: {value}")
+        print("=========================================\n")
+
+    # --- backend hooks -------------------------------------------------
+    def load_model(self):
+        """Load and return the framework model object."""
+        raise NotImplementedError
+
+    def load_audio(self, audio_file):
+        """
+        Decode / prepare one file for transcription (timed as decode_audio).
+        Returns (audio_input, duration_sec, extra_fields) where extra_fields
+        is merged into the file's result record.
+
+        Default: 16 kHz mono float32 PCM memory-mapped from the shared decode
+        cache (code/audio_cache.py), so each file is decoded once per sweep;
+        with `preprocess: true` the enhanced PCM (cached the same way) instead.
+        """
+        if self.preprocess:
+            pcm = load_preprocessed_pcm(audio_file, self.preprocess_options)
+            return pcm, len(pcm) / SAMPLE_RATE, {"preprocessed": True}
+        pcm = load_pcm(audio_file)
+        return pcm, len(pcm) / SAMPLE_RATE, {}
+
+    def transcribe(self, audio_input, **options):
+        """
+        Run the model on prepared audio and return (segments, info).
+        `segments` may be a lazy iterator; the harness times it until exhausted.
+        `options` are per-file framework settings (see language_options).
+        """
+        raise NotImplementedError
+
+    def language_options(self, lid):
+        """
+        transcribe() options for a file's language-ID result: the detected
+        language as a fixed setting, or nothing (the framework's own
+        detection) for mixed-language / low-confidence files.
+        """
+        return {"language": lid.language} if lid.fixed else {}
+
+    def postprocess(self, segments, info):
+        """Turn the consumed segments into {"text": ..., "language": ...}."""
+        raise NotImplementedError
+
+    def remap_segment(self, segment, speech):
+        """
+        Map a segment's timestamps from the speech-only audio (VAD) back to the
+        original file. Handles dict segments and objects with start/end;
+        backends with other timestamp fields override this.
+        """
+        if isinstance(segment, dict):
+            if "start" not in segment:
+                return segment
+            return {**segment, "start": speech.to_original(segment["start"]),
+                    "end": speech.to_original(segment["end"], is_end=True)}
+        if dataclasses.is_dataclass(segment) and hasattr(segment, "start"):
+            words = getattr(segment, "words", None)
+            if words:
+                words = [dataclasses.replace(w, start=speech.to_original(w.start),
+                                             end=speech.to_original(w.end, is_end=True)) for w in words]
+            return dataclasses.replace(segment, start=speech.to_original(segment.start),
+                                       end=speech.to_original(segment.end, is_end=True),
+                                       **({"words": words} if words else {}))
+        return segment
+
+    def release_audio(self, audio_input):
+        """Free anything load_audio() created (temp files, buffers)."""
+        pass
+
+    # --- shared driver -------------------------------------------------
+    def load(self):
+        """Load the model once and record how long it took."""
+        if self.model is None:
+            start = time.time()
+            with tracing.span("load_model", backend=self.variant, model=self.model_name):
+                self.model = self.load_model()
+            self.load_time = time.time() - start
+        return self.model
+
+    def result_record(self, audio_file, duration, proc_time, output, extra=None):
+        rtf = proc_time / duration if duration > 0 else 0
+        return {
+            "variant": self.variant,
+            "framework": self.framework,
+            "model": self.model_name,
+            "device": self.device,
+            "compute_type": self.compute_type,
+            "cpu_threads": self.cpu_threads,   # None / 0: framework default
+            "file": Path(audio_file).name,
+            **(extra or {}),
+            "duration_sec": round(duration, 2),
+            "processing_time_sec": round(proc_time, 4),
+            "rtf": round(rtf, 4),
+            "language": output.get("language") or "unknown",
+            "transcript": output["text"],
+        }
+
+    def transcribe_file(self, audio_file, warmup=0, repeats=1):
+        """Benchmark one file (phase timings + resources) and return its result record."""
+        return benchmark_file(self, audio_file, warmup=warmup, repeats=repeats)
+
+    def output_path(self, output_dir):
+        return results_path(output_dir, self.variant, self.model_name)
+
+    def save_results(self, results, output_dir):
+        with tracing.span("write_results", backend=self.variant, files=len(results)):
+            return save_results(results, self.output_path(output_dir))
+
+    def run(self, audio_dir, output_dir, warmup=0, repeats=1, resume=True):
+        """
+        Transcribe every file in audio_dir and save a results JSON.
+        Each finished file is checkpointed to the run manifest right away; with
+        resume=True files already in it (same audio, backend, config) are reused,
+        and the model is only loaded if something is left to transcribe.
+        """
+        self.print_config()
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = RunManifest.for_output_dir(output_dir)
+        backend = self.cfg.get("variant", self.variant)
+        results = []
+
+        for audio_file in list_audio_files(audio_dir):
+            key = manifest.key_for(audio_file, backend, self.cfg, warmup, repeats)
+            record = manifest.get(key, audio_file) if resume else None
+            if record is not None:
+                print(f"⏭️ Unchanged, reusing checkpoint: {audio_file.name}")
+                results.append(record)
+                continue
+
+            if self.model is None:
+                self.load()
+                print(f"🧠 Model loaded in {self.load_time:.2f}s")
+            print(f"🎧 Processing: {audio_file.name}")
+            record = self.transcribe_file(audio_file, warmup=warmup, repeats=repeats)
+            manifest.append(key, record)
+            results.append(record)
+            print(f"✅ Done: {audio_file.name} | Time: {record['processing_time_sec']:.2f}s | First seg: {record['first_segment_sec']:.2f}s | CPU: {record['avg_cpu']:.1f}% | GPU: {record.get('avg_gpu', 0):.1f}%")
+
+        if manifest.reused:
+            print(f"♻️ Reused {manifest.reused} checkpointed results, transcribed {manifest.appended}")
+        json_path = self.save_results(results, output_dir)
+
+        print(f"\n✅ Transcription complete for {self.variant} ({self.model_name})")
+        print(f"📁 Results saved to: {json_path}")
+        return json_path
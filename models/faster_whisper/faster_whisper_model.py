@@ -1,69 +1,37 @@
-import time, json, os
-from pathlib import Path
 from faster_whisper import WhisperModel
-from pydub import AudioSegment
 import torch
-from code.resource_monitor import ResourceMonitor
+from models.base_backend import ASRBackend
 
-def transcribe_audio(model_cfg, audio_dir, output_dir):
-    model_variant = "faster-whisper"
-    model_name = model_cfg["name"]
-    framework = model_cfg["framework"]
-    device = model_cfg.get("device", "cuda")
-    compute_type = model_cfg.get("compute_type", "float16" if device == "cuda" else "int8")
 
-    print("\n========== MODEL CONFIGURATION ==========")
-    print(f"Model Variant : {model_variant}")
-    print(f"Framework     : {framework}")
-    print(f"Model Name    : {model_name}")
-    print(f"Device        : {device}")
-    print(f"Compute Type  : {compute_type}")
-    print(f"CUDA Available: {torch.cuda.is_available()}")
-    print("=========================================\n")
+class FasterWhisperBackend(ASRBackend):
+    variant = "faster-whisper"
+    tunable_params = ("beam_size", "compute_type", "cpu_threads", "num_workers", "vad", "chunk_length", "temperature")
+    load_params = ("compute_type", "cpu_threads", "num_workers")
 
-    os.makedirs(output_dir, exist_ok=True)
-    model = WhisperModel(model_name, device=device, compute_type=compute_type)
-    results = []
+    def resolve_device(self):
+        return self.cfg.get("device", "cuda")
 
-    for audio_file in Path(audio_dir).glob("*"):
-        print(f"🎧 Processing: {audio_file.name}")
-        audio = AudioSegment.from_file(audio_file)
-        duration = len(audio) / 1000.0
+    def config_lines(self):
+        return [("CUDA Available", torch.cuda.is_available())]
 
-        monitor = ResourceMonitor(interval=1)
-        monitor.start()
+    def load_model(self):
+        return WhisperModel(self.model_name, device=self.device, compute_type=self.compute_type,
+                            cpu_threads=self.cpu_threads or 0, num_workers=self.cfg.get("num_workers", 1))
 
-        start = time.time()
-        segments, info = model.transcribe(str(audio_file))
-        proc_time = time.time() - start
+    def transcribe(self, audio_input, **options):
+        # Lazy generator: decoding happens while the harness consumes it.
+        return self.model.transcribe(audio_input, **{**self.decode_options, **options})
 
-        monitor.stop()
-        resource_stats = monitor.get_summary()
+    def language_options(self, lid):
+        # mixed-language files re-detect per 30 s window; everything else keeps one language
+        if lid.fixed:
+            return {"language": lid.language, "multilingual": False}
+        return {"multilingual": True} if lid.mixed else {}
 
+    def postprocess(self, segments, info):
         text = " ".join([seg.text for seg in segments])
-        rtf = proc_time / duration
-
-        results.append({
-            "variant": model_variant,
-            "framework": framework,
-            "model": model_name,
-            "device": device,
-            "compute_type": compute_type,
-            "file": audio_file.name,
-            "duration_sec": round(duration, 2),
-            "processing_time_sec": round(proc_time, 4),
-            "rtf": round(rtf, 4),
-            "language": info.language if hasattr(info, "language") else "unknown",
-            "transcript": text,
-            **resource_stats   # 👈 adds CPU, RAM, GPU stats
-        })
+        return {"text": text, "language": getattr(info, "language", "unknown")}
 
-        print(f"✅ Done: {audio_file.name} | Time: {proc_time:.2f}s | CPU: {resource_stats['avg_cpu']:.1f}% | GPU: {resource_stats.get('avg_gpu', 0):.1f}%")
 
-    json_path = Path(output_dir) / f"{model_variant}_{model_name}_results.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-
-    print(f"\n✅ Transcription complete for {model_variant} ({model_name})")
-    print(f"📁 Results saved to: {json_path}")
-    return json_path
+def transcribe_audio(model_cfg, audio_dir, output_dir):
+    return FasterWhisperBackend(model_cfg).run(audio_dir, output_dir)
@@ -0,0 +1,64 @@
+# models/registry.py
+"""
+registry.py
+----------------------------------
+Lazy registry of ASR backends, keyed by the entries under `models:` in
+models/model_configs.yaml.
+
+Backend modules are imported only when a backend is requested, so running
+one backend never imports torch / whisper / whisperx / ctranslate2 /
+pywhispercpp for the others, and a missing framework only disables its own
+backend.
+"""
+
+import importlib
+import time
+from pathlib import Path
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CONFIG_PATH = BASE_DIR / "models" / "model_configs.yaml"
+
+# config key -> "module:ClassName"
+BACKENDS = {
+    "faster-whisper": "models.faster_whisper.faster_whisper_model:FasterWhisperBackend",
+    "openai-whisper": "models.openai_whisper.openai_whisper_model:OpenAIWhisperBackend",
+    "whisper-cpp": "models.whisper_cpp.whisper_cpp_model:WhisperCppBackend",
+    "whisperx": "models.whisperx.whisperx_model:WhisperXBackend",
+}
+
+
+def load_config(config_path=CONFIG_PATH):
+    """Read model_configs.yaml and return the `models` mapping."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)["models"]
+
+
+def register_backend(name, target):
+    """Register (or override) a backend as "module:ClassName"."""
+    BACKENDS[name] = target
+
+
+def available_backends():
+    return list(BACKENDS)
+
+
+def load_backend_class(name):
+    """
+    Import the module behind `name` and return (backend_class, import_time_sec).
+    Raises KeyError for unknown names and ImportError if the framework is missing.
+    """
+    if name not in BACKENDS:
+        raise KeyError(f"Unknown backend '{name}'. Available: {available_backends()}")
+
+    module_name, class_name = BACKENDS[name].split(":")
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_time = time.perf_counter() - start
+    return getattr(module, class_name), import_time
+
+
+def create_backend(name, model_cfg):
+    """Instantiate a backend from its config entry. Returns (backend, import_time_sec)."""
+    backend_cls, import_time = load_backend_class(name)
+    return backend_cls(model_cfg), import_time
@@ -1,107 +1,94 @@
-import time
-import json
 import os
-from pathlib import Path
+import numpy as np
 from pywhispercpp.model import Model
-from pydub import AudioSegment
-import tempfile
-from code.resource_monitor import ResourceMonitor
-
-# --- 🔧 Helper: Ensure audio is 16-bit PCM, mono, 16kHz for Whisper.cpp ---
-def prepare_audio(input_path, target_sr=16000):
-    """Convert audio to 16-bit PCM mono WAV (required by Whisper.cpp)."""
-    audio = AudioSegment.from_file(input_path)
+from code.audio_cache import load_pcm, SAMPLE_RATE
+from code.audio_probe import probe_audio
+from code.preprocessing import load_preprocessed_pcm
+from models.base_backend import ASRBackend
+
+# --- 🔧 Helper: 16 kHz mono float32 samples for Whisper.cpp, straight from memory ---
+def prepare_audio(input_path, preprocess_options=None):
+    """
+    Return (samples, original_info) where samples is the shared cached PCM
+    (16 kHz mono float32, memory-mapped) — no temp WAV, no second decode.
+    preprocess_options: use the enhanced PCM (code/preprocessing.py) instead.
+    """
+    info = probe_audio(input_path)   # container header read, no decode
     original_info = {
-        "frame_rate": audio.frame_rate,
-        "channels": audio.channels,
-        "sample_width": audio.sample_width * 8  # in bits
+        "frame_rate": info["sample_rate"],
+        "channels": info["channels"],
+        "codec": info["codec"],
     }
 
     print(f"🔍 Original audio info: {original_info}")
 
-    # Ensure correct format
-    audio = audio.set_frame_rate(target_sr).set_channels(1).set_sample_width(2)
-
-    tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    audio.export(tmp.name, format="wav")
-
-    print(f"✅ Converted to 16-bit PCM mono @ {target_sr}Hz -> {tmp.name}")
-    return tmp.name, original_info
-
-
-# --- 🚀 Main transcription function ---
-def transcribe_audio(model_cfg, audio_dir, output_dir):
-    model_variant = "whisper-cpp"
-    model_name = model_cfg["name"]
-    framework = model_cfg["framework"]
-    device = model_cfg.get("device", "cpu")
-    compute_type = "int8"
-
-    print("\n========== MODEL CONFIGURATION ==========")
-    print(f"Model Variant : {model_variant}")
-    print(f"Framework     : {framework}")
-    print(f"Model Name    : {model_name}")
-    print(f"Device        : {device}")
-    print(f"Compute Type  : {compute_type}")
-    print("=========================================\n")
-
-    os.makedirs(output_dir, exist_ok=True)
-    model = Model(model_name)
-    results = []
-
-    for audio_file in Path(audio_dir).glob("*"):
-        print(f"\n🎧 Processing: {audio_file.name}")
-
+    # pywhispercpp takes a contiguous float32 array; the memmap already is one (no copy)
+    pcm = load_pcm(input_path) if preprocess_options is None else load_preprocessed_pcm(input_path, preprocess_options)
+    samples = np.ascontiguousarray(pcm, dtype=np.float32)
+    return samples, original_info
+
+
+# --- 🔧 Helper: decode_options -> whisper_full_params ---
+def temperature_params(temperature):
+    """
+    whisper.cpp takes a start temperature and a fallback increment instead of
+    a list: [0.0, 0.2, ..., 1.0] -> (0.0, 0.2); a scalar disables the fallback.
+    """
+    if isinstance(temperature, list):
+        step = temperature[1] - temperature[0] if len(temperature) > 1 else 0.0
+        return {"temperature": temperature[0], "temperature_inc": step}
+    return {"temperature": temperature, "temperature_inc": 0.0}
+
+
+# --- 🚀 Whisper.cpp backend ---
+class WhisperCppBackend(ASRBackend):
+    variant = "whisper-cpp"
+    tunable_params = ("beam_size", "cpu_threads", "vad", "temperature")
+    # beam search is a sampling strategy chosen when the model is created
+    load_params = ("beam_size", "cpu_threads")
+
+    def resolve_compute_type(self):
+        return "int8"
+
+    def resolve_threads(self):
+        """cpu_threads from the YAML config; 0/None means every available core."""
+        threads = self.cpu_threads
+        if not threads:
+            threads = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        return threads
+
+    def config_lines(self):
+        return [("Threads", self.resolve_threads())]
+
+    def load_model(self):
+        kwargs = {}
+        if "beam_size" in self.decode_options:
+            kwargs = {"params_sampling_strategy": 1,   # WHISPER_SAMPLING_BEAM_SEARCH
+                      "beam_search": {"beam_size": self.decode_options["beam_size"], "patience": -1.0}}
+        return Model(self.model_name, n_threads=self.resolve_threads(), print_progress=False, **kwargs)
+
+    def load_audio(self, audio_file):
         # --- Prepare and log audio info ---
-        input_path, original_info = prepare_audio(str(audio_file))
-
-        # --- Duration calculation ---
-        audio = AudioSegment.from_file(input_path)
-        duration = len(audio) / 1000.0
-
-        monitor = ResourceMonitor(interval=1)
-        monitor.start()
-
-        # --- Run Whisper.cpp transcription ---
-        start = time.time()
-        segments = model.transcribe(input_path)
-        proc_time = time.time() - start
+        samples, original_info = prepare_audio(audio_file, self.preprocess_options if self.preprocess else None)
+        extra = {"original_audio_info": original_info, **({"preprocessed": True} if self.preprocess else {})}
+        return samples, len(samples) / SAMPLE_RATE, extra
+
+    def transcribe(self, audio_input, **options):
+        # --- Run Whisper.cpp transcription on in-memory samples ---
+        if "temperature" in self.decode_options:
+            options = {**temperature_params(self.decode_options["temperature"]), **options}
+        return self.model.transcribe(audio_input, **options), None
+
+    def remap_segment(self, segment, speech):
+        # whisper.cpp timestamps are t0 / t1 in centiseconds
+        segment.t0 = int(round(speech.to_original(segment.t0 / 100) * 100))
+        segment.t1 = int(round(speech.to_original(segment.t1 / 100, is_end=True) * 100))
+        return segment
+
+    def postprocess(self, segments, info):
+        # --- Merge all text segments ---
+        return {"text": " ".join([seg.text for seg in segments]), "language": "unknown"}
 
-        monitor.stop()
-        resource_stats = monitor.get_summary()
 
-        # --- Merge all text segments ---
-        text = " ".join([seg.text for seg in segments])
-        rtf = proc_time / duration if duration > 0 else 0
-
-        # --- Append results ---
-        results.append({
-            "variant": model_variant,
-            "framework": framework,
-            "model": model_name,
-            "device": device,
-            "compute_type": compute_type,
-            "file": audio_file.name,
-            "original_audio_info": original_info,
-            "duration_sec": round(duration, 2),
-            "processing_time_sec": round(proc_time, 4),
-            "rtf": round(rtf, 4),
-            "language": "unknown",
-            "transcript": text,
-            **resource_stats
-        })
-        print(
-            f"✅ Done: {audio_file.name} | Time: {proc_time:.2f}s | CPU: {resource_stats['avg_cpu']:.1f}% | GPU: {resource_stats.get('avg_gpu', 0):.1f}%")
-
-        # --- Clean up ---
-        if os.path.exists(input_path):
-            os.remove(input_path)
-
-    # --- Save results ---
-    json_path = Path(output_dir) / f"{model_variant}_{model_name}_results.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-
-    print(f"\n✅ Transcription complete for {model_variant} ({model_name})")
-    print(f"📁 Results saved to: {json_path}")
-    return json_path
+def transcribe_audio(model_cfg, audio_dir, output_dir):
+    return WhisperCppBackend(model_cfg).run(audio_dir, output_dir)
@@ -1,79 +1,55 @@
-import time, json, os
-from pathlib import Path
 import torch
 import whisperx
-from pydub import AudioSegment
-from code.resource_monitor import ResourceMonitor
-
-def transcribe_audio(model_cfg, audio_dir, output_dir):
-    model_variant = "whisperx"
-    model_name = model_cfg["name"]        # e.g. "large-v2"
-    framework = model_cfg.get("framework", "whisperx")
-    device = model_cfg.get("device", "cuda" if torch.cuda.is_available() else "cpu")
-    compute_type = model_cfg.get("compute_type", "float16" if device == "cuda" else "int8")
-
-    # ✅ Log configuration
-    print("\n========== MODEL CONFIGURATION ==========")
-    print(f"Model Variant : {model_variant}")
-    print(f"Framework     : {framework}")
-    print(f"Model Name    : {model_name}")
-    print(f"Device        : {device}")
-    print(f"Compute Type  : {compute_type}")
-    print(f"CUDA Available: {torch.cuda.is_available()}")
-    print(f"WhisperX Ver. : {whisperx.__version__ if hasattr(whisperx, '__version__') else 'N/A'}")
-    print("=========================================\n")
-
-    os.makedirs(output_dir, exist_ok=True)
-    results = []
-
-    # 🔹 Load WhisperX model
-    model = whisperx.load_model(model_name, device, compute_type=compute_type)
-
-    for audio_file in Path(audio_dir).glob("*"):
-        print(f"🎧 Processing: {audio_file.name}")
-        audio = AudioSegment.from_file(audio_file)
-        duration = len(audio) / 1000.0
-        audio_data = whisperx.load_audio(str(audio_file))
-
-        monitor = ResourceMonitor(interval=1)
-        monitor.start()
-
-        start = time.time()
-        result = model.transcribe(audio_data)
-        proc_time = time.time() - start
+from models.base_backend import ASRBackend
+
+
+class WhisperXBackend(ASRBackend):
+    variant = "whisperx"
+    tunable_params = ("beam_size", "compute_type", "cpu_threads", "vad", "chunk_length", "temperature")
+    # beam size and temperatures are fixed in the pipeline's asr_options when the model is loaded
+    load_params = ("beam_size", "compute_type", "cpu_threads", "temperature")
+
+    def __init__(self, model_cfg):
+        super().__init__(model_cfg)
+        self.framework = model_cfg.get("framework", "whisperx")
+
+    def resolve_device(self):
+        return self.cfg.get("device", "cuda" if torch.cuda.is_available() else "cpu")
+
+    def config_lines(self):
+        return [
+            ("CUDA Available", torch.cuda.is_available()),
+            ("WhisperX Ver.", whisperx.__version__ if hasattr(whisperx, '__version__') else 'N/A'),
+        ]
+
+    def load_model(self):
+        # 🔹 Load WhisperX model
+        kwargs = {"threads": self.cpu_threads} if self.cpu_threads else {}
+        asr_options = {}
+        if "beam_size" in self.decode_options:
+            asr_options["beam_size"] = self.decode_options["beam_size"]
+        if "temperature" in self.decode_options:
+            temperature = self.decode_options["temperature"]
+            asr_options["temperatures"] = temperature if isinstance(temperature, list) else [temperature]
+        if asr_options:
+            kwargs["asr_options"] = asr_options
+        return whisperx.load_model(self.model_name, self.device, compute_type=self.compute_type, **kwargs)
+
+    def transcribe(self, audio_input, **options):
+        if "chunk_length" in self.decode_options:
+            options = {"chunk_size": self.decode_options["chunk_length"], **options}
+        result = self.model.transcribe(audio_input, **options)
+        return result["segments"], result
 
         # 🔹 Optional alignment
         # print("⏱️ Aligning timestamps...")
         # model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=device)
         # aligned = whisperx.align(result["segments"], model_a, metadata, audio_data, device)
 
-        monitor.stop()
-        resource_stats = monitor.get_summary()
-
-        text = " ".join(seg["text"].strip() for seg in result["segments"])
-        rtf = proc_time / duration
+    def postprocess(self, segments, info):
+        text = " ".join(seg["text"].strip() for seg in segments)
+        return {"text": text, "language": info.get("language", "unknown")}
 
-        results.append({
-            "variant": model_variant,
-            "framework": framework,
-            "model": model_name,
-            "device": device,
-            "compute_type": compute_type,
-            "file": audio_file.name,
-            "duration_sec": round(duration, 2),
-            "processing_time_sec": round(proc_time, 4),
-            "rtf": round(rtf, 4),
-            "language": result.get("language", "unknown"),
-            "transcript": text,
-            **resource_stats
-        })
-        print( f"✅ Done: {audio_file.name} | Time: {proc_time:.2f}s | CPU: {resource_stats['avg_cpu']:.1f}% | GPU: {resource_stats.get('avg_gpu', 0):.1f}%")
 
-    # 🔹 Save all results
-    json_path = Path(output_dir) / f"{model_variant}_{model_name}_results.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-
-    print(f"\n✅ Transcription complete for {model_variant} ({model_name})")
-    print(f"📁 Results saved to: {json_path}")
-    return json_path
+def transcribe_audio(model_cfg, audio_dir, output_dir):
+    return WhisperXBackend(model_cfg).run(audio_dir, output_dir)
@@ -0,0 +1,100 @@
+# tests/perf/conftest.py
+"""
+Baseline comparison for the performance suite.
+
+Each test reports its measurements through the `perf` fixture:
+
+    perf.check("metrics.files_per_sec", value, better="higher", unit="files/s")
+
+and fails if the value is worse than the stored baseline
+(tests/perf/perf_baseline.json) by more than the tolerance:
+lower-is-better values may grow to baseline * (1 + tol), higher-is-better
+values may drop to baseline / (1 + tol).
+
+    python -m pytest tests/perf                          # compare (tolerance 0.5)
+    python -m pytest tests/perf --perf-tolerance 0.3
+    python -m pytest tests/perf --perf-update-baseline   # re-record on this machine
+
+Baselines are machine-specific: re-record them when the reference machine
+changes. Measurements without a baseline entry are reported, not checked.
+"""
+
+import json
+import os
+import platform
+from pathlib import Path
+
+import pytest
+
+BASELINE_PATH = Path(__file__).resolve().parent / "perf_baseline.json"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf")
+    group.addoption("--perf-update-baseline", action="store_true",
+                    help="Write this run's measurements to perf_baseline.json instead of checking them.")
+    group.addoption("--perf-tolerance", type=float, default=float(os.environ.get("PERF_TOLERANCE", 0.5)),
+                    help="Allowed relative regression vs the baseline (default 0.5, or $PERF_TOLERANCE).")
+
+
+class PerfRecorder:
+
+    def __init__(self, baseline, tolerance, update):
+        self.baseline = baseline
+        self.tolerance = tolerance
+        self.update = update
+        self.measured = {}
+
+    def check(self, name, value, better="lower", unit="", noise=0.0):
+        """
+        Record one measurement and fail the test if it regressed past the tolerance.
+        noise: absolute slack (in `unit`) for tiny values where timer jitter
+        dominates the relative tolerance.
+        """
+        value = round(float(value), 6)
+        self.measured[name] = {"value": value, "better": better, "unit": unit}
+        entry = self.baseline.get(name)
+        if self.update or entry is None:
+            return
+        base = entry["value"]
+        tol = entry.get("tolerance", self.tolerance)   # per-metric override for noisy metrics
+        if better == "lower":
+            limit = base * (1 + tol) + noise
+            assert value <= limit, (f"{name} regressed: {value:.4g} {unit} > {limit:.4g} "
+                                    f"(baseline {base:.4g}, tolerance {tol:.0%})")
+        else:
+            limit = base / (1 + tol) - noise
+            assert value >= limit, (f"{name} regressed: {value:.4g} {unit} < {limit:.4g} "
+                                    f"(baseline {base:.4g}, tolerance {tol:.0%})")
+
+
+def _load_baseline():
+    if not BASELINE_PATH.exists():
+        return {}
+    with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)["metrics"]
+
+
+@pytest.fixture(scope="session")
+def perf(request):
+    config = request.config
+    recorder = PerfRecorder(_load_baseline(), config.getoption("--perf-tolerance"),
+                            config.getoption("--perf-update-baseline"))
+    yield recorder
+
+    print("\n========== PERF ==========")
+    for name, m in sorted(recorder.measured.items()):
+        base = recorder.baseline.get(name, {}).get("value")
+        ref = f"(baseline {base:.4g})" if base is not None else "(no baseline)"
+        print(f"{name:<40} {m['value']:>12.4g} {m['unit']:<10} {ref}")
+    if recorder.update:
+        metrics = {**recorder.baseline}
+        for name, m in recorder.measured.items():
+            # keep hand-set per-metric tolerances
+            metrics[name] = {**metrics.get(name, {}), **m}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"machine": {"platform": platform.platform(), "python": platform.python_version(),
+                                   "cpus": os.cpu_count()},
+                       "metrics": dict(sorted(metrics.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"📝 Baseline updated: {BASELINE_PATH}")
@@ -0,0 +1,91 @@
+# tests/perf/fake_backend.py
+"""
+fake_backend.py
+----------------------------------
+Deterministic ASR backend for performance tests (no GPU, network or model).
+
+Reads 16-bit WAV files with the standard library and "transcribes" them by
+sleeping `rtf` seconds per second of audio, yielding one segment every
+`segment_sec` of audio. Because the simulated model time is known exactly,
+whatever a benchmark measures on top of it is harness overhead.
+
+Config keys (model_configs.yaml style):
+    name: fake
+    load_sec: 0.0        # simulated model load time
+    rtf: 0.01            # simulated compute seconds per audio second
+    segment_sec: 5.0     # audio seconds per emitted segment
+    words_per_segment: 8
+"""
+
+import time
+import wave
+
+import numpy as np
+
+from models.base_backend import ASRBackend
+
+WORDS = ("the", "quick", "brown", "fox", "jumps", "over", "a", "lazy", "dog", "today")
+
+
+def segment_text(index, words):
+    return " ".join(WORDS[(index + i) % len(WORDS)] for i in range(words))
+
+
+def read_wav(path):
+    """Mono float32 PCM and sample rate of a 16-bit PCM WAV file."""
+    with wave.open(str(path), "rb") as w:
+        frames = w.readframes(w.getnframes())
+        pcm = np.frombuffer(frames, np.int16).astype(np.float32) / 32768.0
+        if w.getnchannels() > 1:
+            pcm = pcm.reshape(-1, w.getnchannels()).mean(axis=1)
+        return pcm, w.getframerate()
+
+
+def write_wav(path, seconds, sample_rate=16000, freq=220.0):
+    """A mono 16-bit tone of the given length (test fixture audio)."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pcm = (0.3 * np.sin(2 * np.pi * freq * t) * 32767).astype(np.int16)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return path
+
+
+class FakeBackend(ASRBackend):
+    variant = "fake"
+
+    def __init__(self, model_cfg):
+        super().__init__(model_cfg)
+        self.load_sec = model_cfg.get("load_sec", 0.0)
+        self.rtf = model_cfg.get("rtf", 0.01)
+        self.segment_sec = model_cfg.get("segment_sec", 5.0)
+        self.words_per_segment = model_cfg.get("words_per_segment", 8)
+        self.simulated_sec = 0.0   # total simulated model time so far
+        self.sample_rate = 16000
+
+    def load_model(self):
+        time.sleep(self.load_sec)
+        return object()
+
+    def load_audio(self, audio_file):
+        pcm, self.sample_rate = read_wav(audio_file)
+        return pcm, len(pcm) / self.sample_rate, {}
+
+    def transcribe(self, audio_input, **options):
+        duration = len(audio_input) / self.sample_rate
+        n_segments = max(1, int(np.ceil(duration / self.segment_sec)))
+
+        def segments():
+            for i in range(n_segments):
+                start = i * self.segment_sec
+                end = min(duration, start + self.segment_sec)
+                time.sleep((end - start) * self.rtf)
+                self.simulated_sec += (end - start) * self.rtf
+                yield {"start": start, "end": end, "text": segment_text(i, self.words_per_segment)}
+
+        return segments(), {"language": options.get("language", "en")}
+
+    def postprocess(self, segments, info):
+        return {"text": " ".join(s["text"] for s in segments), "language": info["language"]}
@@ -0,0 +1,123 @@
+# tests/perf/test_perf_regression.py
+"""
+Performance regression suite (CPU only, no network, no model downloads).
+
+- fake backend : the full ASRBackend.run() loop (decode, segment loop, resource
+                 monitor, manifest checkpoints, report JSON) around a backend
+                 with known simulated latency, so the measured excess is
+                 harness overhead
+- decode       : FFmpeg decode and PCM-cache reads (skipped without ffmpeg)
+- metrics      : metrics_engine scoring throughput
+- combine      : results-store inserts and the combine / stats queries
+
+Timings are the best of several repeats to keep noise out of the comparison.
+"""
+
+import json
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from code.audio_cache import PCMCache, decode_pcm
+from code.metrics_engine import evaluate_models
+from code.results_store import ResultsStore
+from fake_backend import FakeBackend, write_wav, WORDS
+
+SAMPLES_DIR = Path(__file__).resolve().parents[1] / "test_audio_samples"
+
+
+def best_of(fn, repeats=5):
+    """Minimum wall time of fn() over `repeats` calls, and its last result."""
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def test_fake_backend_run(perf, tmp_path):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    files, seconds = 6, 10.0
+    for i in range(files):
+        write_wav(audio_dir / f"tone_{i}.wav", seconds, freq=220.0 + 20 * i)
+
+    backend = FakeBackend({"name": "fake", "rtf": 0.01, "segment_sec": 2.0})
+    start = time.perf_counter()
+    json_path = backend.run(audio_dir, tmp_path / "out", resume=False)
+    wall = time.perf_counter() - start
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    assert [r["file"] for r in records] == [f"tone_{i}.wav" for i in range(files)]
+    assert all(len(r["transcript"].split()) == 5 * 8 for r in records)
+
+    overhead = (wall - backend.simulated_sec) / files
+    first_segment = sum(r["first_segment_sec"] for r in records) / files - 2.0 * 0.01
+    perf.check("fake_run.audio_x_realtime", files * seconds / wall, better="higher", unit="x")
+    perf.check("fake_run.overhead_ms_per_file", overhead * 1000, unit="ms", noise=5.0)
+    perf.check("fake_run.first_segment_overhead_ms", first_segment * 1000, unit="ms", noise=2.0)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_decode_throughput(perf, tmp_path):
+    sample = SAMPLES_DIR / "urdu_clean_30s.mp3"
+    if not sample.exists():
+        pytest.skip(f"{sample.name} not available")
+
+    decode_sec, pcm = best_of(lambda: decode_pcm(sample))
+    duration = len(pcm) / 16000
+    perf.check("decode.ffmpeg_audio_x_realtime", duration / decode_sec, better="higher", unit="x")
+
+    cache = PCMCache(tmp_path / "pcm")
+    cache.load(sample)   # cold: decode + write
+    cached_sec, cached = best_of(lambda: cache.load(sample), repeats=20)
+    assert cache.stats() == {"hits": 20, "misses": 1}
+    assert len(cached) == len(pcm)
+    perf.check("decode.cached_load_ms", cached_sec * 1000, unit="ms", noise=0.2)
+
+
+def test_metrics_throughput(perf, tmp_path):
+    files, words = 200, 120
+    refs, hyps = [], []
+    for i in range(files):
+        ref = [WORDS[(i + j) % len(WORDS)] for j in range(words)]
+        hyp = ["noise" if j % 10 == 0 else w for j, w in enumerate(ref)]   # 10% substitutions
+        refs.append({"file": f"f{i}.wav", "transcript": " ".join(ref)})
+        hyps.append({"file": f"f{i}.wav", "transcript": " ".join(hyp)})
+    (tmp_path / "ref.json").write_text(json.dumps(refs), encoding="utf-8")
+    (tmp_path / "hyp.json").write_text(json.dumps(hyps), encoding="utf-8")
+
+    elapsed, result = best_of(lambda: evaluate_models(tmp_path / "ref.json", {"hyp": tmp_path / "hyp.json"},
+                                                      workers=0))
+    assert result["corpus"]["hyp"]["WER"] == 0.1
+    assert result["corpus"]["hyp"]["files"] == files
+    perf.check("metrics.files_per_sec", files / elapsed, better="higher", unit="files/s")
+
+
+def test_combine_queries(perf, tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite")
+    runs, backends, files = 20, 4, 250
+    run_ids = []
+    start = time.perf_counter()
+    for r in range(runs):
+        run_id = store.start_run(label=f"run{r}")
+        run_ids.append(run_id)
+        store.add_transcriptions(run_id, [
+            {"variant": f"backend{b}", "model": "m", "file": f"f{i}.wav", "language": "ur" if i % 2 else "en",
+             "duration_sec": 30.0, "processing_time_sec": 0.3 * (b + 1), "rtf": 0.01 * (b + 1) + 0.0001 * i}
+            for b in range(backends) for i in range(files)])
+    rows = runs * backends * files
+    perf.check("combine.insert_rows_per_sec", rows / (time.perf_counter() - start), better="higher", unit="rows/s")
+
+    summary_sec, summary = best_of(store.combined_summary)
+    assert len(summary) == files and all(len(f["models"]) == backends for f in summary)
+    perf.check("combine.combined_summary_ms", summary_sec * 1000, unit="ms")
+
+    stats_sec, stats = best_of(lambda: store.stats("rtf", by="backend", language="ur", since_run=run_ids[10]))
+    assert stats["backend0_m"]["count"] == (runs - 10) * files // 2
+    perf.check("combine.rtf_stats_ms", stats_sec * 1000, unit="ms")
+    store.close()
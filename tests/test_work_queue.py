@@ -0,0 +1,131 @@
+# tests/test_work_queue.py
+"""
+Distributed work queue (code/work_queue.py) on one machine: lease expiry and
+fencing on a single connection, then several local worker processes running
+the fake backend, one of them killed mid-job.
+"""
+
+import json
+import os
+import signal
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from code.work_queue import Heartbeat, WorkQueue, enqueue_sweep, start_local_workers, wait_for_sweep, collect_sweep
+from models.registry import BACKENDS
+
+PERF_DIR = Path(__file__).resolve().parent / "perf"
+
+CONFIG = {"fake": {"variant": "fake", "name": "fake-model", "rtf": 0.1, "segment_sec": 2.0}}
+
+
+@pytest.fixture
+def audio_dir(tmp_path, fake_backend):
+    from fake_backend import write_wav
+
+    d = tmp_path / "audio"
+    d.mkdir()
+    for i in range(6):
+        write_wav(d / f"tone_{i}.wav", 10.0, freq=200.0 + 30 * i)
+    return d
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    monkeypatch.syspath_prepend(str(PERF_DIR))
+    monkeypatch.setitem(BACKENDS, "fake", "fake_backend:FakeBackend")
+    # local workers import the fake backend from tests/perf
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [str(PERF_DIR), os.environ.get("PYTHONPATH")])))
+
+
+def test_expired_lease_is_requeued_and_fenced(tmp_path, audio_dir):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    sweep = enqueue_sweep(queue, ["fake"], CONFIG, audio_dir, max_attempts=2)
+    assert queue.counts(sweep) == {"queued": 6, "leased": 0, "done": 0, "failed": 0}
+
+    lost = queue.claim("w1", lease_sec=0.05)
+    time.sleep(0.1)
+    again = queue.claim("w2", lease_sec=60)
+    assert again["id"] == lost["id"] and again["attempts"] == 2
+    assert not queue.complete(lost, {"file": "stale"})          # w1's lease is gone
+    assert queue.complete(again, {"file": Path(again["file"]).name})
+
+    job = queue.claim("w2", lease_sec=60)
+    queue.fail(job, "boom")                                    # attempt 1 of 2: back in the queue
+    job = queue.claim("w2", lease_sec=60)
+    queue.fail(job, "boom")                                    # attempt 2 of 2: failed
+    assert queue.counts(sweep) == {"queued": 4, "leased": 0, "done": 1, "failed": 1}
+    queue.close()
+
+
+def test_heartbeat_survives_errors_and_flags_a_lost_lease(tmp_path, audio_dir, monkeypatch):
+    queue_path = tmp_path / "queue.sqlite"
+    queue = WorkQueue(queue_path)
+    enqueue_sweep(queue, ["fake"], CONFIG, audio_dir)
+    job = queue.claim("w1", lease_sec=0.3)
+
+    renew = WorkQueue.heartbeat
+    calls = []
+
+    def flaky(self, *args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return renew(self, *args)
+
+    monkeypatch.setattr(WorkQueue, "heartbeat", flaky)
+    heartbeat = Heartbeat(queue_path, "w1", lease_sec=0.3)
+    heartbeat.job = job
+    heartbeat.start()
+    try:
+        time.sleep(0.5)
+        assert heartbeat.is_alive() and len(calls) >= 2 and not heartbeat.lost(job)
+
+        # the lease expired and another worker claimed the job
+        queue.conn.execute("UPDATE jobs SET lease_id = 'w2-lease' WHERE id = ?", (job["id"],))
+        deadline = time.time() + 30
+        while not heartbeat.lost(job) and time.time() < deadline:
+            time.sleep(0.05)
+        assert heartbeat.lost(job)
+    finally:
+        heartbeat.stop()
+        heartbeat.join(timeout=30)
+    queue.close()
+
+
+def test_local_workers_survive_a_killed_worker(tmp_path, audio_dir):
+    queue_path = tmp_path / "queue.sqlite"
+    queue = WorkQueue(queue_path)
+    sweep = enqueue_sweep(queue, ["fake"], CONFIG, audio_dir)
+    workers = start_local_workers(queue_path, 3, threads=1, lease_sec=1.5, sweep_id=sweep)
+    try:
+        deadline = time.time() + 60
+        while not queue.counts(sweep)["leased"] and time.time() < deadline:
+            time.sleep(0.05)
+        victim = queue.conn.execute("SELECT worker FROM jobs WHERE status = 'leased' LIMIT 1").fetchone()["worker"]
+        pid = queue.conn.execute("SELECT pid FROM workers WHERE worker_id = ?", (victim,)).fetchone()["pid"]
+        os.kill(pid, signal.SIGKILL)
+
+        counts = wait_for_sweep(queue, sweep, poll_sec=0.2, workers=workers)
+    finally:
+        for p in workers:
+            p.wait(timeout=60)
+    assert counts == {"queued": 0, "leased": 0, "done": 6, "failed": 0}
+
+    summary = collect_sweep(queue, sweep, tmp_path / "out")["fake"]
+    assert [r["file"] for r in summary["records"]] == [f"tone_{i}.wav" for i in range(6)]
+    with open(summary["output_json"], "r", encoding="utf-8") as f:
+        assert len(json.load(f)) == 6
+    retried = queue.conn.execute("SELECT COUNT(*) AS n FROM jobs WHERE attempts > 1").fetchone()["n"]
+    assert retried >= 1
+
+    # the next sweep with the same thread count reuses the checkpointed results instead of queueing them again
+    resumed = enqueue_sweep(queue, ["fake"], CONFIG, audio_dir, output_dir=tmp_path / "out", threads=1)
+    assert queue.counts(resumed) == {"queued": 0, "leased": 0, "done": 6, "failed": 0}
+    # timings measured with 1 thread per worker are not reused for a 2-thread layout
+    rerun = enqueue_sweep(queue, ["fake"], CONFIG, audio_dir, output_dir=tmp_path / "out", threads=2)
+    assert queue.counts(rerun)["queued"] == 6
+    queue.close()